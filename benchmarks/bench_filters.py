@@ -0,0 +1,89 @@
+# benchmarks/bench_filters.py
+"""
+Benchmark del motor de filtros: bucle original vs. autómata de Aho-Corasick.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_filters --filters 10 100 500 --messages 2000
+"""
+import argparse
+import random
+import string
+import time
+from typing import Dict, List, Optional, Tuple
+
+from models.filter_engine import FilterAutomaton
+
+
+def legacy_match(filters: Dict[str, str], subject: str, body: str) -> Optional[str]:
+    """Réplica del bucle original de User._apply_filters."""
+    text = f"{subject.lower()} {body.lower()}"
+    for keyword, folder_name in filters.items():
+        if keyword in text:
+            return folder_name
+    return None
+
+
+def make_word(rng: random.Random, low: int = 4, high: int = 10) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(low, high)))
+
+
+def make_dataset(rng: random.Random, n_filters: int, n_messages: int, body_words: int):
+    filters = {make_word(rng, 5, 12): f"Carpeta{i}" for i in range(n_filters)}
+    keywords = list(filters)
+    messages: List[Tuple[str, str]] = []
+    for _ in range(n_messages):
+        words = [make_word(rng) for _ in range(body_words)]
+        # Aproximadamente un tercio de los mensajes dispara algún filtro.
+        if keywords and rng.random() < 0.33:
+            words[rng.randrange(len(words))] = rng.choice(keywords).upper()
+        subject = " ".join(make_word(rng) for _ in range(5))
+        messages.append((subject, " ".join(words)))
+    return filters, messages
+
+
+def run(n_filters: int, n_messages: int, body_words: int, seed: int) -> Dict[str, float]:
+    rng = random.Random(seed)
+    filters, messages = make_dataset(rng, n_filters, n_messages, body_words)
+
+    start = time.perf_counter()
+    expected = [legacy_match(filters, s, b) for s, b in messages]
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    automaton = FilterAutomaton(filters.items())
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    got = [automaton.match(s.lower(), b.lower()) for s, b in messages]
+    compiled = time.perf_counter() - start
+
+    if got != expected:
+        raise AssertionError("El autómata y el bucle original no coinciden")
+
+    return {
+        "filters": n_filters,
+        "legacy_us_per_msg": legacy / n_messages * 1e6,
+        "automaton_us_per_msg": compiled / n_messages * 1e6,
+        "build_ms": build * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filters", type=int, nargs="+", default=[1, 10, 50, 100, 500])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--body-words", type=int, default=80)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    print(f"{'filtros':>8} {'bucle (us/msg)':>16} {'autómata (us/msg)':>18} {'compilación (ms)':>17}")
+    for n in args.filters:
+        r = run(n, args.messages, args.body_words, args.seed)
+        print(
+            f"{r['filters']:>8} {r['legacy_us_per_msg']:>16.1f} "
+            f"{r['automaton_us_per_msg']:>18.1f} {r['build_ms']:>17.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
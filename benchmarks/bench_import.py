@@ -0,0 +1,90 @@
+# benchmarks/bench_import.py
+"""
+Benchmark del importador mbox: memoria acotada y throughput.
+
+1. Memoria del lector: pico de tracemalloc al recorrer y convertir
+   (read_mbox + parse_message, sin guardar) archivos de N y k×N mensajes.
+   El pico no debe crecer con el tamaño del archivo. Con archivos chicos
+   (unos miles de mensajes) se ve menor: la tabla de cadenas internadas
+   del intérprete (Message usa sys.intern) todavía no llegó a su tamaño
+   estable, de unos cientos de KB.
+2. Importación completa a un StorageEngine en un directorio temporal
+   (bitácora + cuerpos en bodies.bin), con mensajes/s y MB/s.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_import --messages 20000 --factor 4
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from email.message import EmailMessage
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+from storage.engine import StorageEngine
+from storage.mail_import import MailImporter, parse_message, read_mbox
+
+
+def write_mbox(path: str, n_messages: int, seed: int):
+    """Escribe un mbox sintético mensaje por mensaje (sin armarlo en memoria)."""
+    rng = random.Random(seed)
+    words = ["hola", "reunión", "informe", "viaje", "factura", "proyecto", "mañana", "equipo"]
+    start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    with open(path, "wb") as f:
+        for i in range(n_messages):
+            msg = EmailMessage()
+            msg["From"] = f"remitente{rng.randrange(200)}@ejemplo.org"
+            msg["To"] = "destino@ejemplo.org"
+            msg["Subject"] = f"{rng.choice(words)} {i}"
+            msg["Date"] = format_datetime(start + timedelta(minutes=i))
+            msg.set_content(" ".join(rng.choices(words, k=rng.randint(20, 400))))
+            f.write(b"From remitente@ejemplo.org Thu Jan  1 00:00:00 2015\n")
+            f.write(msg.as_bytes().replace(b"\nFrom ", b"\n>From "))
+            f.write(b"\n")
+
+
+def reader_peak_kb(path: str) -> float:
+    tracemalloc.start()
+    for raw in read_mbox(path):
+        parse_message(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--factor", type=int, default=4, help="tamaño del archivo grande (× messages)")
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        small = os.path.join(directory, "chico.mbox")
+        large = os.path.join(directory, "grande.mbox")
+        write_mbox(small, args.messages, args.seed)
+        write_mbox(large, args.messages * args.factor, args.seed)
+
+        print("Memoria del lector (pico de tracemalloc):")
+        for path, n in ((small, args.messages), (large, args.messages * args.factor)):
+            size_mb = os.path.getsize(path) / 1_048_576
+            print(f"  {n:9,} mensajes ({size_mb:7.1f} MB): {reader_peak_kb(path):8.1f} KB")
+
+        storage = StorageEngine.open(os.path.join(directory, "data"))
+        storage.server.register_user("destino")
+        importer = MailImporter(storage.server.users["destino"], batch_size=args.batch_size)
+        start = time.perf_counter()
+        stats = importer.import_mbox(large)
+        elapsed = time.perf_counter() - start
+        storage.close()
+        print(f"\nImportación completa a StorageEngine: {stats['imported']:,} mensajes en {elapsed:.2f} s "
+              f"({stats['messages_per_second']:,.0f} mensajes/s, "
+              f"{stats['bytes_read'] / 1_048_576 / elapsed:.1f} MB/s, {stats['failed']} con errores)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/bench_ingest.py
+"""
+Benchmark de importación masiva: receive() uno por uno vs. MailServer.ingest().
+
+Arma usuarios con filtros y una lista de mensajes históricos, y los
+entrega de dos maneras sobre servidores idénticos:
+
+1. serie:  User.receive() por mensaje (filtros + inserción, en línea).
+2. ingest: MailServer.ingest() con 1, 2, 4, ... procesos de trabajo.
+
+Verifica que cada mensaje quede en la misma carpeta y que la búsqueda
+devuelva lo mismo en todos los casos. En ingest los procesos también
+tokenizan los mensajes para el índice de búsqueda, así que al proceso
+principal sólo le queda insertar; la ganancia por núcleo crece con
+muchos filtros por usuario (--filters 500) y cuerpos largos.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_ingest --users 100 --messages 200000 --filters 500 --workers 1 2 4 8
+"""
+import argparse
+import os
+import random
+import string
+import time
+from typing import Dict, List, Tuple
+
+from models.mail_server import MailServer
+from models.message import Message
+
+
+def make_word(rng: random.Random, low: int = 4, high: int = 10) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(low, high)))
+
+
+def build_server(names: List[str], keywords: Dict[str, List[str]]) -> MailServer:
+    server = MailServer("ingest")
+    for name in names:
+        server.register_user(name)
+        for i, keyword in enumerate(keywords[name]):
+            server.users[name].add_filter(keyword, f"Carpeta{i % 20}")
+    return server
+
+
+def make_deliveries(rng: random.Random, names: List[str], keywords: Dict[str, List[str]],
+                    n_messages: int, body_words: int) -> List[Tuple[str, Message]]:
+    vocabulary = [make_word(rng) for _ in range(5000)]
+    deliveries = []
+    for i in range(n_messages):
+        receiver = rng.choice(names)
+        words = rng.choices(vocabulary, k=body_words)
+        # Aproximadamente un tercio de los mensajes dispara algún filtro.
+        if keywords[receiver] and rng.random() < 0.33:
+            words[rng.randrange(len(words))] = rng.choice(keywords[receiver])
+        message = Message(rng.choice(names), receiver, f"histórico {i}", " ".join(words),
+                          rng.random() < 0.05)
+        deliveries.append((receiver, message))
+    return deliveries
+
+
+def placements(server: MailServer) -> Dict[Tuple[str, int], str]:
+    """{(usuario, id): carpeta} de todos los mensajes del servidor."""
+    found = {}
+    for name, user in server.users.items():
+        stack = [user.root]
+        while stack:
+            folder = stack.pop()
+            for msg in folder.messages:
+                found[(name, msg.id)] = folder.path
+            stack.extend(folder.subfolders)
+    return found
+
+
+def search_results(server: MailServer, queries: List[str]) -> Dict[Tuple[str, str], List[int]]:
+    """{(usuario, consulta): ids encontrados}, para comparar los índices de búsqueda."""
+    return {
+        (name, query): [msg.id for msg in user.search(query, limit=None)]
+        for name, user in list(server.users.items())[:10]
+        for query in queries
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--filters", type=int, default=200, help="filtros por usuario")
+    parser.add_argument("--body-words", type=int, default=120)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = [f"u{i}" for i in range(args.users)]
+    keywords = {name: [make_word(rng, 6, 12) for _ in range(args.filters)] for name in names}
+    deliveries = make_deliveries(rng, names, keywords, args.messages, args.body_words)
+    print(f"{args.messages} mensajes, {args.users} usuarios, {args.filters} filtros por usuario "
+          f"({os.cpu_count()} núcleos)")
+
+    server = build_server(names, keywords)
+    start = time.perf_counter()
+    for receiver, message in deliveries:
+        server.users[receiver].receive(message)
+    serial = time.perf_counter() - start
+    expected = placements(server)
+    queries = [word for _, message in deliveries[:20] for word in message.body.split()[:1]] + ["histórico"]
+    expected_search = search_results(server, queries)
+    print(f"  serie (receive):   {serial:8.2f} s   {args.messages / serial:10,.0f} mensajes/s")
+
+    for workers in args.workers:
+        server = build_server(names, keywords)
+        start = time.perf_counter()
+        server.ingest(deliveries, workers=workers)
+        elapsed = time.perf_counter() - start
+        same = placements(server) == expected and search_results(server, queries) == expected_search
+        status = "ok" if same else "DIFERENCIAS"
+        print(f"  ingest, {workers:2d} procesos: {elapsed:8.2f} s   {args.messages / elapsed:10,.0f} mensajes/s"
+              f"   (x{serial / elapsed:.2f})  {status}")
+
+
+if __name__ == "__main__":
+    main()
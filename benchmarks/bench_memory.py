@@ -0,0 +1,135 @@
+# benchmarks/bench_memory.py
+"""
+Benchmark de memoria: bytes por mensaje con la representación original de
+Message (__dict__ + datetime + copias de los nombres) y con la actual
+(__slots__ + nombres internados + fecha como entero).
+
+Se mide en tres situaciones:
+- sueltos: sólo los mensajes;
+- en una carpeta: guardados en un Folder (el original era una lista; el
+  actual agrega vistas ordenadas, ids no vistos y la referencia al dueño);
+- en el buzón: lo que guarda User al recibir (el original: lista de Inbox,
+  índice por asunto y cola de urgentes; el actual: carpeta, índice de ids,
+  cola de urgencia e índice de búsqueda de texto completo, que el original
+  no tenía).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_memory --messages 100000
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+from datetime import datetime
+
+from models.folder import Folder
+from models.message import Message
+from models.user import User
+
+
+class LegacyMessage:
+    """Réplica exacta del Message original (sólo atributos), para comparar."""
+
+    def __init__(self, sender, receiver, subject, body, urgent=False):
+        self._sender = sender
+        self._receiver = receiver
+        self._subject = subject
+        self._body = body
+        self._date = datetime.now()
+        self._urgent = urgent
+
+
+class LegacyMailbox:
+    """
+    Lo que guardaba el User original al recibir: el mensaje en la lista de
+    Inbox (Folder.messages), en el índice por asunto y, si es urgente, en
+    la cola de urgencia (una lista).
+    """
+
+    def __init__(self):
+        self.inbox = []
+        self.index = {}
+        self.urgent = []
+
+    def store(self, message):
+        self.index[message._subject] = message
+        if message._urgent:
+            self.urgent.append(message)
+        self.inbox.append(message)
+
+
+def make_fields(rng: random.Random, n_users: int, i: int):
+    # Los nombres se construyen en cada mensaje, como si vinieran de la GUI
+    # o de un archivo: cada llamada produce un objeto str nuevo.
+    sender = "".join(["usuario_", str(rng.randrange(n_users))])
+    receiver = "".join(["usuario_", str(rng.randrange(n_users))])
+    return sender, receiver, f"Asunto {i}", f"Cuerpo del mensaje {i}"
+
+
+def store_legacy(messages, mode):
+    if mode == "carpeta":
+        folder = []  # el Folder original: una lista de mensajes
+        folder.extend(messages)
+        return folder
+    mailbox = LegacyMailbox()
+    for message in messages:
+        mailbox.store(message)
+    return mailbox
+
+
+def store_compact(messages, mode):
+    if mode == "carpeta":
+        folder = Folder("Inbox")
+        for message in messages:
+            folder.add_message(message)
+        return folder
+    user = User("destino")
+    for message in messages:
+        user.store(message, user.inbox)
+    return user
+
+
+def measure(cls, store, mode: str, n: int, n_users: int, seed: int) -> float:
+    """
+    Memoria retenida por n mensajes (incluye sus cadenas), en bytes por
+    mensaje. Con store, además lo que agrega guardarlos ("carpeta" o
+    "buzón"); sin store, los mensajes sueltos.
+    """
+    rng = random.Random(seed)
+    gc.collect()
+    tracemalloc.start()
+    fields = [make_fields(rng, n_users, i) for i in range(n)]
+    messages = [cls(*f, urgent=rng.random() < 0.1) for f in fields]
+    # Se suelta la referencia a los campos originales: sólo sobrevive
+    # lo que el mensaje conserva (con internado, una copia por nombre).
+    del fields
+    kept = store(messages, mode) if store is not None else messages
+    del messages
+    gc.collect()
+    total = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return total / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    print(f"mensajes: {args.messages}  usuarios: {args.users}")
+    print(f"{'':28}{'original':>10}{'compacto':>10}{'ahorro':>9}")
+    cases = (
+        ("sueltos", None, None, None),
+        ("en una carpeta (Folder)", "carpeta", store_legacy, store_compact),
+        ("en el buzón (User.store)", "buzón", store_legacy, store_compact),
+    )
+    for label, mode, legacy_store, compact_store in cases:
+        legacy = measure(LegacyMessage, legacy_store, mode, args.messages, args.users, args.seed)
+        compact = measure(Message, compact_store, mode, args.messages, args.users, args.seed)
+        print(f"{label:28}{legacy:10.1f}{compact:10.1f}{100 * (1 - compact / legacy):8.1f}%")
+
+if __name__ == "__main__":
+    main()
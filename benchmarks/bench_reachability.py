@@ -0,0 +1,90 @@
+# benchmarks/bench_reachability.py
+"""
+Benchmark de alcanzabilidad: BFS completo vs. union-find (is_reachable).
+
+Arma un grafo aleatorio con varias componentes y mide consultas entre
+usuarios de la misma componente y de componentes distintas (el peor caso
+de BFS, que recorre toda la componente del remitente para nada).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_reachability --users 100000
+"""
+import argparse
+import random
+import time
+from collections import deque
+
+from models.mail_server import MailServer
+
+
+def bfs_reachable(graph, start: str, target: str) -> bool:
+    """Réplica del recorrido BFS original de _deliver_via_bfs."""
+    if start not in graph or target not in graph:
+        return False
+    queue = deque([start])
+    visited = {start}
+    while queue:
+        current = queue.popleft()
+        if current == target:
+            return True
+        for neighbor in graph[current]:
+            if neighbor not in visited:
+                visited.add(neighbor)
+                queue.append(neighbor)
+    return False
+
+
+def build_server(n_users: int, components: int, avg_degree: int, seed: int) -> MailServer:
+    rng = random.Random(seed)
+    server = MailServer("bench")
+    names = [f"u{i}" for i in range(n_users)]
+    for name in names:
+        server.register_user(name)
+    # Cada usuario pertenece a la componente i % components; las aristas
+    # sólo unen usuarios de la misma componente.
+    for i, name in enumerate(names):
+        for _ in range(avg_degree // 2):
+            j = rng.randrange(i % components, n_users, components)
+            server.connect(name, names[j])
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--components", type=int, default=2)
+    parser.add_argument("--degree", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    server = build_server(args.users, args.components, args.degree, args.seed)
+    build = time.perf_counter() - start
+    print(f"usuarios: {args.users}  componentes: {args.components}  armado: {build:.2f} s")
+
+    rng = random.Random(args.seed + 1)
+    n = args.users
+    pairs = [(f"u{rng.randrange(n)}", f"u{rng.randrange(n)}") for _ in range(args.queries)]
+    expected = [server.is_reachable(a, b) for a, b in pairs]
+
+    start = time.perf_counter()
+    got = [bfs_reachable(server.graph, a, b) for a, b in pairs]
+    bfs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for a, b in pairs:
+        server.is_reachable(a, b)
+    uf = time.perf_counter() - start
+
+    if got != expected:
+        raise AssertionError("BFS y union-find no coinciden")
+
+    misses = expected.count(False)
+    print(f"consultas: {args.queries} ({misses} sin camino)")
+    print(f"BFS        : {bfs / args.queries * 1e3:10.3f} ms/consulta")
+    print(f"union-find : {uf / args.queries * 1e3:10.5f} ms/consulta")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# benchmarks/bench_startup.py
+"""
+Benchmark de arranque: import del motor, recuperación en frío y primera ventana.
+
+Cada medición corre en un proceso nuevo (caché de módulos vacía):
+
+1. Import: engine.service (motor sin GUI) contra los imports que hacía el
+   main.py anterior (tkinter + concurrent.futures + storage.engine).
+2. Recuperación en frío: MailService.open() sobre un directorio de datos
+   sintético (instantánea + cola de bitácora).
+3. Primera ventana: MailClientGUI con pantallas y recuperación diferidas
+   contra la construcción anterior (las cinco pantallas y la recuperación
+   antes de mostrar nada). Necesita un display; sin display se omite.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_startup --users 200 --messages 20000 --runs 7
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from engine.service import MailService
+
+LEGACY_IMPORTS = (
+    "import tkinter, tkinter.ttk, tkinter.messagebox, tkinter.scrolledtext, "
+    "concurrent.futures, storage.engine"
+)
+
+FIRST_WINDOW = """
+import sys, time
+t = time.perf_counter()
+import tkinter as tk
+from gui.app import MailClientGUI
+root = tk.Tk()
+app = MailClientGUI(root, sys.argv[1])
+if sys.argv[2] == "eager":
+    # Construcción anterior: todo antes de la primera ventana.
+    app.service
+    for frame in ("login_frame", "register_frame", "main_frame", "compose_frame"):
+        getattr(app, frame)
+    app.show_frame(app.start_frame)
+# Dibuja la ventana sin procesar eventos (la recuperación diferida espera
+# al evento <Map>).
+root.update_idletasks()
+print(time.perf_counter() - t)
+app.on_close()
+"""
+
+
+def timed_subprocess(code: str, *argv: str) -> float:
+    """Ejecuta 'code' en un intérprete nuevo; el código imprime sus segundos."""
+    out = subprocess.run(
+        [sys.executable, "-c", code, *argv], capture_output=True, text=True, check=True,
+        cwd=os.getcwd(),
+    ).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def median_ms(code: str, runs: int, *argv: str) -> float:
+    return statistics.median(timed_subprocess(code, *argv) for _ in range(runs)) * 1000
+
+
+def import_code(statement: str) -> str:
+    return f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+
+
+def build_data(directory: str, n_users: int, n_messages: int, seed: int):
+    """Directorio de datos sintético: instantánea con la mayoría + cola de bitácora."""
+    rng = random.Random(seed)
+    names = [f"u{i}" for i in range(n_users)]
+    with MailService.open(directory) as mail:
+        for name in names:
+            mail.register(name)
+        for a, b in zip(names, names[1:]):
+            mail.connect(a, b)
+        for i in range(n_messages):
+            if i == n_messages * 9 // 10:
+                mail.storage.snapshot()
+            mail.send(rng.choice(names), rng.choice(names), f"asunto {i}",
+                      f"cuerpo del mensaje {i} " * 5, rng.random() < 0.1)
+
+
+def has_display() -> bool:
+    try:
+        subprocess.run([sys.executable, "-c", "import tkinter; tkinter.Tk().destroy()"],
+                       capture_output=True, check=True)
+        return True
+    except subprocess.CalledProcessError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--runs", type=int, default=7, help="repeticiones (se informa la mediana)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print("Import (mediana):")
+    legacy = median_ms(import_code(LEGACY_IMPORTS), args.runs)
+    engine = median_ms(import_code("import engine.service"), args.runs)
+    print(f"  main.py anterior (tkinter + motor): {legacy:8.1f} ms")
+    print(f"  engine.service (sin tkinter):       {engine:8.1f} ms   (x{legacy / engine:.1f})")
+
+    with tempfile.TemporaryDirectory() as directory:
+        build_data(directory, args.users, args.messages, args.seed)
+        recovery = median_ms(
+            import_code(f"from engine.service import MailService; MailService.open({directory!r}).close()"),
+            args.runs,
+        )
+        print(f"\nRecuperación en frío ({args.users} usuarios, {args.messages} mensajes): {recovery:8.1f} ms")
+
+        print("\nPrimera ventana (mediana):")
+        if not has_display():
+            print("  sin display: se omite")
+            return
+        eager = median_ms(FIRST_WINDOW, args.runs, directory, "eager")
+        lazy = median_ms(FIRST_WINDOW, args.runs, directory, "lazy")
+        print(f"  construcción anterior (todo al inicio): {eager:8.1f} ms")
+        print(f"  pantallas y recuperación diferidas:     {lazy:8.1f} ms   (x{eager / lazy:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+# benchmarks/loadgen.py
+"""
+Generador de carga sin interfaz gráfica para el motor de correo.
+
+Arma una red de usuarios (con connect()) según la topología elegida, les
+agrega filtros y reproduce tráfico sintético con User.send. Informa
+mensajes por segundo, latencia p50/p99 por envío y el pico de memoria (RSS).
+
+Topologías:
+- random:      aristas al azar (grado medio --degree)
+- scale-free:  Barabási-Albert (enganche preferencial, pocos nodos muy conectados)
+- ring:        anillo u0 - u1 - ... - u(n-1) - u0
+- clustered:   grupos de 50 bien conectados unidos por un puente
+
+Tamaño del cuerpo (--size):
+- fixed:N          siempre N bytes
+- uniform:A-B      entre A y B bytes
+- lognormal:M      log-normal con mediana M bytes (sigma 1)
+
+Con --workers N los envíos se reparten entre N hilos (un mismo servidor)
+o N procesos (--mode process: cada proceso arma su propia copia de la red
+y reproduce su parte del tráfico).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.loadgen --users 1000 --messages 50000 --topology scale-free
+    python -m benchmarks.loadgen --size lognormal:2000 --urgent 0.1 --filters 8
+    python -m benchmarks.loadgen --workers 4 --mode process --json
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from models.mail_server import MailServer
+from utils.metrics import MailMetrics
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TOPOLOGIES = ("random", "scale-free", "ring", "clustered")
+CLUSTER_SIZE = 50
+# Vocabulario de los cuerpos y de las palabras clave de los filtros.
+VOCABULARY_SIZE = 2000
+
+
+# ===================================================================
+# CONFIGURACIÓN DE LA CARGA
+# ===================================================================
+def parse_size(spec: str):
+    """Convierte 'fixed:N', 'uniform:A-B' o 'lognormal:M' en f(rng) → bytes."""
+    kind, _, value = spec.partition(":")
+    try:
+        if kind == "fixed":
+            size = int(value)
+            return lambda rng: size
+        if kind == "uniform":
+            low, high = (int(v) for v in value.split("-"))
+            return lambda rng: rng.randint(low, high)
+        if kind == "lognormal":
+            mu = math.log(float(value))
+            return lambda rng: max(1, int(rng.lognormvariate(mu, 1.0)))
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"distribución de tamaño inválida: {spec!r}")
+
+
+def make_vocabulary(rng: random.Random) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choices(letters, k=rng.randint(3, 9))))
+    return sorted(words)
+
+
+def build_network(args) -> MailServer:
+    """Registra los usuarios, los conecta según la topología y agrega sus filtros."""
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng)
+    server = MailServer("loadgen")
+    names = [f"u{i}" for i in range(args.users)]
+    for name in names:
+        server.register_user(name)
+
+    n = len(names)
+    if args.topology == "random":
+        for _ in range(n * args.degree // 2):
+            server.connect(names[rng.randrange(n)], names[rng.randrange(n)])
+    elif args.topology == "scale-free":
+        # Barabási-Albert: cada nodo nuevo se une a m nodos elegidos con
+        # probabilidad proporcional a su grado (la lista 'ends' repite cada
+        # nodo tantas veces como aristas tiene).
+        m = max(1, args.degree // 2)
+        ends = names[:m + 1]
+        for i in range(m + 1):
+            for j in range(i):
+                server.connect(names[i], names[j])
+        for i in range(m + 1, n):
+            for target in {rng.choice(ends) for _ in range(m)}:
+                server.connect(names[i], target)
+                ends += (names[i], target)
+    elif args.topology == "ring":
+        for i in range(n):
+            server.connect(names[i], names[(i + 1) % n])
+    else:
+        for start in range(0, n, CLUSTER_SIZE):
+            group = names[start:start + CLUSTER_SIZE]
+            for name in group:
+                for _ in range(args.degree):
+                    server.connect(name, rng.choice(group))
+            if start:
+                server.connect(names[start - 1], group[0])
+
+    for name in names:
+        user = server.users[name]
+        for i, keyword in enumerate(rng.sample(vocabulary, args.filters)):
+            user.add_filter(keyword, f"Filtro{i}")
+    return server
+
+
+def build_workload(args) -> List[Tuple[str, str, str, str, bool]]:
+    """Lista de envíos (remitente, destinatario, asunto, cuerpo, urgente), fija para una semilla."""
+    rng = random.Random(args.seed + 1)
+    vocabulary = make_vocabulary(random.Random(args.seed))
+    size_of = parse_size(args.size)
+    # Los cuerpos son recortes de un único texto largo: generar cada uno
+    # palabra por palabra dominaría el tiempo de preparación.
+    pool = " ".join(rng.choices(vocabulary, k=200_000))
+
+    workload = []
+    for i in range(args.messages):
+        size = min(size_of(rng), len(pool))
+        start = rng.randrange(len(pool) - size + 1)
+        workload.append((
+            f"u{rng.randrange(args.users)}",
+            f"u{rng.randrange(args.users)}",
+            f"mensaje {i} {rng.choice(vocabulary)}",
+            pool[start:start + size],
+            rng.random() < args.urgent,
+        ))
+    return workload
+
+
+# ===================================================================
+# EJECUCIÓN
+# ===================================================================
+def replay(server: MailServer, workload) -> Tuple[List[float], int]:
+    """Envía cada mensaje con User.send; devuelve (latencias, entregados)."""
+    users = server.users
+    latencies = []
+    delivered = 0
+    clock = time.perf_counter
+    for sender, receiver, subject, body, urgent in workload:
+        start = clock()
+        ok = users[sender].send(server, receiver, subject, body, urgent)
+        latencies.append(clock() - start)
+        delivered += ok
+    return latencies, delivered
+
+
+def peak_rss_mb() -> float:
+    """Pico de memoria residente del proceso en MB (None si no se puede medir)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_process_worker(args, index: int) -> Dict:
+    """Un proceso de trabajo: arma su propia red y reproduce su parte del tráfico."""
+    server = build_network(args)
+    metrics = attach_metrics(server, args)
+    workload = build_workload(args)[index::args.workers]
+    start = time.perf_counter()
+    latencies, delivered = replay(server, workload)
+    elapsed = time.perf_counter() - start
+    if metrics is not None:
+        metrics.write(f"{args.metrics}.{index}")
+    return {"latencies": latencies, "delivered": delivered, "elapsed": elapsed, "rss": peak_rss_mb()}
+
+
+def attach_metrics(server: MailServer, args):
+    if not args.metrics:
+        return None
+    metrics = MailMetrics()
+    server.attach_metrics(metrics)
+    return metrics
+
+
+def run(args) -> Dict:
+    setup_start = time.perf_counter()
+    if args.mode == "process" and args.workers > 1:
+        with ProcessPoolExecutor(args.workers) as pool:
+            start = time.perf_counter()
+            parts = list(pool.map(run_process_worker, [args] * args.workers, range(args.workers)))
+        # El tiempo de pared incluye armar la red en cada proceso: se informa
+        # el throughput con el tiempo de envío del proceso más lento.
+        elapsed = max(p["elapsed"] for p in parts)
+        latencies = [x for p in parts for x in p["latencies"]]
+        delivered = sum(p["delivered"] for p in parts)
+        rss = max((p["rss"] for p in parts if p["rss"] is not None), default=None)
+        setup = time.perf_counter() - start - elapsed
+    else:
+        server = build_network(args)
+        metrics = attach_metrics(server, args)
+        workload = build_workload(args)
+        setup = time.perf_counter() - setup_start
+
+        start = time.perf_counter()
+        if args.workers > 1:
+            # Los hilos comparten el servidor (entregas concurrentes, con
+            # un lock por usuario destinatario).
+            results = [None] * args.workers
+
+            def work(i):
+                results[i] = replay(server, workload[i::args.workers])
+
+            threads = [threading.Thread(target=work, args=(i,)) for i in range(args.workers)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            latencies = [x for lat, _ in results for x in lat]
+            delivered = sum(d for _, d in results)
+        else:
+            latencies, delivered = replay(server, workload)
+        elapsed = time.perf_counter() - start
+        rss = peak_rss_mb()
+        if metrics is not None:
+            metrics.write(args.metrics)
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+
+    return {
+        "users": args.users,
+        "topology": args.topology,
+        "messages": len(latencies),
+        "delivered": delivered,
+        "workers": args.workers,
+        "mode": args.mode,
+        "setup_seconds": setup,
+        "seconds": elapsed,
+        "messages_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(0.50) * 1000,
+        "p99_ms": percentile(0.99) * 1000,
+        "peak_rss_mb": rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--topology", choices=TOPOLOGIES, default="random")
+    parser.add_argument("--degree", type=int, default=4, help="grado medio de la red")
+    parser.add_argument("--size", default="lognormal:500",
+                        help="distribución del tamaño del cuerpo (fixed:N, uniform:A-B, lognormal:M)")
+    parser.add_argument("--urgent", type=float, default=0.05, help="proporción de mensajes urgentes")
+    parser.add_argument("--filters", type=int, default=4, help="filtros por usuario")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--metrics", help="escribe las métricas en formato Prometheus en este archivo")
+    parser.add_argument("--json", action="store_true", help="imprime el resultado en JSON")
+    args = parser.parse_args()
+    try:
+        parse_size(args.size)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    rss = report["peak_rss_mb"]
+    print(f"Red: {report['users']} usuarios ({report['topology']}), "
+          f"{report['workers']} {'procesos' if report['mode'] == 'process' else 'hilos'}")
+    print(f"Preparación:        {report['setup_seconds']:.2f} s")
+    print(f"Mensajes enviados:  {report['messages']} ({report['delivered']} entregados)")
+    print(f"Throughput:         {report['messages_per_second']:,.0f} mensajes/s")
+    print(f"Latencia p50 / p99: {report['p50_ms']:.3f} ms / {report['p99_ms']:.3f} ms")
+    print(f"Pico de RSS:        {'n/d' if rss is None else f'{rss:.1f} MB'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# benchmarks/stress_delivery.py
+"""
+Prueba de estrés de entregas concurrentes: verifica que no se pierdan mensajes.
+
+Varios hilos envían mensajes con User.send sobre un mismo MailServer
+mientras otros agregan conexiones (connect) y alternan urgencias. Al
+terminar se verifica:
+
+- cada mensaje está una vez en Sent del remitente y una vez en el árbol
+  del destinatario (en Inbox o en la carpeta de su filtro);
+- los índices del usuario (id → carpeta, cola de urgencia) y los
+  contadores agregados de las carpetas coinciden con un recorrido completo;
+- con --persist, el estado recuperado de disco (instantáneas automáticas
+  tomadas durante la carga + bitácora) es idéntico al de memoria.
+
+Termina con código 1 si encuentra alguna diferencia.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.stress_delivery --users 200 --messages 50000 --threads 8
+    python -m benchmarks.stress_delivery --persist --snapshot-every 5000
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from models.mail_server import MailServer
+from storage.engine import StorageEngine
+
+
+def walk(user):
+    """{id: [rutas de carpeta]} y la cantidad de mensajes, recorriendo todo el árbol."""
+    found = {}
+    stack = [user.root]
+    while stack:
+        folder = stack.pop()
+        for msg in folder.messages:
+            found.setdefault(msg.id, []).append(folder.path)
+        stack.extend(folder.subfolders)
+    return found
+
+
+def check_user(user, problems):
+    found = walk(user)
+    total = sum(len(paths) for paths in found.values())
+    if user.root.counters.total != total:
+        problems.append(f"{user.name}: contador total {user.root.counters.total} != {total}")
+    if set(user._message_index) != set(found):
+        problems.append(f"{user.name}: el índice id → carpeta no coincide con el árbol")
+    urgent = {msg_id for msg_id in found if user.find_message(msg_id).urgent}
+    queued = {msg.id for msg in user.top_urgent(len(found) + 1)}
+    if queued != urgent:
+        problems.append(f"{user.name}: cola de urgencia con {len(queued)} mensajes, se esperaban {len(urgent)}")
+    return found
+
+
+def run(args) -> int:
+    rng = random.Random(args.seed)
+    directory = (args.dir or tempfile.mkdtemp(prefix="stress-")) if args.persist else None
+    storage = None
+    if args.persist:
+        storage = StorageEngine.open(directory, snapshot_every=args.snapshot_every)
+        server = storage.server
+    else:
+        server = MailServer("stress")
+
+    names = [f"u{i}" for i in range(args.users)]
+    for name in names:
+        server.register_user(name)
+        for i in range(args.filters):
+            server.users[name].add_filter(f"clave{i}", f"Filtro{i}")
+    # Red inicial rala: el resto de las conexiones llega durante la carga.
+    for _ in range(args.users):
+        server.connect(rng.choice(names), rng.choice(names))
+
+    sends = [
+        (rng.choice(names), rng.choice(names), f"m{i}",
+         f"cuerpo {i} clave{rng.randrange(args.filters * 2)}" if args.filters else f"cuerpo {i}",
+         rng.random() < 0.2)
+        for i in range(args.messages)
+    ]
+    edges = [(rng.choice(names), rng.choice(names)) for _ in range(args.users * 2)]
+
+    def send_batch(batch):
+        users = server.users
+        failed = 0
+        for sender, receiver, subject, body, urgent in batch:
+            failed += not users[sender].send(server, receiver, subject, body, urgent)
+        return failed
+
+    def connect_batch(batch):
+        for a, b in batch:
+            server.connect(a, b)
+        return 0
+
+    def toggle_batch(seed):
+        local = random.Random(seed)
+        for _ in range(args.messages // 50):
+            user = server.users[local.choice(names)]
+            messages = user.sent.page("newest", 0, 5)
+            if messages:
+                local.choice(messages).toggle_urgent()
+        return 0
+
+    chunk = max(1, len(sends) // (args.threads * 8))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        jobs = [pool.submit(send_batch, sends[i:i + chunk]) for i in range(0, len(sends), chunk)]
+        jobs += [pool.submit(connect_batch, edges[i::4]) for i in range(4)]
+        jobs += [pool.submit(toggle_batch, args.seed + i) for i in range(2)]
+        failed = sum(job.result() for job in jobs)
+    elapsed = time.perf_counter() - start
+
+    problems = []
+    if failed:
+        problems.append(f"{failed} envíos devolvieron False")
+
+    # Cada envío: una vez en Sent del remitente y una vez en el árbol del destinatario.
+    state = {name: check_user(server.users[name], problems) for name in names}
+    subjects = {name: {} for name in names}
+    for name in names:
+        for msg_id, paths in state[name].items():
+            msg = server.users[name].find_message(msg_id)
+            # Un mensaje a sí mismo queda dos veces, con ids distintos (ver User.store).
+            subjects[name].setdefault(msg.subject, []).extend(paths)
+    for sender, receiver, subject, _, _ in sends:
+        sent_paths = subjects[sender].get(subject, [])
+        received = subjects[receiver].get(subject, [])
+        expected = 2 if sender == receiver else 1
+        if sender != receiver and (sent_paths.count("Sent") != 1 or len(received) != 1):
+            problems.append(f"{subject}: Sent={sent_paths} destino={received}")
+        elif sender == receiver and len(received) != expected:
+            problems.append(f"{subject} (a sí mismo): {received}")
+
+    delivered = sum(len(paths) for found in state.values() for paths in found.values())
+    print(f"{args.messages} envíos con {args.threads} hilos en {elapsed:.2f} s "
+          f"({args.messages / elapsed:,.0f} mensajes/s); {delivered} ubicaciones verificadas")
+
+    if storage is not None:
+        generation = storage._generation
+        storage.close()
+        recovered = StorageEngine.open(directory)
+        for name in names:
+            got = {msg_id: sorted(paths) for msg_id, paths in walk(recovered.server.users[name]).items()}
+            want = {msg_id: sorted(paths) for msg_id, paths in state[name].items()}
+            if got != want:
+                problems.append(f"{name}: el estado recuperado no coincide con el de memoria")
+        recovered.close()
+        print(f"Persistencia: {generation} instantáneas automáticas, recuperación verificada en {directory}")
+
+    for problem in problems[:20]:
+        print("  ✗", problem)
+    if problems:
+        print(f"{len(problems)} diferencias")
+        return 1
+    print("OK: no se perdió ni duplicó ningún mensaje")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--filters", type=int, default=3, help="filtros por usuario")
+    parser.add_argument("--persist", action="store_true", help="usar StorageEngine en un directorio temporal")
+    parser.add_argument("--snapshot-every", type=int, default=5_000)
+    parser.add_argument("--dir", help="directorio de datos con --persist (por defecto, uno temporal)")
+    parser.add_argument("--seed", type=int, default=3)
+    return parser.parse_args(argv)
+
+
+def main():
+    sys.exit(run(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+# benchmarks/suite.py
+"""
+Suite de benchmarks reproducible del motor de correo.
+
+Mide las operaciones críticas a distintas escalas (1k, 10k, 100k, 1M) con
+datos sintéticos generados con semilla fija, y guarda los resultados en
+JSON para compararlos entre commits:
+
+- send / receive       User.send y User.receive con N filtros
+- find_by_subject      Folder.find_by_subject en árboles profundos y anchos
+- move_message         Folder.move_message en árboles profundos y anchos
+- get_folder           User.get_folder por nombre y por ruta
+- deliver_bfs          MailServer._deliver_via_bfs en grafos aleatorio,
+                       cadena y por grupos (clustered)
+- urgent_queue         UrgentQueue (reemplazo de _heap_sort_urgent_queue):
+                       push, top(10) y pop
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.suite --scales 1000 10000 --out bench.json
+    python -m benchmarks.suite --scales 1000 10000 --compare bench.json
+    python -m benchmarks.suite --cases deliver_bfs --scales 1000000
+"""
+import argparse
+import json
+import platform
+import random
+import string
+import subprocess
+import sys
+import time
+import zlib
+from typing import Callable, Dict, List
+
+from models.folder import Folder
+from models.mail_server import MailServer
+from models.message import Message
+from models.urgent_queue import UrgentQueue
+from models.user import User
+
+DEFAULT_SCALES = (1_000, 10_000, 100_000)
+
+# Cantidad de operaciones medidas por caso: las baratas se repiten muchas
+# veces; las que recorren el árbol o el grafo completo, pocas.
+MAX_FAST_OPS = 10_000
+MAX_SLOW_OPS = 50
+
+CASES: Dict[str, Callable] = {}
+
+
+def case(name: str):
+    """Registra una función de benchmark: f(rng, scale, args) → {variante: (ops, segundos)}."""
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+def timed(func: Callable, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+# ===================================================================
+# DATOS SINTÉTICOS
+# ===================================================================
+def make_word(rng: random.Random, low: int = 4, high: int = 10) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(low, high)))
+
+
+def make_text(rng: random.Random, words: int) -> str:
+    return " ".join(make_word(rng) for _ in range(words))
+
+
+def make_filters(rng: random.Random, n_filters: int) -> Dict[str, str]:
+    return {make_word(rng, 6, 12): f"Carpeta{i}" for i in range(n_filters)}
+
+
+def build_tree(shape: str, n_messages: int, rng: random.Random):
+    """
+    Árbol de carpetas con n_messages repartidos al azar:
+    - "deep": una cadena de hasta 200 carpetas anidadas.
+    - "wide": √n carpetas colgando de la raíz.
+    Devuelve (raíz, carpetas, asuntos).
+    """
+    root = Folder("Root")
+    folders = [root]
+    if shape == "deep":
+        for i in range(min(200, n_messages)):
+            child = Folder(f"d{i}")
+            folders[-1].add_folder(child)
+            folders.append(child)
+    else:
+        for i in range(max(1, int(n_messages ** 0.5))):
+            child = Folder(f"w{i}")
+            root.add_folder(child)
+            folders.append(child)
+
+    subjects = [f"asunto {i}" for i in range(n_messages)]
+    for subject in subjects:
+        rng.choice(folders).add_message(Message("a", "b", subject, ""))
+    return root, folders, subjects
+
+
+def build_graph(kind: str, n_users: int, rng: random.Random) -> MailServer:
+    """
+    Red de usuarios conectada con connect():
+    - "random": cada usuario se une a 2 al azar (grado medio ~4).
+    - "chain": u0 - u1 - ... - un (el peor caso para BFS).
+    - "clustered": grupos de 50 bien conectados, unidos por un puente.
+    """
+    server = MailServer("bench")
+    names = [f"u{i}" for i in range(n_users)]
+    for name in names:
+        server.register_user(name)
+
+    if kind == "random":
+        for name in names:
+            for _ in range(2):
+                server.connect(name, names[rng.randrange(n_users)])
+    elif kind == "chain":
+        for a, b in zip(names, names[1:]):
+            server.connect(a, b)
+    else:
+        size = 50
+        for start in range(0, n_users, size):
+            group = names[start:start + size]
+            for name in group:
+                for _ in range(4):
+                    server.connect(name, rng.choice(group))
+            if start:
+                server.connect(names[start - 1], group[0])
+    return server
+
+
+# ===================================================================
+# CASOS
+# ===================================================================
+@case("send")
+def bench_send(rng: random.Random, scale: int, args) -> Dict[str, tuple]:
+    """User.send (entrega local + filtros del destinatario) con un buzón de 'scale' mensajes."""
+    results = {}
+    for n_filters in args.filters:
+        server = MailServer("bench")
+        server.register_user("alice")
+        server.register_user("bob")
+        server.connect("alice", "bob")
+        alice, bob = server.users["alice"], server.users["bob"]
+        filters = make_filters(rng, n_filters)
+        for keyword, folder in filters.items():
+            bob.add_filter(keyword, folder)
+        keywords = list(filters)
+
+        ops = min(scale, MAX_FAST_OPS)
+        prefill = scale - ops
+        texts = [make_text(rng, 20) for _ in range(256)]
+        for i in range(prefill):
+            alice.send(server, "bob", f"previo {i}", texts[i % len(texts)])
+
+        bodies = []
+        for i in range(ops):
+            body = texts[i % len(texts)]
+            if keywords and i % 3 == 0:
+                body = f"{body} {rng.choice(keywords)}"
+            bodies.append(body)
+
+        def run():
+            for i, body in enumerate(bodies):
+                alice.send(server, "bob", f"asunto {i}", body, i % 10 == 0)
+
+        results[f"filters={n_filters}"] = (ops, timed(run))
+    return results
+
+
+@case("receive")
+def bench_receive(rng: random.Random, scale: int, args) -> Dict[str, tuple]:
+    """User.receive (clasificación + inserción) con N filtros."""
+    results = {}
+    for n_filters in args.filters:
+        user = User("bob")
+        filters = make_filters(rng, n_filters)
+        for keyword, folder in filters.items():
+            user.add_filter(keyword, folder)
+        keywords = list(filters)
+
+        ops = min(scale, MAX_FAST_OPS)
+        texts = [make_text(rng, 20) for _ in range(256)]
+        for i in range(scale - ops):
+            user.receive(Message("alice", "bob", f"previo {i}", texts[i % len(texts)]))
+
+        messages = []
+        for i in range(ops):
+            body = texts[i % len(texts)]
+            if keywords and i % 3 == 0:
+                body = f"{body} {rng.choice(keywords)}"
+            messages.append(Message("alice", "bob", f"asunto {i}", body))
+
+        def run():
+            for msg in messages:
+                user.receive(msg)
+
+        results[f"filters={n_filters}"] = (ops, timed(run))
+    return results
+
+
+@case("find_by_subject")
+def bench_find_by_subject(rng: random.Random, scale: int, args) -> Dict[str, tuple]:
+    results = {}
+    for shape in ("deep", "wide"):
+        root, _, subjects = build_tree(shape, scale, rng)
+        queries = [rng.choice(subjects) for _ in range(min(scale, MAX_SLOW_OPS))]
+
+        def run():
+            for subject in queries:
+                root.find_by_subject(subject)
+
+        results[shape] = (len(queries), timed(run))
+    return results
+
+
+@case("move_message")
+def bench_move_message(rng: random.Random, scale: int, args) -> Dict[str, tuple]:
+    results = {}
+    for shape in ("deep", "wide"):
+        root, _, subjects = build_tree(shape, scale, rng)
+        target = Folder("Destino")
+        root.add_folder(target)
+        moves = rng.sample(subjects, min(scale, MAX_SLOW_OPS))
+
+        def run():
+            for subject in moves:
+                root.move_message(subject, target)
+
+        results[shape] = (len(moves), timed(run))
+    return results
+
+
+@case("get_folder")
+def bench_get_folder(rng: random.Random, scale: int, args) -> Dict[str, tuple]:
+    """User.get_folder sobre 'scale' carpetas (árbol de aridad 10)."""
+    user = User("bob")
+    paths = []
+    for i in range(scale):
+        parent = paths[(i - 1) // 10] if i >= 10 else None
+        path = f"{parent}/c{i}" if parent else f"c{i}"
+        paths.append(path)
+        user.create_folder(path)
+
+    ops = min(scale, MAX_FAST_OPS)
+    names = [rng.choice(paths) for _ in range(ops)]
+
+    def by_name():
+        for path in names:
+            user.get_folder(path.rsplit("/", 1)[-1])
+
+    def by_path():
+        for path in names:
+            user.get_folder(path)
+
+    return {"name": (ops, timed(by_name)), "path": (ops, timed(by_path))}
+
+
+@case("deliver_bfs")
+def bench_deliver_bfs(rng: random.Random, scale: int, args) -> Dict[str, tuple]:
+    results = {}
+    for kind in ("random", "chain", "clustered"):
+        server = build_graph(kind, scale, rng)
+        pairs = [(f"u{rng.randrange(scale)}", f"u{rng.randrange(scale)}")
+                 for _ in range(min(scale, MAX_SLOW_OPS))]
+        messages = [Message(a, b, "hola", "") for a, b in pairs]
+
+        def run():
+            for (_, receiver), msg in zip(pairs, messages):
+                server._deliver_via_bfs(receiver, msg)
+
+        results[kind] = (len(pairs), timed(run))
+    return results
+
+
+@case("urgent_queue")
+def bench_urgent_queue(rng: random.Random, scale: int, args) -> Dict[str, tuple]:
+    """
+    UrgentQueue, que reemplazó al HeapSort completo de
+    _heap_sort_urgent_queue: push de 'scale' mensajes, top(10) y pop.
+    """
+    messages = [Message("a", "b", f"s{i}", "", urgent=True) for i in range(scale)]
+    rng.shuffle(messages)
+    queue = UrgentQueue()
+
+    def push():
+        for msg in messages:
+            queue.push(msg)
+
+    ops = min(scale, MAX_FAST_OPS)
+
+    def top():
+        for _ in range(ops):
+            queue.top(10)
+
+    def pop():
+        for _ in range(ops):
+            queue.pop()
+
+    return {"push": (scale, timed(push)), "top10": (ops, timed(top)), "pop": (ops, timed(pop))}
+
+
+# ===================================================================
+# EJECUCIÓN Y COMPARACIÓN
+# ===================================================================
+def run_suite(names: List[str], scales: List[int], args) -> List[dict]:
+    results = []
+    for name in names:
+        for scale in scales:
+            best: Dict[str, tuple] = {}
+            for _ in range(args.repeat):
+                # Misma semilla en cada repetición: mismos datos.
+                rng = random.Random(args.seed ^ zlib.crc32(f"{name}:{scale}".encode()))
+                for variant, (ops, seconds) in CASES[name](rng, scale, args).items():
+                    if variant not in best or seconds < best[variant][1]:
+                        best[variant] = (ops, seconds)
+            for variant, (ops, seconds) in best.items():
+                row = {
+                    "case": name,
+                    "variant": variant,
+                    "scale": scale,
+                    "ops": ops,
+                    "seconds": seconds,
+                    "us_per_op": seconds / ops * 1e6 if ops else 0.0,
+                }
+                results.append(row)
+                print(f"{name:16} {variant:14} {scale:>9}  {row['us_per_op']:12.2f} µs/op  ({ops} ops)")
+    return results
+
+
+def metadata(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "filters": args.filters,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results: List[dict], baseline_path: str, threshold: float) -> int:
+    """
+    Compara contra un JSON anterior; devuelve la cantidad de regresiones
+    (casos más lentos que la base por más de 'threshold').
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["case"], r["variant"], r["scale"]): r["us_per_op"] for r in baseline["results"]}
+
+    regressions = 0
+    print(f"\nComparación con {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    for row in results:
+        key = (row["case"], row["variant"], row["scale"])
+        if key not in old or not old[key]:
+            continue
+        ratio = row["us_per_op"] / old[key]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  ⚠ REGRESIÓN"
+            regressions += 1
+        print(f"{key[0]:16} {key[1]:14} {key[2]:>9}  x{ratio:6.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES))
+    parser.add_argument("--filters", type=int, nargs="+", default=[0, 16, 256],
+                        help="cantidades de filtros para send/receive")
+    parser.add_argument("--repeat", type=int, default=3, help="repeticiones (se toma la mejor)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", help="archivo JSON de resultados")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="tolerancia antes de marcar una regresión (0.20 = 20%%)")
+    args = parser.parse_args()
+
+    # find_by_subject y move_message son recursivos sobre la cadena "deep".
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10_000))
+
+    results = run_suite(args.cases, args.scales, args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"meta": metadata(args), "results": results}, f, indent=2)
+        print(f"\nResultados guardados en {args.out}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# engine/async_delivery.py
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from models.mail_server import MailServer
+
+
+class DeliveryJob:
+    """Un mensaje en tránsito por el pipeline de entrega."""
+
+    __slots__ = ("receiver", "message", "future", "user", "folder", "started")
+
+    def __init__(self, receiver: str, message, future: asyncio.Future):
+        self.receiver = receiver
+        self.message = message
+        self.future = future
+        self.user = None
+        self.folder = None
+        self.started = time.perf_counter()
+
+
+class AsyncDeliveryEngine:
+    """
+    Motor de entrega asíncrono (asyncio) alrededor de un MailServer.
+
+    La entrega se divide en tres etapas, conectadas por colas acotadas:
+
+        submit() → [ruteo] → cola → [filtros] → cola → [inserción] → future
+
+    - ruteo: MailServer.resolve_receiver() calcula la ruta y resuelve el
+      usuario destino (con la entrega local de respaldo).
+    - filtros: User.classify() elige la carpeta destino.
+    - inserción: User.store() guarda el mensaje y resuelve el future.
+
+    El trabajo de cada etapa (BFS, filtros, inserción) corre en un hilo con
+    asyncio.to_thread, así que no bloquea el event loop; los usuarios y el
+    servidor se protegen con sus propios locks. Cada etapa tiene 'workers'
+    consumidores sobre su cola, así que hasta 'workers' mensajes avanzan a
+    la vez en cada etapa (el orden de llegada entre ellos no se garantiza).
+    Los futures, los contadores y las métricas de envío
+    (MailServer.record_send) se actualizan en el loop.
+
+    Contrapresión: si una cola está llena, la etapa anterior espera; si la
+    primera cola está llena, submit() espera. Así la memoria en tránsito
+    queda acotada por 3 × (queue_size + workers) mensajes.
+
+    La API sincrónica es una envoltura delgada de las mismas etapas:
+    MailServer.send_message() llama en línea a resolve_receiver() y a
+    User.receive() (classify() + store()).
+    """
+
+    def __init__(self, server: MailServer, queue_size: int = 1024, workers: int = 4):
+        self.server = server
+        self.queue_size = queue_size
+        self.workers = workers
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._started_at: Optional[float] = None
+        # Contadores
+        self.submitted = 0
+        self.delivered = 0
+        self.failed = 0
+        self._peak_depth: Dict[str, int] = {}
+
+    # ===================================================================
+    # CICLO DE VIDA
+    # ===================================================================
+    async def start(self):
+        """Crea las colas y lanza 'workers' tareas por etapa."""
+        if self._tasks:
+            return
+        stages = (
+            ("route", self._route_stage, "filter"),
+            ("filter", self._filter_stage, "insert"),
+            ("insert", self._insert_stage, None),
+        )
+        for name, _, _ in stages:
+            self._queues[name] = asyncio.Queue(maxsize=self.queue_size)
+            self._peak_depth[name] = 0
+        for name, stage, next_name in stages:
+            for i in range(self.workers):
+                task = asyncio.create_task(
+                    self._run_stage(name, stage, next_name), name=f"delivery-{name}-{i}"
+                )
+                self._tasks.append(task)
+        self._started_at = time.perf_counter()
+
+    async def drain(self):
+        """Espera a que se procesen todos los mensajes enviados hasta ahora."""
+        for name in ("route", "filter", "insert"):
+            await self._queues[name].join()
+
+    async def stop(self):
+        """Procesa lo pendiente y detiene las etapas."""
+        if not self._tasks:
+            return
+        await self.drain()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # ===================================================================
+    # API PÚBLICA
+    # ===================================================================
+    async def submit(self, receiver: str, message) -> asyncio.Future:
+        """
+        Encola un mensaje para 'receiver' y devuelve un future que se
+        resuelve con True (entregado) o False (destinatario inexistente).
+        Espera sólo si la cola de entrada está llena (contrapresión).
+        """
+        if not self._tasks:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._put("route", DeliveryJob(receiver, message, future))
+        self.submitted += 1
+        return future
+
+    async def send(self, receiver: str, message) -> bool:
+        """Envía y espera el resultado de la entrega."""
+        return await (await self.submit(receiver, message))
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Contadores del pipeline: mensajes enviados, entregados y fallidos,
+        mensajes en tránsito, profundidad actual y máxima de cada cola y
+        throughput (entregas por segundo desde start()).
+        """
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        done = self.delivered + self.failed
+        result: Dict[str, float] = {
+            "submitted": self.submitted,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "in_flight": self.submitted - done,
+            "throughput_per_s": done / elapsed if elapsed else 0.0,
+        }
+        for name, queue in self._queues.items():
+            result[f"{name}_queue_depth"] = queue.qsize()
+            result[f"{name}_queue_peak"] = self._peak_depth[name]
+        return result
+
+    # ===================================================================
+    # ETAPAS
+    # ===================================================================
+    async def _put(self, name: str, job: DeliveryJob):
+        queue = self._queues[name]
+        await queue.put(job)
+        if queue.qsize() > self._peak_depth[name]:
+            self._peak_depth[name] = queue.qsize()
+
+    async def _run_stage(self, name: str, stage, next_name: Optional[str]):
+        queue = self._queues[name]
+        while True:
+            job = await queue.get()
+            try:
+                if not job.future.done():
+                    await stage(job)
+                    if next_name is not None and not job.future.done():
+                        await self._put(next_name, job)
+            except Exception as exc:
+                self._finish(job, False, exc)
+            finally:
+                queue.task_done()
+
+    async def _route_stage(self, job: DeliveryJob):
+        job.user = await asyncio.to_thread(self.server.resolve_receiver, job.receiver, job.message)
+        if job.user is None:
+            self._finish(job, False)
+
+    async def _filter_stage(self, job: DeliveryJob):
+        job.folder = await asyncio.to_thread(job.user.classify, job.message)
+
+    async def _insert_stage(self, job: DeliveryJob):
+        await asyncio.to_thread(job.user.store, job.message, job.folder)
+        self._finish(job, True)
+
+    def _finish(self, job: DeliveryJob, delivered: bool, exc: Optional[BaseException] = None):
+        """Cuenta el resultado, lo informa a las métricas y resuelve el future."""
+        if delivered:
+            self.delivered += 1
+        else:
+            self.failed += 1
+        self.server.record_send(job.receiver, time.perf_counter() - job.started, delivered)
+        if job.future.done():
+            return
+        if exc is None:
+            job.future.set_result(delivered)
+        else:
+            job.future.set_exception(exc)
@@ -0,0 +1,156 @@
+# engine/service.py
+from typing import Dict, Iterable, List, Optional
+
+from models.folder import Folder
+from models.mail_server import MailServer
+from models.message import Message
+from models.user import User
+from storage.engine import StorageEngine
+
+
+class MailService:
+    """
+    Fachada del motor de correo, sin interfaz gráfica.
+
+    Reúne en una sola clase lo que la GUI hace sobre MailServer, User y
+    StorageEngine, para poder usar el motor desde scripts, pruebas de carga
+    o un servidor. No importa tkinter: importar este módulo sólo carga los
+    modelos y la persistencia.
+
+    Las operaciones reciben el nombre del usuario que actúa; si ese usuario
+    no existe se lanza KeyError. Los resultados siguen las reglas del
+    modelo (True/False por entrega, None si algo no se encuentra).
+
+    Uso:
+        with MailService.open("data") as mail:
+            mail.register("ana")
+            mail.send("ana", "beto", "Hola", "¿Cómo va?")
+            mail.inbox("beto")
+    """
+
+    def __init__(self, server: MailServer, storage: Optional[StorageEngine] = None):
+        self.server = server
+        self.storage = storage
+
+    @classmethod
+    def open(cls, directory: str, server_name: str = "Server1", **options) -> "MailService":
+        """Recupera el estado guardado en el directorio (ver StorageEngine)."""
+        storage = StorageEngine.open(directory, server_name=server_name, **options)
+        return cls(storage.server, storage)
+
+    @classmethod
+    def in_memory(cls, server_name: str = "Server1") -> "MailService":
+        """Servicio sin persistencia: el estado se pierde al cerrar."""
+        return cls(MailServer(server_name))
+
+    def close(self):
+        """Cierra la persistencia (si la hay). El servidor sigue utilizable en memoria."""
+        if self.storage is not None:
+            self.storage.close()
+            self.storage = None
+
+    def __enter__(self) -> "MailService":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ===================================================================
+    # USUARIOS Y RED
+    # ===================================================================
+    def register(self, name: str) -> bool:
+        """Registra un usuario; False si ya existía."""
+        return self.server.register_user(name)
+
+    def connect(self, a: str, b: str):
+        self.server.connect(a, b)
+
+    def user(self, name: str) -> Optional[User]:
+        """Usuario con ese nombre (el "login"), o None."""
+        return self.server.users.get(name)
+
+    def user_names(self) -> List[str]:
+        return sorted(self.server.users)
+
+    def _user(self, name: str) -> User:
+        user = self.server.users.get(name)
+        if user is None:
+            raise KeyError(f"Usuario desconocido: {name}")
+        return user
+
+    # ===================================================================
+    # MENSAJES
+    # ===================================================================
+    def send(self, sender: str, to, subject: str, body: str, urgent: bool = False,
+             cc: Iterable[str] = (), bcc: Iterable[str] = ()) -> Dict[str, bool]:
+        """
+        Envía un mensaje a uno o varios destinatarios (Para, CC y CCO).
+        Devuelve {destinatario: entregado}.
+        """
+        user = self._user(sender)
+        to = [to] if isinstance(to, str) else list(to)
+        cc, bcc = list(cc), list(bcc)
+        if len(to) == 1 and not cc and not bcc:
+            return {to[0]: user.send(self.server, to[0], subject, body, urgent)}
+        return user.send_many(self.server, to, subject, body, urgent, cc=cc, bcc=bcc)
+
+    def folder(self, name: str, path: str = "Inbox") -> Optional[Folder]:
+        """Carpeta del usuario por nombre o ruta ("Work/Projects")."""
+        return self._user(name).get_folder(path)
+
+    def inbox(self, name: str, offset: int = 0, limit: int = 50) -> List[Message]:
+        """Una página de la bandeja de entrada (urgentes primero, luego los más nuevos)."""
+        return self._user(name).inbox.page("urgent", offset, limit)
+
+    def page(self, name: str, path: str, view: str = "urgent", offset: int = 0,
+             limit: int = 50) -> List[Message]:
+        """Una página de cualquier carpeta; lista vacía si la carpeta no existe."""
+        folder = self.folder(name, path)
+        return folder.page(view, offset, limit) if folder is not None else []
+
+    def search(self, name: str, query: str, path: Optional[str] = None,
+               limit: Optional[int] = 50) -> List[Message]:
+        """Búsqueda de texto completo, opcionalmente dentro de una carpeta (y su subárbol)."""
+        user = self._user(name)
+        folder = user.get_folder(path) if path else None
+        if path and folder is None:
+            return []
+        return user.search(query, folder, limit)
+
+    def move(self, name: str, message_id: int, target: str) -> bool:
+        return self._user(name).move_message_by_id(message_id, target)
+
+    def delete(self, name: str, message_id: int) -> bool:
+        return self._user(name).delete_message(message_id)
+
+    def toggle_urgent(self, name: str, message_id: int) -> bool:
+        """Alterna la urgencia de un mensaje del usuario; False si no lo tiene."""
+        message = self._user(name).find_message(message_id)
+        if message is None:
+            return False
+        message.toggle_urgent()
+        return True
+
+    def top_urgent(self, name: str, k: int = 10) -> List[Message]:
+        return self._user(name).top_urgent(k)
+
+    # ===================================================================
+    # CARPETAS Y FILTROS
+    # ===================================================================
+    def create_folder(self, name: str, path: str) -> Folder:
+        return self._user(name).create_folder(path)
+
+    def add_filter(self, name: str, keyword: str, folder_name: str):
+        self._user(name).add_filter(keyword, folder_name)
+
+    # ===================================================================
+    # IMPORTACIÓN
+    # ===================================================================
+    def import_mail(self, name: str, path: str, **options) -> Dict[str, float]:
+        """
+        Importa un archivo mbox o un directorio Maildir al buzón del usuario
+        (ver storage/mail_import.py); devuelve los contadores del importador.
+        """
+        # Import diferido: el paquete email sólo hace falta al importar.
+        from storage.mail_import import MailImporter
+        return MailImporter(self._user(name), **options).import_path(path)
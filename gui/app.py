@@ -0,0 +1,1318 @@
+# gui/app.py
+from bisect import bisect_left, bisect_right, insort
+import queue
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox, scrolledtext
+
+from engine.service import MailService
+
+
+# ===================================================================
+# APLICACIÓN PRINCIPAL
+# ===================================================================
+class MailClientGUI:
+    """
+    Ventana principal: muestra una pantalla (frame) a la vez.
+
+    Para que la primera ventana aparezca cuanto antes:
+    - Cada pantalla se construye recién la primera vez que se pide
+      (propiedades start_frame, login_frame, ...); al arrancar sólo existe
+      la de bienvenida.
+    - El estado guardado se recupera recién cuando la ventana ya se
+      mostró (primer evento <Map> de la raíz); si alguien necesita el
+      servidor antes, se recupera en ese momento.
+    """
+
+    def __init__(self, root, data_dir):
+        self.root = root
+        self.root.title("Cliente Correo")
+        self.root.geometry("1440x800")
+        self.root.minsize(900, 500)
+
+        self.data_dir = data_dir
+        self._service = None
+        self._frames = {}
+        self.current_user = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.show_frame(self.start_frame)
+        self._map_binding = self.root.bind("<Map>", self._on_first_map, add="+")
+
+    # ---------------------
+    # MOTOR (RECUPERACIÓN DIFERIDA)
+    # ---------------------
+    @property
+    def service(self):
+        # El estado se recupera de disco (instantánea + cola de la bitácora).
+        return self._open_service()
+
+    @property
+    def server(self):
+        return self.service.server
+
+    def _on_first_map(self, event):
+        if event.widget is self.root:
+            self.root.unbind("<Map>", self._map_binding)
+            # after(1): deja que se procesen el Expose y el redibujado antes.
+            self.root.after(1, self._open_service)
+
+    def _open_service(self):
+        if self._service is None:
+            self._service = MailService.open(self.data_dir, server_name="Server1")
+        return self._service
+
+    # ---------------------
+    # PANTALLAS (CONSTRUCCIÓN DIFERIDA)
+    # ---------------------
+    def _frame(self, cls):
+        frame = self._frames.get(cls)
+        if frame is None:
+            frame = self._frames[cls] = cls(self)
+        return frame
+
+    @property
+    def start_frame(self):
+        return self._frame(StartFrame)
+
+    @property
+    def login_frame(self):
+        return self._frame(LoginFrame)
+
+    @property
+    def register_frame(self):
+        return self._frame(RegisterFrame)
+
+    @property
+    def main_frame(self):
+        return self._frame(MainMailFrame)
+
+    @property
+    def compose_frame(self):
+        return self._frame(ComposeFrame)
+
+    def show_frame(self, frame):
+        for f in self._frames.values():
+            f.frame.pack_forget()
+
+        # Mostrar el frame seleccionado
+        frame.frame.pack(fill="both", expand=True)
+
+        # Si se muestra el main y hay usuario logueado, refrescar su vista
+        if frame is self._frames.get(MainMailFrame) and self.current_user:
+            self.main_frame.refresh_on_login()
+
+    def logout(self):
+        self.current_user = None
+        self.main_frame.watch_user(None)
+        self.show_frame(self.start_frame)
+
+    def on_close(self):
+        main_frame = self._frames.get(MainMailFrame)
+        if main_frame is not None:
+            main_frame.searcher.shutdown()
+            main_frame.watch_user(None)
+        if self._service is not None:
+            self._service.close()
+        self.root.destroy()
+
+
+# ===================================================================
+# BASE
+# ===================================================================
+class BaseFrame:
+    def __init__(self, app):
+        self.app = app
+        self.frame = ttk.Frame(app.root)
+
+
+# ===================================================================
+# START
+# ===================================================================
+class StartFrame(BaseFrame):
+    def __init__(self, app):
+        super().__init__(app)
+        ttk.Label(self.frame, text="Bienvenido", font=("Arial", 28)).pack(pady=40)
+
+        ttk.Button(
+            self.frame,
+            text="Login",
+            width=20,
+            command=lambda: app.show_frame(app.login_frame),
+        ).pack(pady=10)
+
+        ttk.Button(
+            self.frame,
+            text="Registrar usuario",
+            width=20,
+            command=lambda: app.show_frame(app.register_frame),
+        ).pack(pady=10)
+
+
+# ===================================================================
+# REGISTRO
+# ===================================================================
+class RegisterFrame(BaseFrame):
+    def __init__(self, app):
+        super().__init__(app)
+
+        ttk.Label(self.frame, text="Registrar Usuario", font=("Arial", 20)).pack(
+            pady=20
+        )
+
+        self.username = ttk.Entry(self.frame, width=30)
+        self.username.pack(pady=5)
+        self.username.insert(0, "Usuario")
+
+        ttk.Button(self.frame, text="Crear", command=self.register).pack(pady=10)
+        ttk.Button(
+            self.frame,
+            text="Volver",
+            command=lambda: app.show_frame(app.start_frame),
+        ).pack()
+
+    def register(self):
+        name = self.username.get().strip()
+        if not name:
+            messagebox.showerror("Error", "Ingrese un usuario válido.")
+            return
+
+        ok = self.app.server.register_user(name)
+
+        if ok:
+            messagebox.showinfo("Registro", f"Usuario '{name}' creado.")
+            self.app.show_frame(self.app.start_frame)
+        else:
+            messagebox.showerror("Error", f"El usuario '{name}' ya existe.")
+
+
+# ===================================================================
+# LOGIN
+# ===================================================================
+class LoginFrame(BaseFrame):
+    def __init__(self, app):
+        super().__init__(app)
+
+        ttk.Label(self.frame, text="Iniciar Sesión", font=("Arial", 20)).pack(
+            pady=20
+        )
+
+        self.username = ttk.Entry(self.frame, width=30)
+        self.username.pack(pady=5)
+        self.username.insert(0, "Usuario")
+
+        ttk.Button(self.frame, text="Ingresar", command=self.login).pack(pady=10)
+        ttk.Button(
+            self.frame,
+            text="Volver",
+            command=lambda: app.show_frame(app.start_frame),
+        ).pack()
+
+    def login(self):
+        name = self.username.get().strip()
+        user = self.app.server.users.get(name)
+
+        if user:
+            self.app.current_user = user
+            # cuando hacemos login, reconstruimos árbol y filtros
+            self.app.main_frame.refresh_on_login()
+            self.app.show_frame(self.app.main_frame)
+        else:
+            messagebox.showerror("Error", "Usuario no encontrado.")
+
+
+# ===================================================================
+# LISTA DE MENSAJES VIRTUALIZADA
+# ===================================================================
+class MessageListView:
+    """
+    Lista de mensajes sobre un ttk.Treeview que sólo materializa las filas
+    visibles más un margen arriba y abajo.
+
+    Dos fuentes posibles:
+    - una carpeta (show_folder): las filas salen de Folder.page(), que ya
+      mantiene la vista ordenada (urgentes primero, más nuevos primero);
+      mostrar una ventana cuesta O(filas visibles).
+    - una lista arbitraria (set_messages, p. ej. resultados de búsqueda):
+      se guarda como lista ordenada de claves (urgentes primero, luego el
+      orden recibido) y se mantiene con bisect.
+
+    - La barra de desplazamiento representa la lista completa: al moverla
+      se cambia la ventana de filas materializadas.
+    - Los cambios (alta, baja, cambio de prioridad) se aplican al Treeview
+      como diferencias: sólo se insertan, quitan o actualizan las filas
+      afectadas de la ventana.
+    """
+
+    def __init__(self, tree, scrollbar, margin=60):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.margin = margin
+        self._folder = None      # carpeta mostrada (None: lista propia)
+        self._view = "urgent"
+        self._keys = []          # claves ordenadas: (rango, posición, id)
+        self._key_of = {}        # id → clave
+        self._messages = {}      # id → Message
+        self._next_pos = 0
+        self._top = 0            # índice de la primera fila visible
+        self._window = (0, 0)    # rango [inicio, fin) materializado
+        self._rendered = {}      # iid → valores mostrados
+        self._render_pending = False
+
+        tree.configure(yscrollcommand=self._on_tree_scroll)
+        scrollbar.configure(command=self._on_scrollbar)
+
+    def __len__(self):
+        if self._folder is not None:
+            return self._folder.message_count
+        return len(self._keys)
+
+    def __contains__(self, message_id):
+        if self._folder is not None:
+            return self._folder.get_message(message_id) is not None
+        return message_id in self._key_of
+
+    # ---------------------
+    # MODELO
+    # ---------------------
+    def show_folder(self, folder, view="urgent"):
+        """Muestra una carpeta usando una de sus vistas ordenadas."""
+        self._folder = folder
+        self._view = view
+        self._keys = []
+        self._key_of = {}
+        self._messages = {}
+        self._top = 0
+        self._schedule_render()
+
+    def set_messages(self, messages):
+        """
+        Reemplaza el contenido por una lista propia (p. ej. resultados de
+        búsqueda): urgentes primero y, dentro de cada grupo, el orden
+        recibido (relevancia).
+        """
+        self._folder = None
+        self._keys = []
+        self._key_of = {}
+        self._messages = {}
+        self._next_pos = 0
+        for msg in messages:
+            key = self._make_key(msg)
+            self._key_of[msg.id] = key
+            self._messages[msg.id] = msg
+            self._keys.append(key)
+        self._keys.sort()
+        self._top = 0
+        self._schedule_render()
+
+    def add(self, msg):
+        if self._folder is None and msg.id not in self._key_of:
+            key = self._make_key(msg)
+            self._key_of[msg.id] = key
+            self._messages[msg.id] = msg
+            insort(self._keys, key)
+        self._schedule_render()
+
+    def remove(self, message_id):
+        key = self._key_of.pop(message_id, None)
+        if key is not None:
+            del self._messages[message_id]
+            del self._keys[bisect_left(self._keys, key)]
+        self._schedule_render()
+
+    def update(self, msg):
+        """Reubica y redibuja un mensaje cuyo estado (p. ej. prioridad) cambió."""
+        key = self._key_of.get(msg.id)
+        if key is not None:
+            new_key = (self._rank(msg), key[1], key[2])
+            if new_key != key:
+                del self._keys[bisect_left(self._keys, key)]
+                insort(self._keys, new_key)
+                self._key_of[msg.id] = new_key
+        # con una carpeta, su vista ya se reordenó sola (Folder.page)
+        self._schedule_render()
+
+    def _make_key(self, msg):
+        pos = self._next_pos
+        self._next_pos += 1
+        return (self._rank(msg), pos, msg.id)
+
+    @staticmethod
+    def _rank(msg):
+        return 0 if msg.is_urgent() else 1
+
+    def _slice(self, start, end):
+        if self._folder is not None:
+            return self._folder.page(self._view, start, end - start)
+        return [self._messages[key[2]] for key in self._keys[start:end]]
+
+    # ---------------------
+    # VENTANA VISIBLE
+    # ---------------------
+    def index_of(self, message_id):
+        if self._folder is not None:
+            return self._folder.position(self._view, message_id)
+        key = self._key_of.get(message_id)
+        return None if key is None else bisect_left(self._keys, key)
+
+    def see(self, message_id):
+        """Desplaza la ventana para que el mensaje quede visible."""
+        index = self.index_of(message_id)
+        if index is not None:
+            self._top = max(0, index - self._visible_rows() // 2)
+            self.render()
+            self.tree.see(str(message_id))
+
+    def _visible_rows(self):
+        return int(self.tree.cget("height"))
+
+    def _schedule_render(self):
+        # Varias modificaciones seguidas se aplican juntas en un solo render.
+        if not self._render_pending:
+            self._render_pending = True
+            self.tree.after_idle(self.render)
+
+    def render(self):
+        """Materializa [top - margen, top + visibles + margen) aplicando diferencias."""
+        self._render_pending = False
+        total = len(self)
+        rows = self._visible_rows()
+        self._top = max(0, min(self._top, total - rows))
+        start = max(0, self._top - self.margin)
+        end = min(total, self._top + rows + self.margin)
+        self._window = (start, end)
+
+        tree = self.tree
+        window = self._slice(start, end)
+        desired = [str(msg.id) for msg in window]
+        wanted = set(desired)
+        stale = [iid for iid in tree.get_children("") if iid not in wanted]
+        if stale:
+            tree.delete(*stale)
+            for iid in stale:
+                del self._rendered[iid]
+
+        current = list(tree.get_children(""))
+        for index, (iid, msg) in enumerate(zip(desired, window)):
+            values = self._values(msg)
+            if iid not in self._rendered:
+                tree.insert("", index, iid=iid, values=values)
+                current.insert(index, iid)
+            else:
+                if current[index] != iid:
+                    tree.move(iid, "", index)
+                    current.remove(iid)
+                    current.insert(index, iid)
+                if self._rendered[iid] != values:
+                    tree.item(iid, values=values)
+            self._rendered[iid] = values
+
+        if end > start:
+            tree.yview_moveto((self._top - start) / (end - start))
+        self._update_scrollbar()
+
+    @staticmethod
+    def _values(msg):
+        return ("↗" if msg.is_urgent() else "", msg.sender, msg.subject)
+
+    def _update_scrollbar(self):
+        total = len(self)
+        if not total:
+            self.scrollbar.set(0, 1)
+            return
+        rows = self._visible_rows()
+        self.scrollbar.set(self._top / total, min(1.0, (self._top + rows) / total))
+
+    def _on_tree_scroll(self, first, last):
+        # El Treeview se desplazó solo (rueda del mouse, teclado) dentro de
+        # la ventana materializada: se actualiza la fila superior global y,
+        # si se acerca al borde del margen, se corre la ventana.
+        start, end = self._window
+        if end <= start:
+            self._update_scrollbar()
+            return
+        self._top = start + round(float(first) * (end - start))
+        self._update_scrollbar()
+        rows = self._visible_rows()
+        near_top = start > 0 and self._top - start < self.margin // 2
+        near_end = end < len(self) and end - (self._top + rows) < self.margin // 2
+        if near_top or near_end:
+            self._schedule_render()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        total = len(self)
+        rows = self._visible_rows()
+        if action == "moveto":
+            self._top = int(float(amount) * total)
+        elif action == "scroll":
+            step = rows if unit == "pages" else 1
+            self._top += int(amount) * step
+        self.render()
+
+
+# ===================================================================
+# BÚSQUEDA EN SEGUNDO PLANO
+# ===================================================================
+class SearchExecutor:
+    """
+    Ejecuta búsquedas en un hilo de trabajo para no bloquear el mainloop.
+
+    - Debounce: cada tecla reprograma la búsqueda; sólo se ejecuta cuando
+      pasan delay_ms sin cambios.
+    - Cancelación: una búsqueda nueva invalida a las anteriores (las que
+      todavía esperan en la cola se cancelan, y el resultado de la que ya
+      está corriendo se descarta).
+    - Los resultados vuelven al hilo de Tk por una cola que se consulta con
+      root.after; on_result(resultado, segundos) recibe también la latencia
+      de la consulta.
+    """
+
+    def __init__(self, widget, on_result, delay_ms=200, poll_ms=25):
+        self.widget = widget
+        self.on_result = on_result
+        self.delay_ms = delay_ms
+        self.poll_ms = poll_ms
+        # Import diferido: concurrent.futures arrastra logging y sólo hace
+        # falta después del login.
+        from concurrent.futures import ThreadPoolExecutor
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+        self._results = queue.Queue()
+        self._generation = 0
+        self._after_id = None
+        self._future = None
+        self._polling = False
+
+    def submit(self, fn, *args):
+        """Programa fn(*args) con debounce, descartando lo pendiente."""
+        self.cancel()
+        generation = self._generation
+        self._after_id = self.widget.after(self.delay_ms, self._start, generation, fn, args)
+
+    def cancel(self):
+        """Invalida la búsqueda programada y la que esté en curso."""
+        self._generation += 1
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    def shutdown(self):
+        self.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _start(self, generation, fn, args):
+        self._after_id = None
+        self._future = self._pool.submit(self._run, generation, fn, args)
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def _run(self, generation, fn, args):
+        # Hilo de trabajo: no toca widgets, sólo deja el resultado en la cola.
+        if generation != self._generation:
+            return
+        started = time.perf_counter()
+        result = fn(*args)
+        self._results.put((generation, result, time.perf_counter() - started))
+
+    def _poll(self):
+        while True:
+            try:
+                generation, result, elapsed = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self._generation:
+                self._future = None
+                self.on_result(result, elapsed)
+
+        if self._future is not None or self._after_id is not None:
+            self.widget.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+
+class FolderEventRelay:
+    """
+    Lleva los eventos del árbol de un usuario (Folder.subscribe) al hilo de Tk.
+
+    Las entregas pueden llegar desde hilos de trabajo (MailServer con varios
+    hilos, AsyncDeliveryEngine), y Tk sólo se puede tocar desde el mainloop.
+    Desde otro hilo el evento sólo se encola; el hilo de Tk vacía la cola
+    con root.after cada poll_ms, igual que SearchExecutor con sus resultados.
+    Un evento generado en el propio hilo de Tk se procesa en el acto (antes,
+    los que ya estaban en cola, para conservar el orden).
+    """
+
+    def __init__(self, widget, callback, poll_ms=50):
+        self.widget = widget
+        self.callback = callback
+        self.poll_ms = poll_ms
+        self._tk_thread = threading.get_ident()
+        self._events = queue.Queue()
+        self._user = None
+        self._after_id = None
+
+    def attach(self, user):
+        """Escucha el árbol de 'user' (None: deja de escuchar)."""
+        if self._user is not None:
+            self._user.root.unsubscribe(self.put)
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        # Lo pendiente del usuario anterior ya no aplica.
+        self._events = queue.Queue()
+        self._user = user
+        if user is not None:
+            user.root.subscribe(self.put)
+            self._after_id = self.widget.after(self.poll_ms, self._poll)
+
+    def put(self, event, folder, message):
+        """Callback de Folder.subscribe: puede llamarse desde cualquier hilo."""
+        if threading.get_ident() == self._tk_thread:
+            self._drain()
+            self.callback(event, folder, message)
+        else:
+            self._events.put((event, folder, message))
+
+    def _drain(self):
+        while True:
+            try:
+                event, folder, message = self._events.get_nowait()
+            except queue.Empty:
+                return
+            self.callback(event, folder, message)
+
+    def _poll(self):
+        self._drain()
+        self._after_id = self.widget.after(self.poll_ms, self._poll)
+
+
+# ===================================================================
+# ÁRBOL DE CARPETAS INCREMENTAL
+# ===================================================================
+class FolderTreeView:
+    """
+    Árbol de carpetas del usuario sobre un ttk.Treeview, actualizado por
+    eventos en lugar de reconstruirse.
+
+    - Se arma una sola vez al iniciar sesión; después escucha los eventos
+      del árbol del usuario (Folder.subscribe).
+    - "folder_added" inserta sólo el nodo nuevo (y su subárbol) en su
+      posición alfabética entre los hermanos.
+    - Los cambios de mensajes sólo actualizan el texto de las carpetas
+      afectadas y sus ancestros: "nombre (total)" más los no vistos, leídos
+      de los contadores agregados de Folder (O(1), sin recorrer el árbol).
+      Se agrupan en un único paso con after_idle.
+    - La lista de nombres para el diálogo "Mover" se cachea y se invalida
+      cuando aparece una carpeta nueva.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._user = None
+        self._iids = {}          # Folder → iid
+        self._folders = {}       # iid → Folder
+        self._names = None       # caché de folder_names()
+        self._dirty = set()
+        self._flush_pending = False
+        self._events = FolderEventRelay(tree, self._on_event)
+
+    def attach(self, user):
+        """Muestra el árbol de 'user' (None: sólo la raíz vacía)."""
+        self._events.attach(None)
+        self._user = user
+        self._iids.clear()
+        self._folders.clear()
+        self._dirty.clear()
+        self._names = None
+        self.tree.delete(*self.tree.get_children(""))
+
+        if user is None:
+            self.tree.insert("", "end", "root", text="Root")
+            return
+        self._insert(user.root)
+        self.tree.item(self._iids[user.root], open=True)
+        self._events.attach(user)
+
+    def folder_names(self):
+        """Nombres de carpeta sin repetir (sin distinguir mayúsculas), en orden del árbol."""
+        if self._names is None:
+            names = []
+            seen = set()
+            stack = [self._user.root] if self._user else []
+            while stack:
+                folder = stack.pop()
+                if folder.name.lower() not in seen:
+                    seen.add(folder.name.lower())
+                    names.append(folder.name)
+                stack.extend(reversed(folder.subfolders))
+            self._names = names
+        return self._names
+
+    # ---------------------
+    # ACTUALIZACIÓN INCREMENTAL
+    # ---------------------
+    def _insert(self, folder):
+        if folder in self._iids:
+            return
+        parent_iid = self._iids.get(folder.parent, "") if folder.parent else ""
+        # los hermanos ya están en orden alfabético: se ubica con bisect
+        siblings = [self._folders[iid].name.lower() for iid in self.tree.get_children(parent_iid)]
+        index = bisect_right(siblings, folder.name.lower())
+        iid = f"folder-{id(folder)}"
+        self.tree.insert(parent_iid, index, iid, text=self._text(folder))
+        self._iids[folder] = iid
+        self._folders[iid] = folder
+        for sub in folder.subfolders:
+            self._insert(sub)
+
+    @staticmethod
+    def _text(folder):
+        counters = folder.counters
+        text = f"{folder.name} ({counters.total})"
+        if counters.unseen:
+            text += f" • {counters.unseen} nuevos"
+        return text
+
+    def refresh(self, folder):
+        """Actualiza el texto de la carpeta y sus ancestros (p. ej. tras mark_seen)."""
+        while folder is not None:
+            self._dirty.add(folder)
+            folder = folder.parent
+        self._schedule_flush()
+
+    def _on_event(self, event, folder, message):
+        if event == "folder_added":
+            self._insert(folder)
+            self._names = None
+            self.refresh(folder.parent)
+        elif event == "message_moved":
+            # el evento sólo informa la carpeta destino: se revisan todas
+            # (sólo se tocan los nodos cuyo texto cambió)
+            self._dirty.update(self._iids)
+            self._schedule_flush()
+        else:
+            self.refresh(folder)
+
+    def _schedule_flush(self):
+        if not self._flush_pending:
+            self._flush_pending = True
+            self.tree.after_idle(self._flush)
+
+    def _flush(self):
+        self._flush_pending = False
+        for folder in self._dirty:
+            iid = self._iids.get(folder)
+            if iid is None:
+                continue
+            text = self._text(folder)
+            if self.tree.item(iid, "text") != text:
+                self.tree.item(iid, text=text)
+        self._dirty.clear()
+
+
+# ===================================================================
+# BANDEJA - ESTILO GMAIL (mejorada con árbol y filtros)
+# ===================================================================
+class MainMailFrame(BaseFrame):
+    def __init__(self, app):
+        super().__init__(app)
+
+        container = ttk.Frame(self.frame)
+        container.pack(fill="both", expand=True)
+
+        # --------------------
+        # SIDEBAR
+        # --------------------
+        sidebar = ttk.Frame(container, width=220)
+        sidebar.pack(side="left", fill="y", padx=8, pady=8)
+
+        ttk.Label(sidebar, text="📬 MiMail", font=("Arial", 16, "bold")).pack(
+            pady=8
+        )
+
+        ttk.Button(
+            sidebar,
+            text="📥 Recibidos",
+            width=20,
+            command=lambda: self.change_folder("Inbox"),
+        ).pack(pady=4)
+        ttk.Button(
+            sidebar,
+            text="📤 Enviados",
+            width=20,
+            command=lambda: self.change_folder("Sent"),
+        ).pack(pady=4)
+        ttk.Button(
+            sidebar,
+            text="✉️ Redactar",
+            width=20,
+            command=lambda: app.show_frame(app.compose_frame),
+        ).pack(pady=10)
+
+        ttk.Separator(sidebar, orient="horizontal").pack(fill="x", pady=8)
+
+        ttk.Button(sidebar, text="🔄 Refrescar", width=20, command=self.refresh_all).pack(
+            pady=4
+        )
+
+        # --------------------
+        # Árbol de carpetas (requisito)
+        # --------------------
+        ttk.Label(sidebar, text="Carpetas:", font=("Arial", 10, "bold")).pack(
+            anchor="w", padx=6, pady=(10, 2)
+        )
+        self.folder_tree = ttk.Treeview(
+            sidebar, show="tree", selectmode="browse", height=8
+        )
+        self.folder_tree.pack(fill="x", padx=6)
+        self.folder_view = FolderTreeView(self.folder_tree)
+
+        ttk.Separator(sidebar, orient="horizontal").pack(fill="x", pady=8)
+
+        # --------------------
+        # Panel filtros automáticos (requisito)
+        # --------------------
+        ttk.Label(sidebar, text="Agregar filtro:", font=("Arial", 10, "bold")).pack(
+            anchor="w", padx=6, pady=(6, 2)
+        )
+        filter_frame = ttk.Frame(sidebar)
+        filter_frame.pack(fill="x", padx=6)
+
+        ttk.Label(filter_frame, text="Palabra:").grid(row=0, column=0, sticky="w")
+        self.filter_keyword_entry = ttk.Entry(filter_frame, width=20)
+        self.filter_keyword_entry.grid(row=0, column=1, pady=2, sticky="w")
+
+        ttk.Label(filter_frame, text="Carpeta destino:").grid(
+            row=1, column=0, sticky="w"
+        )
+        self.filter_folder_entry = ttk.Entry(filter_frame, width=20)
+        self.filter_folder_entry.grid(row=1, column=1, pady=2, sticky="w")
+
+        ttk.Button(
+            filter_frame,
+            text="Agregar filtro",
+            command=self.add_filter_from_gui,
+            width=18,
+        ).grid(row=2, column=0, columnspan=2, pady=6)
+
+        ttk.Separator(sidebar, orient="horizontal").pack(fill="x", pady=8)
+
+        # --------------------
+        # Lista de filtros activos (solo visualización)
+        # --------------------
+        ttk.Label(sidebar, text="Filtros activos:", font=("Arial", 10, "bold")).pack(
+            anchor="w", padx=6, pady=(4, 2)
+        )
+        self.filters_box = scrolledtext.ScrolledText(sidebar, height=6, width=28, state="disabled", wrap="word")
+        self.filters_box.pack(padx=6, pady=(0, 8))
+
+        ttk.Separator(sidebar, orient="horizontal").pack(fill="x", pady=8)
+        ttk.Button(sidebar, text="🚪 Cerrar sesión", width=20, command=app.logout).pack(
+            side="bottom", pady=6
+        )
+
+        # --------------------
+        # MAIN AREA
+        # --------------------
+        main_area = ttk.Frame(container)
+        main_area.pack(side="right", fill="both", expand=True, padx=8, pady=8)
+
+        # --------------------
+        # HEADER + BUSQUEDA
+        # --------------------
+        header = ttk.Frame(main_area)
+        header.pack(fill="x")
+
+        ttk.Label(header, text="Bandeja", font=("Arial", 14, "bold")).pack(
+            side="left", padx=10
+        )
+        ttk.Label(header, text="Buscar:", font=("Arial", 10)).pack(
+            side="left", padx=(20, 4)
+        )
+
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(header, textvariable=self.search_var, width=40)
+        search_entry.pack(side="left", padx=10)
+        search_entry.bind("<KeyRelease>", lambda e: self.refresh_list())
+
+        # Barra de estado (latencia de la última búsqueda)
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(main_area, textvariable=self.status_var, anchor="w").pack(
+            side="bottom", fill="x", padx=4
+        )
+
+        # --------------------
+        # SPLIT LISTA / DETALLE
+        # --------------------
+        split = ttk.Panedwindow(main_area, orient="horizontal")
+        split.pack(fill="both", expand=True, pady=8)
+
+        list_frame = ttk.Frame(split, width=700)
+        split.add(list_frame, weight=5)
+
+        columns = ("prio", "from", "subject")
+        self.tree = ttk.Treeview(
+            list_frame, columns=columns, show="headings", height=22
+        )
+
+        self.tree.heading("prio", text="↑")
+        self.tree.heading("from", text="De")
+        self.tree.heading("subject", text="Asunto")
+
+        self.tree.column("prio", width=50, anchor="center")
+        self.tree.column("from", width=180)
+        self.tree.column("subject", width=350)
+
+        self.tree.pack(fill="both", expand=True, side="left")
+
+        # La barra representa la lista completa; el Treeview sólo tiene
+        # materializadas las filas visibles (ver MessageListView).
+        vsb = ttk.Scrollbar(list_frame, orient="vertical")
+        vsb.pack(side="right", fill="y")
+        self.message_list = MessageListView(self.tree, vsb)
+
+        self.tree.bind("<<TreeviewSelect>>", self.on_select_message)
+        self.tree.bind("<Button-3>", self.on_right_click)
+
+        # PANEL DE LECTURA (más chico)
+        detail_frame = ttk.Frame(split, width=250)
+        split.add(detail_frame, weight=2)
+
+        self.meta_label = ttk.Label(
+            detail_frame, text="Seleccione un mensaje", font=("Arial", 12, "bold")
+        )
+        self.meta_label.pack(anchor="w", padx=8, pady=8)
+
+        self.body_text = scrolledtext.ScrolledText(detail_frame, wrap="word", height=8)
+        self.body_text.pack(fill="both", expand=True, padx=8, pady=(0, 8))
+        self.body_text.configure(state="disabled")
+
+        self.prio_btn = ttk.Button(
+            detail_frame, text="Marcar Prioritario ↑", state="disabled", command=self.toggle_priority
+        )
+        self.prio_btn.pack(pady=6)
+
+        # Estado
+        self.current_folder = "Inbox"
+        self.selected_id = None
+        self.watched_user = None
+        self.folder_events = FolderEventRelay(self.frame, self.on_folder_event)
+        self.searcher = SearchExecutor(self.frame, self.show_search_results)
+
+    # ---------------------
+    # COMPORTAMIENTO
+    # ---------------------
+    def change_folder(self, folder):
+        self.current_folder = folder
+        self.refresh_list()
+        self.clear_detail()
+
+    def refresh_all(self):
+        self.refresh_list()
+        self.clear_detail()
+        self.rebuild_folder_tree()
+        self.rebuild_filters_display()
+
+    def current_folder_obj(self):
+        user = self.app.current_user
+        if not user:
+            return None
+        return user.inbox if self.current_folder == "Inbox" else user.sent
+
+    def refresh_list(self):
+        user = self.app.current_user
+        if not user:
+            self.searcher.cancel()
+            self.message_list.set_messages([])
+            return
+
+        q = self.search_var.get().strip()
+        if q:
+            self.start_search(q)
+            return
+
+        # Sin búsqueda: la vista "urgentes primero, más nuevos primero" de la
+        # carpeta; cada fila usa el id del mensaje como iid.
+        self.searcher.cancel()
+        self.status_var.set("")
+        folder = self.current_folder_obj()
+        self.message_list.show_folder(folder, "urgent")
+        folder.mark_seen()
+        self.folder_view.refresh(folder)
+
+    def start_search(self, q):
+        """
+        Búsqueda con el índice invertido del usuario, en segundo plano:
+        cada palabra tecleada se toma como prefijo y la consulta se limita
+        a la carpeta actual (y sus subcarpetas). El alcance se resuelve en
+        el hilo de trabajo, después del debounce: teclear no recorre la
+        carpeta en el hilo de Tk.
+        """
+        user = self.app.current_user
+        query = " ".join(f"{word}*" for word in q.split())
+        self.searcher.submit(user.search, query, self.current_folder_obj())
+
+    def show_search_results(self, msgs, elapsed):
+        self.message_list.set_messages(msgs)
+        self.status_var.set(f"Búsqueda: {len(msgs)} resultados en {elapsed * 1000:.1f} ms")
+
+    # ---------------------
+    # CAMBIOS EN LAS CARPETAS (diferencias, sin reconstruir la lista)
+    # ---------------------
+    def watch_user(self, user):
+        """
+        Se suscribe a los cambios del árbol de carpetas del usuario (los
+        eventos llegan por el hilo de Tk, ver FolderEventRelay).
+        """
+        self.watched_user = user
+        self.folder_events.attach(user)
+        self.folder_view.attach(user)
+
+    def on_folder_event(self, event, folder, message):
+        if message is None:
+            return
+        if event == "messages_added":
+            # Lote (importación): se procesa como altas sueltas.
+            for msg in message:
+                self.on_folder_event("message_added", folder, msg)
+            return
+        current = self.current_folder_obj()
+        touches_list = folder is current or message.id in self.message_list
+        if not touches_list:
+            return
+
+        q = self.search_var.get().strip()
+        if q:
+            # Con una búsqueda activa se recalculan los resultados (con debounce)
+            self.start_search(q)
+            return
+
+        if event == "message_removed":
+            if folder is current:
+                self.message_list.remove(message.id)
+        elif folder is current:
+            self.message_list.add(message)
+        else:
+            # movido desde la carpeta actual a otra
+            self.message_list.remove(message.id)
+
+    def selected_message(self):
+        user = self.app.current_user
+        if not user or self.selected_id is None:
+            return None
+        return user.find_message(self.selected_id)
+
+    def on_select_message(self, event):
+        sel = self.tree.selection()
+        if not sel:
+            return
+        self.selected_id = int(sel[0])
+        self.show_detail(self.selected_message())
+
+    def show_detail(self, msg):
+        if msg is None:
+            self.clear_detail()
+            return
+
+        header = f"De: {msg.sender}    Para: {msg.receiver}"
+        self.meta_label.config(text=header)
+
+        self.body_text.configure(state="normal")
+        self.body_text.delete("1.0", tk.END)
+        self.body_text.insert(tk.END, f"Asunto: {msg.subject}\n\n")
+        self.body_text.insert(tk.END, msg.body)
+        self.body_text.configure(state="disabled")
+
+        self.prio_btn.configure(
+            state="normal", text="Quitar Prioridad ↘" if msg.is_urgent() else "Marcar Prioritario ↑"
+        )
+
+    def clear_detail(self):
+        self.selected_id = None
+        self.meta_label.config(text="Seleccione un mensaje")
+        self.body_text.configure(state="normal")
+        self.body_text.delete("1.0", tk.END)
+        self.body_text.configure(state="disabled")
+        self.prio_btn.configure(state="disabled", text="Marcar Prioritario ↑")
+
+    def toggle_priority(self):
+        # Alterna prioridad usando la API pública de Message
+        msg = self.selected_message()
+        if msg is None:
+            return
+        msg.toggle_urgent()
+        # sólo se reubica y redibuja esa fila
+        self.message_list.update(msg)
+        self.message_list.see(msg.id)
+        # re-seleccionar el mensaje (puede haber cambiado el orden)
+        if self.tree.exists(str(msg.id)):
+            self.tree.selection_set(str(msg.id))
+            self.show_detail(msg)
+        else:
+            self.clear_detail()
+
+    # ---------------------
+    # FUNCIONALIDAD: menú contextual para MOVER MENSAJE
+    # ---------------------
+    def on_right_click(self, event):
+        # identificar la fila bajo el cursor
+        rowid = self.tree.identify_row(event.y)
+        if not rowid:
+            return
+        # seleccionar la fila
+        self.tree.selection_set(rowid)
+        self.selected_id = int(rowid)
+
+        menu = tk.Menu(self.tree, tearoff=0)
+        menu.add_command(label="Mover a carpeta...", command=self.open_move_dialog)
+        menu.add_command(label="Marcar/Quitar prioridad", command=self.toggle_priority)
+        menu.add_command(label="Eliminar", command=self.delete_selected)
+        try:
+            menu.tk_popup(event.x_root, event.y_root)
+        finally:
+            menu.grab_release()
+
+    def delete_selected(self):
+        msg = self.selected_message()
+        if msg is None:
+            return
+        if not messagebox.askyesno("Eliminar", f"¿Eliminar el mensaje '{msg.subject}'?"):
+            return
+        # la fila y el contador de la carpeta se actualizan por el evento "message_removed"
+        self.app.current_user.delete_message(msg.id)
+        self.clear_detail()
+
+    def open_move_dialog(self):
+        if self.selected_id is None:
+            return
+
+        user = self.app.current_user
+        if not user:
+            return
+
+        # obtener lista de carpetas disponibles (nombres únicos)
+        folders = self.folder_view.folder_names()
+        if not folders:
+            messagebox.showinfo("Mover mensaje", "No hay carpetas disponibles.")
+            return
+
+        # diálogo simple
+        dlg = tk.Toplevel(self.app.root)
+        dlg.title("Mover mensaje")
+        dlg.geometry("320x120")
+        dlg.transient(self.app.root)
+        dlg.grab_set()
+
+        ttk.Label(dlg, text="Seleccionar carpeta destino:").pack(pady=(8, 6))
+
+        folder_var = tk.StringVar(value=folders[0])
+        folder_menu = ttk.OptionMenu(dlg, folder_var, folders[0], *folders)
+        folder_menu.pack(pady=(0, 8))
+
+        def do_move():
+            target = folder_var.get().strip()
+            if not target:
+                messagebox.showerror("Error", "Seleccione una carpeta válida.")
+                return
+
+            msg = self.selected_message()
+            if msg is None:
+                dlg.destroy()
+                return
+            subject = msg.subject
+
+            # Si la carpeta destino no existe en el árbol del usuario, la creamos (esto es seguro)
+            if user.get_folder(target) is None:
+                user.create_folder(target)
+
+            # El id identifica al mensaje aunque haya otros con el mismo asunto
+            ok = user.move_message_by_id(msg.id, target)
+            if ok:
+                messagebox.showinfo("Mover", f"Mensaje '{subject}' movido a '{target}'.")
+                dlg.destroy()
+                # la lista y el árbol se actualizan por el evento "message_moved"
+                self.clear_detail()
+            else:
+                messagebox.showerror("Error", "No se pudo mover el mensaje.")
+                dlg.destroy()
+
+        ttk.Button(dlg, text="Mover", command=do_move).pack(pady=(4, 8))
+
+    # ---------------------
+    # FUNCIONALIDAD: filtros desde GUI
+    # ---------------------
+    def add_filter_from_gui(self):
+        user = self.app.current_user
+        if not user:
+            messagebox.showerror("Error", "No hay usuario logueado.")
+            return
+
+        keyword = self.filter_keyword_entry.get().strip()
+        folder_name = self.filter_folder_entry.get().strip()
+
+        if not keyword or not folder_name:
+            messagebox.showerror("Error", "Ingrese palabra clave y carpeta destino.")
+            return
+
+        # Si la carpeta no existe, crearla en el árbol del usuario para que quede visible
+        if user.get_folder(folder_name) is None:
+            user.create_folder(folder_name)
+
+        user.add_filter(keyword, folder_name)
+        messagebox.showinfo("Filtro", f"Filtro agregado: '{keyword}' → '{folder_name}'")
+
+        # Limpiar entradas y actualizar árbol y lista de filtros
+        self.filter_keyword_entry.delete(0, tk.END)
+        self.filter_folder_entry.delete(0, tk.END)
+        self.rebuild_filters_display()
+
+    # ---------------------
+    # FUNCIONALIDAD: mostrar árbol de carpetas en GUI (orden alfabético)
+    # ---------------------
+    def rebuild_folder_tree(self):
+        # reconstrucción completa (al refrescar); después el árbol se
+        # actualiza solo con los eventos de carpetas (ver FolderTreeView)
+        self.folder_view.attach(self.app.current_user)
+
+    # ---------------------
+    # Mostrar filtros activos
+    # ---------------------
+    def rebuild_filters_display(self):
+        user = self.app.current_user
+        self.filters_box.configure(state="normal")
+        self.filters_box.delete("1.0", tk.END)
+        if not user:
+            self.filters_box.insert(tk.END, "(No hay usuario logueado)\n")
+            self.filters_box.configure(state="disabled")
+            return
+
+        fl = user.list_filters()
+        if not fl:
+            self.filters_box.insert(tk.END, "(Sin filtros)\n")
+        else:
+            for k, folder in fl:
+                self.filters_box.insert(tk.END, f"'{k}' → {folder}\n")
+        self.filters_box.configure(state="disabled")
+
+    # ---------------------
+    # REFRESH cuando entramos
+    # ---------------------
+    def refresh_on_login(self):
+        # llamado cuando el usuario hace login (arma el árbol y se suscribe)
+        if self.watched_user is not self.app.current_user:
+            self.watch_user(self.app.current_user)
+        self.rebuild_filters_display()
+        self.refresh_list()
+        self.clear_detail()
+
+
+# ===================================================================
+# REDACTAR
+# ===================================================================
+class ComposeFrame(BaseFrame):
+    def __init__(self, app):
+        super().__init__(app)
+
+        ttk.Label(self.frame, text="Redactar", font=("Arial", 18)).pack(pady=8)
+
+        form = ttk.Frame(self.frame)
+        form.pack(padx=12, pady=6, fill="x")
+
+        ttk.Label(form, text="Para:").grid(row=0, column=0, sticky="w")
+        self.to_entry = ttk.Entry(form, width=60)
+        self.to_entry.grid(row=0, column=1, pady=4)
+
+        # Varios destinatarios se separan con coma
+        ttk.Label(form, text="CC:").grid(row=1, column=0, sticky="w")
+        self.cc_entry = ttk.Entry(form, width=60)
+        self.cc_entry.grid(row=1, column=1, pady=4)
+
+        ttk.Label(form, text="CCO:").grid(row=2, column=0, sticky="w")
+        self.bcc_entry = ttk.Entry(form, width=60)
+        self.bcc_entry.grid(row=2, column=1, pady=4)
+
+        ttk.Label(form, text="Asunto:").grid(row=3, column=0, sticky="w")
+        self.subject_entry = ttk.Entry(form, width=60)
+        self.subject_entry.grid(row=3, column=1, pady=4)
+
+        ttk.Label(form, text="Mensaje:").grid(row=4, column=0, sticky="nw")
+        self.body_text = scrolledtext.ScrolledText(form, width=70, height=12)
+        self.body_text.grid(row=4, column=1, pady=6)
+
+        self.urgent_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            form, text="Marcar como prioritario", variable=self.urgent_var
+        ).grid(row=5, column=1, sticky="w", pady=6)
+
+        btns = ttk.Frame(self.frame)
+        btns.pack(pady=8)
+
+        ttk.Button(btns, text="Enviar", command=self.send).pack(side="left", padx=6)
+        ttk.Button(btns, text="Volver", command=lambda: app.show_frame(app.main_frame)).pack(
+            side="left", padx=6
+        )
+
+    def reset_fields(self):
+        self.to_entry.delete(0, tk.END)
+        self.cc_entry.delete(0, tk.END)
+        self.bcc_entry.delete(0, tk.END)
+        self.subject_entry.delete(0, tk.END)
+        self.body_text.delete("1.0", tk.END)
+        self.urgent_var.set(False)
+
+    def send(self):
+        user = self.app.current_user
+        if not user:
+            messagebox.showerror("Error", "No hay usuario logueado.")
+            return
+
+        to = self.split_names(self.to_entry.get())
+        cc = self.split_names(self.cc_entry.get())
+        bcc = self.split_names(self.bcc_entry.get())
+        subject = self.subject_entry.get().strip()
+        body = self.body_text.get("1.0", tk.END).strip()
+        urgent = self.urgent_var.get()
+
+        if not to or not subject:
+            messagebox.showerror("Error", "Falta destinatario o asunto.")
+            return
+
+        # Crear mensaje y enviar
+        if len(to) == 1 and not cc and not bcc:
+            ok = user.send(self.app.server, to[0], subject, body, urgent)
+        else:
+            # Un único mensaje y un único recorrido para todos los destinatarios
+            status = user.send_many(self.app.server, to, subject, body, urgent, cc=cc, bcc=bcc)
+            failed = [name for name, delivered in status.items() if not delivered]
+            ok = not failed
+            if failed and len(failed) < len(status):
+                messagebox.showwarning(
+                    "Envío parcial", "No se pudo entregar a: " + ", ".join(failed)
+                )
+                ok = True
+
+        if ok:
+            messagebox.showinfo("OK", "Mensaje enviado.")
+            # la lista y el árbol de carpetas se actualizan solos (eventos de carpeta)
+            self.app.show_frame(self.app.main_frame)
+        else:
+            # validación explícita si no se entregó
+            messagebox.showerror("Error", "No se pudo entregar el mensaje. Verifique el destinatario.")
+            # no cerramos la ventana para que el usuario corrija
+
+    @staticmethod
+    def split_names(text):
+        return [name.strip() for name in text.split(",") if name.strip()]
+
+# ===================================================================
+# ARRANQUE
+# ===================================================================
+def run(data_dir):
+    root = tk.Tk()
+    MailClientGUI(root, data_dir)
+    root.iconbitmap("./utils/letter.ico")
+    root.mainloop()
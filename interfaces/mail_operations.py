@@ -15,6 +15,7 @@ class MailOperations(ABC):
     - send(): envío de mensajes a través del servidor.
     - receive(): recepción y clasificación del mensaje.
     - list_inbox(): listado de mensajes de la bandeja principal.
+    - lock: el lock que protege su buzón (lo usa MailServer.acquire_all()).
     """
 
     # ===================================================================
@@ -42,3 +43,12 @@ class MailOperations(ABC):
         Retorna la lista de mensajes contenidos en la bandeja de entrada.
         """
         pass
+
+    @property
+    @abstractmethod
+    def lock(self):
+        """
+        Lock reentrante que protege el buzón del usuario. Quien lo tiene
+        puede leer o modificar varias carpetas sin que entre una entrega.
+        """
+        pass
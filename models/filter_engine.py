@@ -0,0 +1,253 @@
+# models/filter_engine.py
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models.search_index import term_weights
+
+# Por debajo de esta cantidad de filtros, buscar cada palabra clave con
+# `in` (implementado en C) es más rápido que recorrer el autómata en Python.
+# Ver benchmarks/bench_filters.py.
+AUTOMATON_MIN_FILTERS = 128
+
+
+class KeywordScanner:
+    """
+    Motor de filtros lineal: prueba cada palabra clave con `in`, en orden.
+    Es el algoritmo original de User._apply_filters, conveniente cuando
+    hay pocos filtros.
+    """
+
+    def __init__(self, rules: Iterable[Tuple[str, str]]):
+        self._rules: List[Tuple[str, str]] = list(rules)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def match(self, *texts: str) -> Optional[str]:
+        text = " ".join(texts)
+        for keyword, folder_name in self._rules:
+            if keyword in text:
+                return folder_name
+        return None
+
+
+class FilterAutomaton:
+    """
+    Autómata de Aho-Corasick que compila todas las palabras clave de los
+    filtros de un usuario.
+
+    En lugar de buscar cada palabra clave por separado (O(filtros × texto)),
+    el autómata recorre el texto UNA sola vez y detecta todas las palabras
+    clave que aparecen en él (O(texto)).
+
+    Semántica de los filtros:
+    ✔ Las reglas se evalúan en orden de creación.
+    ✔ Gana la primera regla cuya palabra clave aparece en el texto
+      (no la primera que aparece dentro del texto).
+    """
+
+    def __init__(self, rules: Iterable[Tuple[str, str]]):
+        """
+        rules: pares (palabra_clave, carpeta) ya en minúsculas y en orden
+        de prioridad.
+        """
+        self._folders: List[str] = []
+        # Trie: transiciones por nodo y mejor regla (menor índice) del nodo.
+        goto: List[Dict[str, int]] = [{}]
+        terminal: Dict[int, int] = {}
+
+        for keyword, folder_name in rules:
+            rule = len(self._folders)
+            self._folders.append(folder_name)
+            node = 0
+            for ch in keyword:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                node = nxt
+            terminal.setdefault(node, rule)
+
+        # "Sin coincidencia" se representa con un índice mayor que cualquier
+        # regla, así el recorrido compara un único entero por carácter.
+        self._none = len(self._folders)
+        self._best = [terminal.get(node, self._none) for node in range(len(goto))]
+        self._delta = self._build_transitions(goto)
+
+    def __len__(self) -> int:
+        return len(self._folders)
+
+    # ===================================================================
+    # CONSTRUCCIÓN
+    # ===================================================================
+    def _build_transitions(self, goto: List[Dict[str, int]]) -> List[Dict[str, int]]:
+        """
+        Calcula los enlaces de fallo con un recorrido BFS del trie y los
+        resuelve de antemano: cada nodo queda con una tabla de transiciones
+        completa para el alfabeto de las palabras clave (un AFD). Además se
+        propaga a cada nodo la regla de menor índice alcanzable por sus
+        sufijos, de modo que el recorrido nunca siga enlaces de fallo.
+
+        Los caracteres que no aparecen en ninguna palabra clave no tienen
+        transición y devuelven el autómata a la raíz.
+        """
+        best = self._best
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict() for _ in goto]
+        delta[0] = dict(goto[0])
+
+        queue = list(goto[0].values())
+        for node in queue:
+            queue.extend(goto[node].values())
+
+        for node in queue:
+            table = dict(delta[fail[node]])
+            table.update(goto[node])
+            delta[node] = table
+            for ch, child in goto[node].items():
+                fail[child] = delta[fail[node]].get(ch, 0)
+            if best[fail[node]] < best[node]:
+                best[node] = best[fail[node]]
+
+        return delta
+
+    # ===================================================================
+    # BÚSQUEDA
+    # ===================================================================
+    def match(self, *texts: str) -> Optional[str]:
+        """
+        Recorre los textos (en minúsculas) como si estuvieran unidos por un
+        espacio y devuelve la carpeta de la primera regla que coincide,
+        o None si ninguna coincide.
+        """
+        delta, best = self._delta, self._best
+        found = best[0]
+        if found:
+            node = 0
+            for ch in " ".join(texts):
+                node = delta[node].get(ch, 0)
+                if best[node] < found:
+                    found = best[node]
+                    if not found:
+                        break
+        return None if found == self._none else self._folders[found]
+
+
+def compile_filters(rules: Iterable[Tuple[str, str]]):
+    """
+    Compila las reglas (palabra_clave, carpeta) en el motor más conveniente
+    según su cantidad. Ambos motores exponen match(*texts) con la misma
+    semántica de "gana el primer filtro que coincide".
+    """
+    rules = list(rules)
+    if len(rules) < AUTOMATON_MIN_FILTERS:
+        return KeywordScanner(rules)
+    return FilterAutomaton(rules)
+
+
+# ===================================================================
+# CLASIFICACIÓN MASIVA EN PROCESOS
+# ===================================================================
+# Mensajes por tarea enviada a un proceso de trabajo.
+BULK_CHUNK_SIZE = 5_000
+# Por debajo de esta cantidad de mensajes, levantar procesos cuesta más
+# de lo que se gana: se clasifica en el proceso actual.
+BULK_PARALLEL_MIN = 20_000
+
+# Motores ya compilados en cada proceso de trabajo, por conjunto de reglas:
+# las reglas viajan con cada tarea pero se compilan una vez por proceso.
+_compiled: Dict[Tuple[Tuple[str, str], ...], object] = {}
+
+
+def _classify_chunk(chunk: Tuple[bool, List[Tuple[Tuple[Tuple[str, str], ...], List[Tuple[str, ...]]]]]):
+    """
+    Tarea de un proceso de trabajo. chunk: (terms, [(reglas, textos), ...]),
+    con textos [(asunto, cuerpo), ...] o, con terms, [(asunto, remitente,
+    destinatario, cuerpo), ...].
+    Devuelve, por grupo, la carpeta de cada mensaje (None = Inbox) y, con
+    terms, el par (carpetas, términos de cada mensaje según term_weights).
+    """
+    terms, groups = chunk
+    results = []
+    for rules, texts in groups:
+        if rules:
+            engine = _compiled.get(rules)
+            if engine is None:
+                if len(_compiled) >= 256:
+                    _compiled.clear()
+                engine = _compiled[rules] = compile_filters(rules)
+            match = engine.match
+            names = [match(text[0].lower(), text[-1].lower()) for text in texts]
+        else:
+            names = [None] * len(texts)
+        results.append((names, [term_weights(*text) for text in texts]) if terms else names)
+    return results
+
+
+def classify_bulk(groups: List[Tuple[Tuple[Tuple[str, str], ...], List[Tuple[str, str]]]],
+                  workers: Optional[int] = None, chunk_size: int = BULK_CHUNK_SIZE,
+                  executor=None, terms: bool = False):
+    """
+    Clasifica muchos mensajes repartiéndolos entre procesos.
+
+    groups: [(reglas, [(asunto, cuerpo), ...]), ...], un grupo por usuario
+    (las reglas como tuplas (palabra_clave, carpeta) en orden de prioridad,
+    igual que list_filters()). Devuelve, alineado con groups, la carpeta
+    de cada mensaje según "gana el primer filtro que coincide"
+    (None = ninguno coincide).
+
+    Con terms=True los textos son (asunto, remitente, destinatario, cuerpo)
+    y los procesos además tokenizan cada mensaje para el índice de búsqueda
+    (search_index.term_weights): devuelve (carpetas, términos), los dos
+    alineados con groups. Así el proceso principal sólo inserta.
+
+    Los grupos se cortan en tareas de hasta chunk_size mensajes (varios
+    usuarios chicos comparten una tarea). Cada proceso compila las reglas
+    una vez y sólo devuelve nombres de carpeta (y términos): la inserción
+    queda para el proceso principal. Sin terms, los grupos sin reglas no
+    se envían.
+
+    executor permite reutilizar un ProcessPoolExecutor entre llamadas (por
+    ejemplo, una importación por lotes); si no se indica, se crea uno con
+    'workers' procesos (por defecto, uno por núcleo). Con workers=1 o
+    menos de BULK_PARALLEL_MIN mensajes se clasifica aquí mismo.
+
+    En plataformas que crean los procesos con "spawn" (Windows, macOS) el
+    programa que llama debe estar protegido con if __name__ == "__main__".
+    """
+    results: List[List[Optional[str]]] = [[None] * len(texts) for _, texts in groups]
+    weights: List[List[Optional[Dict[str, int]]]] = [[None] * len(texts) for _, texts in groups]
+
+    # Tareas: listas de (grupo, inicio, reglas, textos), de hasta chunk_size mensajes.
+    chunks, current, size = [], [], 0
+    for index, (rules, texts) in enumerate(groups):
+        if not rules and not terms:
+            continue
+        for start in range(0, len(texts), chunk_size):
+            part = texts[start:start + chunk_size]
+            current.append((index, start, rules, part))
+            size += len(part)
+            if size >= chunk_size:
+                chunks.append(current)
+                current, size = [], 0
+    if current:
+        chunks.append(current)
+
+    total = sum(len(texts) for _, texts in groups)
+    payloads = [(terms, [(rules, part) for _, _, rules, part in chunk]) for chunk in chunks]
+    if executor is None and (workers == 1 or len(chunks) < 2 or total < BULK_PARALLEL_MIN):
+        outputs = map(_classify_chunk, payloads)
+    elif executor is not None:
+        outputs = executor.map(_classify_chunk, payloads)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(workers) as pool:
+            outputs = list(pool.map(_classify_chunk, payloads))
+
+    for chunk, output in zip(chunks, outputs):
+        for (index, start, _, part), names in zip(chunk, output):
+            if terms:
+                names, terms_part = names
+                weights[index][start:start + len(part)] = terms_part
+            results[index][start:start + len(part)] = names
+    return (results, weights) if terms else results
@@ -1,6 +1,33 @@
 # models/folder.py
-from typing import List, Optional
-from models.message import Message
+import threading
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Set
+from models.message import MESSAGE_ID_BITS, Message
+
+# Vistas ordenadas que mantiene cada carpeta (ver Folder.page):
+# - "urgent": urgentes primero y, dentro de cada grupo, más nuevos primero.
+# - "newest": más nuevos primero.
+VIEWS = ("urgent", "newest")
+
+# Cada vista es una lista creciente de enteros que codifican
+# (urgencia, fecha, id): el id ocupa los 32 bits bajos (Message rechaza
+# ids más grandes, ver MAX_MESSAGE_ID) y la marca de urgencia suma un
+# valor mayor que cualquier fecha.
+_ID_BITS = MESSAGE_ID_BITS
+_ID_MASK = (1 << _ID_BITS) - 1
+_URGENT_BIAS = 1 << 96
+
+
+def _order_key(message: Message) -> int:
+    return (message.timestamp << _ID_BITS) | message.id
+
+
+class FolderCounters(NamedTuple):
+    """Contadores de una carpeta (o de su subárbol completo)."""
+    total: int
+    urgent: int
+    unseen: int
+    bytes: int
 
 class Folder:
     """
@@ -15,12 +42,152 @@ class Folder:
     ✔ BÚSQUEDAS recursivas por asunto o remitente
     ✔ Movimiento de mensajes entre carpetas
     ✔ Carpetas creadas dinámicamente por filtros automáticos
+
+    Cada carpeta conoce a su carpeta padre. Los cambios de estructura se
+    notifican a los suscriptores de la raíz del árbol (por ejemplo, el
+    índice de carpetas del usuario), subiendo por los padres en O(profundidad).
+
+    Los mensajes se guardan en un diccionario id → mensaje, que conserva el
+    orden de llegada y permite quitar un mensaje en O(1).
+
+    Además la carpeta mantiene vistas ordenadas ("urgent" y "newest"),
+    actualizadas con bisect al agregar, quitar o cambiar la urgencia de un
+    mensaje. Las listas se guardan de menor a mayor, así que un mensaje
+    nuevo casi siempre se agrega al final en O(1); page() lee una página
+    desde el final en O(tamaño de página).
+
+    Cada carpeta mantiene también contadores agregados de su subárbol
+    (total, urgentes, no vistos y bytes). Cada alta, baja, movimiento o
+    cambio de urgencia los corrige subiendo por los padres en
+    O(profundidad), así que las insignias de la GUI y los controles de
+    cuota nunca recorren el árbol.
+
+    Concurrencia: todo el árbol comparte un lock reentrante, el de su raíz
+    (propiedad lock). User lo toma para insertar, filtrar y mover mensajes,
+    así que las entregas a usuarios distintos no compiten entre sí.
+
+    Cambios de urgencia: si la raíz tiene dueño (owner, un User), cada
+    mensaje guarda sólo una referencia a ese dueño, que le avisa a la
+    carpeta correspondiente (_on_urgency_changed); una carpeta suelta se
+    registra ella misma como dueña de sus mensajes.
     """
 
     def __init__(self, name: str):
         self.name = name
-        self.messages: List[Message] = []
+        self._messages: Dict[int, Message] = {}
+        self._views: Dict[str, List[int]] = {view: [] for view in VIEWS}
+        # Contadores [total, urgentes, no vistos, bytes]: de la carpeta y
+        # de todo su subárbol. _unseen guarda los ids no vistos aún.
+        self._own_counts = [0, 0, 0, 0]
+        self._tree_counts = [0, 0, 0, 0]
+        self._unseen: Set[int] = set()
         self.subfolders: List["Folder"] = []
+        self.parent: Optional["Folder"] = None
+        self._listeners: List[Callable] = []
+        # Dueño del árbol (sólo en la raíz; ver _urgency_owner).
+        self.owner = None
+        # Sólo se usa el de la raíz (ver la propiedad lock).
+        self._lock = threading.RLock()
+
+    def __contains__(self, message: Message) -> bool:
+        return message.id in self._messages
+
+    @property
+    def message_count(self) -> int:
+        """Cantidad de mensajes directos de la carpeta."""
+        return len(self._messages)
+
+    @property
+    def messages(self) -> List[Message]:
+        """
+        Copia de los mensajes de la carpeta, en orden de llegada. Para
+        recorrerlos sin copiar, iter_messages().
+        """
+        return list(self._messages.values())
+
+    def iter_messages(self) -> Iterator[Message]:
+        """
+        Recorre los mensajes de la carpeta en orden de llegada, sin copiarlos.
+        La carpeta no debe cambiar durante el recorrido (tomar lock).
+        """
+        return iter(self._messages.values())
+
+    @property
+    def counters(self) -> FolderCounters:
+        """Contadores de la carpeta y todas sus subcarpetas. O(1)."""
+        return FolderCounters(*self._tree_counts)
+
+    @property
+    def own_counters(self) -> FolderCounters:
+        """Contadores sólo de los mensajes directos de la carpeta. O(1)."""
+        return FolderCounters(*self._own_counts)
+
+    def mark_seen(self):
+        """Marca como vistos los mensajes de la carpeta (p. ej. al abrirla)."""
+        unseen = len(self._unseen)
+        if unseen:
+            self._unseen.clear()
+            self._own_counts[2] -= unseen
+            self._propagate(0, 0, -unseen, 0)
+
+    # ===================================================================
+    # ESTRUCTURA DEL ÁRBOL
+    # ===================================================================
+    @property
+    def path(self) -> str:
+        """
+        Ruta jerárquica desde la raíz (sin incluirla), p. ej. "Work/Projects".
+        La raíz tiene ruta vacía.
+        """
+        parts = []
+        folder = self
+        while folder.parent is not None:
+            parts.append(folder.name)
+            folder = folder.parent
+        return "/".join(reversed(parts))
+
+    def get_root(self) -> "Folder":
+        """Devuelve la raíz del árbol al que pertenece la carpeta."""
+        folder = self
+        while folder.parent is not None:
+            folder = folder.parent
+        return folder
+
+    @property
+    def lock(self) -> threading.RLock:
+        """Lock reentrante del árbol: el de la carpeta raíz."""
+        return self.get_root()._lock
+
+    def get_child(self, name: str) -> Optional["Folder"]:
+        """Devuelve la subcarpeta directa con ese nombre (sin distinguir mayúsculas)."""
+        name = name.lower()
+        for sub in self.subfolders:
+            if sub.name.lower() == name:
+                return sub
+        return None
+
+    def subscribe(self, callback: Callable):
+        """
+        Registra una función callback(evento, carpeta, mensaje) que se
+        invoca ante cambios en cualquier carpeta del árbol.
+        Debe registrarse sobre la carpeta raíz.
+
+        Eventos: "folder_added", "message_added", "messages_added",
+        "message_removed" y "message_moved" (la carpeta es la de destino;
+        en los eventos de carpeta, mensaje es None, y en "messages_added",
+        la lista de mensajes agregados en lote).
+        """
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable):
+        """Quita una función registrada con subscribe() (si estaba)."""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, event: str, folder: "Folder", message: Optional[Message] = None):
+        root = self.get_root()
+        for callback in root._listeners:
+            callback(event, folder, message)
 
     # ===================================================================
     # OPERACIONES PRINCIPALES
@@ -30,13 +197,194 @@ class Folder:
         Agrega una subcarpeta directa.
         Se usa al crear carpetas manualmente o desde filtros automáticos.
         """
+        folder.parent = self
         self.subfolders.append(folder)
+        self._propagate(*folder._tree_counts)
+        self._notify("folder_added", folder)
 
     def add_message(self, message: Message):
         """
         Agrega un mensaje a esta carpeta.
         """
-        self.messages.append(message)
+        if message.id not in self._messages:
+            self._index(message)
+        self._messages[message.id] = message
+        self._notify("message_added", self, message)
+
+    def add_messages(self, messages: List[Message]):
+        """
+        Agrega varios mensajes de una vez (importaciones masivas).
+
+        Equivale a llamar add_message() con cada uno, pero las vistas
+        ordenadas se reordenan una sola vez y los contadores suben por los
+        padres una sola vez, en lugar de una por mensaje. También se
+        notifica una sola vez: "messages_added" con la lista de mensajes
+        nuevos.
+        """
+        new = list({m.id: m for m in messages if m.id not in self._messages}.values())
+        if new:
+            # Dueño primero, como en _index().
+            owner = self._urgency_owner()
+            for message in new:
+                message.add_owner(owner)
+            urgent = [message.urgent for message in new]
+            for view, keys in self._views.items():
+                keys.extend(self._view_key(view, m, u) for m, u in zip(new, urgent))
+                keys.sort()
+            self._unseen.update(message.id for message in new)
+            self._count(len(new), sum(urgent), len(new), sum(message.size for message in new))
+        for message in new:
+            self._messages[message.id] = message
+        if new:
+            self._notify("messages_added", self, new)
+
+    def get_message(self, message_id: int) -> Optional[Message]:
+        """Devuelve el mensaje directo con ese id, o None. O(1)."""
+        return self._messages.get(message_id)
+
+    def transfer(self, message_id: int, target_folder: "Folder") -> Optional[Message]:
+        """
+        Pasa el mensaje con ese id de esta carpeta a target_folder en O(1)
+        y lo devuelve (None si no está). Dentro de un mismo árbol se notifica
+        un único evento "message_moved".
+        """
+        if target_folder.get_root() is not self.get_root():
+            message = self.remove_message(message_id)
+            if message is not None:
+                target_folder.add_message(message)
+            return message
+
+        message = self._messages.pop(message_id, None)
+        if message is not None:
+            unseen = self._unindex(message)
+            if message_id not in target_folder._messages:
+                target_folder._index(message, unseen)
+            target_folder._messages[message_id] = message
+            target_folder._notify("message_moved", target_folder, message)
+        return message
+
+    def remove_message(self, message_id: int) -> Optional[Message]:
+        """Quita de esta carpeta el mensaje con ese id y lo devuelve. O(1)."""
+        message = self._messages.pop(message_id, None)
+        if message is not None:
+            self._unindex(message)
+            self._notify("message_removed", self, message)
+        return message
+
+    # ===================================================================
+    # VISTAS ORDENADAS Y PAGINACIÓN
+    # ===================================================================
+    def page(self, view: str = "urgent", offset: int = 0, limit: int = 50) -> List[Message]:
+        """
+        Devuelve 'limit' mensajes de la vista indicada a partir de la
+        posición 'offset'. Costo O(limit): la vista ya está ordenada.
+        """
+        keys = self._view(view)
+        end = len(keys) - max(offset, 0)
+        if end <= 0 or limit <= 0:
+            return []
+        start = max(0, end - limit)
+        messages = self._messages
+        return [messages[key & _ID_MASK] for key in reversed(keys[start:end])]
+
+    def position(self, view: str, message_id: int) -> Optional[int]:
+        """Posición del mensaje dentro de la vista (None si no está). O(log n)."""
+        message = self._messages.get(message_id)
+        if message is None:
+            return None
+        keys = self._view(view)
+        return len(keys) - 1 - bisect_left(keys, self._view_key(view, message))
+
+    def _view(self, view: str) -> List[int]:
+        keys = self._views.get(view)
+        if keys is None:
+            raise ValueError(f"Vista desconocida: {view!r} (opciones: {', '.join(VIEWS)})")
+        return keys
+
+    @staticmethod
+    def _view_key(view: str, message: Message, urgent: Optional[bool] = None) -> int:
+        key = _order_key(message)
+        if view == "urgent" and (message.urgent if urgent is None else urgent):
+            key += _URGENT_BIAS
+        return key
+
+    def _index(self, message: Message, unseen: bool = True):
+        # Primero el dueño: si otro hilo cambia la urgencia entre medio,
+        # o se lee ya el valor nuevo o llega la notificación.
+        message.add_owner(self._urgency_owner())
+        urgent = message.urgent
+        for view, keys in self._views.items():
+            insort(keys, self._view_key(view, message, urgent))
+        if unseen:
+            self._unseen.add(message.id)
+        self._count(1, int(urgent), int(unseen), message.size)
+
+    def _unindex(self, message: Message) -> bool:
+        """Quita el mensaje de vistas y contadores; indica si no estaba visto."""
+        # El dueño del árbol lo suelta él mismo cuando el mensaje sale del árbol.
+        message.remove_owner(self)
+        urgent = self._indexed_urgency(message)
+        for view, keys in self._views.items():
+            del keys[bisect_left(keys, self._view_key(view, message, urgent))]
+        unseen = message.id in self._unseen
+        self._unseen.discard(message.id)
+        self._count(-1, -int(urgent), -int(unseen), -message.size)
+        return unseen
+
+    def _indexed_urgency(self, message: Message) -> bool:
+        """
+        Urgencia con la que el mensaje figura en la vista "urgent". Puede
+        diferir de message.urgent mientras otro hilo la está cambiando y
+        su notificación todavía no llegó.
+        """
+        keys = self._views["urgent"]
+        key = self._view_key("urgent", message, True)
+        i = bisect_left(keys, key)
+        return i < len(keys) and keys[i] == key
+
+    def _count(self, total: int, urgent: int, unseen: int, size: int):
+        own = self._own_counts
+        own[0] += total
+        own[1] += urgent
+        own[2] += unseen
+        own[3] += size
+        self._propagate(total, urgent, unseen, size)
+
+    def _propagate(self, total: int, urgent: int, unseen: int, size: int):
+        """Suma los cambios a esta carpeta y a sus ancestros. O(profundidad)."""
+        folder = self
+        while folder is not None:
+            counts = folder._tree_counts
+            counts[0] += total
+            counts[1] += urgent
+            counts[2] += unseen
+            counts[3] += size
+            folder = folder.parent
+
+    def _urgency_owner(self):
+        """A quién avisan los mensajes de esta carpeta: el dueño del árbol, o ella misma."""
+        return self.get_root().owner or self
+
+    def _on_urgency_changed(self, message: Message):
+        """
+        Reubica el mensaje en la vista "urgent" y ajusta el contador de
+        urgentes. Lleva la vista al estado actual del mensaje, así que
+        notificaciones repetidas o desordenadas (cambios concurrentes)
+        no la corrompen.
+        """
+        with self.lock:
+            if message.id not in self._messages:
+                return
+            urgent = message.urgent
+            indexed = self._indexed_urgency(message)
+            if indexed == urgent:
+                return
+            keys = self._views["urgent"]
+            del keys[bisect_left(keys, self._view_key("urgent", message, indexed))]
+            insort(keys, self._view_key("urgent", message, urgent))
+            delta = 1 if urgent else -1
+            self._own_counts[1] += delta
+            self._propagate(0, delta, 0, 0)
 
     # ===================================================================
     # BÚSQUEDA RECURSIVA
@@ -52,7 +400,7 @@ class Folder:
 
         Este método es un claro ejemplo de recorrido DFS (profundidad).
         """
-        for msg in self.messages:
+        for msg in self._messages.values():
             if msg.subject == subject:
                 return msg
 
@@ -71,11 +419,13 @@ class Folder:
         Mueve un mensaje identificado por su asunto a otra carpeta.
         La función recorre el árbol recursivamente, extrae el mensaje
         y lo agrega a la carpeta destino.
+
+        Si se conoce el id del mensaje, User.move_message_by_id() evita
+        el recorrido y no depende de que el asunto sea único.
         """
-        for msg in self.messages:
+        for msg in self._messages.values():
             if msg.subject == subject:
-                self.messages.remove(msg)
-                target_folder.add_message(msg)
+                self.transfer(msg.id, target_folder)
                 return True
 
         for sub in self.subfolders:
@@ -93,6 +443,7 @@ class Folder:
         útil para depuración y como apoyo en la defensa del TP.
         """
         indent = "  " * level
-        print(f"{indent}- {self.name} ({len(self.messages)} mensajes)")
+        total = self._tree_counts[0]
+        print(f"{indent}- {self.name} ({len(self._messages)} mensajes, {total} con subcarpetas)")
         for sub in self.subfolders:
             sub.print_tree(level + 1)
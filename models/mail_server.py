@@ -1,5 +1,9 @@
 # models/mail_server.py
-from typing import Dict, Optional
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from models.filter_engine import BULK_CHUNK_SIZE, classify_bulk
 from models.user import User
 
 class MailServer:
@@ -23,12 +27,91 @@ class MailServer:
 
     Este enfoque está directamente alineado con los requisitos del TP,
     donde se pide modelar la red como un grafo y utilizar una estrategia de búsqueda.
+
+    -----------------------------------
+    🔗 Alcanzabilidad con Union-Find
+    -----------------------------------
+    Como connect() sólo agrega aristas, las componentes conexas del grafo
+    sólo pueden unirse. El servidor mantiene un conjunto disjunto
+    (union-find con compresión de caminos y unión por tamaño) que responde
+    "¿A puede llegar a B?" en tiempo casi constante, sin recorrer el grafo.
+
+    -----------------------------------
+    🧭 Rutas más cortas con caché
+    -----------------------------------
+    route() devuelve la ruta real (lista de saltos) entre dos usuarios:
+    - Por defecto usa BFS bidireccional, que explora mucho menos que un
+      BFS completo. Las rutas ya halladas quedan en una caché LRU de pares
+      (remitente, destinatario): repetir un par es una consulta a un
+      diccionario.
+    - Un remitente "caliente" recibe su árbol BFS completo, en otra caché
+      LRU; sus rutas salen de ese árbol. El árbol cuesta O(V), así que se
+      arma recién cuando los BFS bidireccionales de ese remitente ya
+      visitaron en total tantos nodos como tiene el grafo (la estrategia
+      del alquiler de esquíes: nunca se gasta más del doble de lo óptimo).
+    - La caché de árboles está acotada en cantidad (route_cache_size) y en
+      nodos guardados (route_cache_nodes); un remitente desalojado vuelve
+      a empezar a acumular.
+    - connect() invalida las cachés cuando agrega una arista nueva.
+
+    user_factory permite cambiar dónde viven los buzones: por defecto son
+    objetos User en memoria; storage/sqlite_backend.py provee usuarios
+    respaldados por una base SQLite (SQLiteMailStore.user).
+
+    attach_metrics() conecta la instrumentación de utils/metrics.py
+    (latencia de envío, nodos visitados por BFS, tiempo de filtros e
+    inserciones por carpeta).
+
+    -----------------------------------
+    🧵 Entregas concurrentes
+    -----------------------------------
+    send_message() puede llamarse desde varios hilos a la vez:
+    - El grafo es de lectura casi exclusiva: connect() no modifica los
+      conjuntos de vecinos sino que publica conjuntos nuevos (copia al
+      escribir), así que el ruteo los recorre sin locks. Las escrituras
+      (register_user, connect) se serializan con un lock propio.
+    - La caché de rutas tiene su lock; un árbol BFS calculado mientras
+      otro hilo agregaba una arista no se guarda (número de versión).
+    - La inserción, el filtrado y la cola de urgencia usan el lock de cada
+      usuario (ver User), así que entregas a usuarios distintos no compiten.
+    - acquire_all() / release_all() detienen todo (p. ej. para una instantánea).
+
+    Para importaciones grandes, ingest() entrega por lotes y evalúa los
+    filtros en procesos de trabajo.
     """
 
-    def __init__(self, name: str):
+    def __init__(self, name: str, route_cache_size: int = 32,
+                 user_factory: Callable[[str], User] = User,
+                 route_cache_nodes: int = 1_000_000, pair_cache_size: int = 4096):
         self.name = name
         self.users: Dict[str, User] = {}
-        self.graph: Dict[str, list[str]] = {}
+        self._user_factory = user_factory
+        self.graph: Dict[str, Set[str]] = {}
+        # Union-find: padre de cada nodo y tamaño de cada componente (en la raíz).
+        self._parent: Dict[str, str] = {}
+        self._size: Dict[str, int] = {}
+        # Caché LRU: remitente → (árbol BFS {nodo: padre}, rutas ya armadas).
+        self._route_cache: "OrderedDict[str, Dict[str, Optional[str]]]" = OrderedDict()
+        self._route_cache_size = route_cache_size
+        # Tope de nodos sumando todos los árboles en caché, y nodos actuales.
+        self._route_cache_nodes = route_cache_nodes
+        self._cached_nodes = 0
+        # Caché LRU de rutas por par (remitente, destinatario).
+        self._pair_routes: "OrderedDict[tuple, Optional[List[str]]]" = OrderedDict()
+        self._pair_cache_size = pair_cache_size
+        # Nodos visitados por los BFS bidireccionales de cada remitente
+        # (candidatos a cachear su árbol), en orden LRU.
+        self._search_work: "OrderedDict[str, int]" = OrderedDict()
+        # Locks: escrituras del grafo (reentrante: los hooks de persistencia
+        # pueden volver a entrar) y caché de rutas. _graph_version cambia con
+        # cada arista nueva.
+        self._graph_lock = threading.RLock()
+        self._route_lock = threading.Lock()
+        self._graph_version = 0
+        # Bitácora de persistencia (ver storage/engine.py); None = sin persistencia.
+        self._journal = None
+        # Instrumentación (ver utils/metrics.py); None = desactivada.
+        self._metrics = None
 
     # ===================================================================
     # REGISTRO Y CONEXIÓN DE USUARIOS
@@ -38,21 +121,151 @@ class MailServer:
         Registra un nuevo usuario en el servidor.
         Devuelve False si el usuario ya existe.
         """
-        if name in self.users:
-            return False
-        self.users[name] = User(name)
-        self.graph[name] = []
-        return True
+        with self._graph_lock:
+            if name in self.users:
+                return False
+            user = self._user_factory(name)
+            user._metrics = self._metrics
+            if self._journal is not None:
+                user._journal = self._journal
+            self.graph[name] = set()
+            self._parent[name] = name
+            self._size[name] = 1
+            self.users[name] = user
+            if self._journal is not None:
+                self._journal.user_registered(name)
+            return True
 
     def connect(self, a: str, b: str):
         """
         Conecta dos usuarios en el grafo de forma bidireccional.
-        Es decir, cada uno queda en la lista de vecinos del otro.
+        Es decir, cada uno queda en el conjunto de vecinos del otro.
         Esto permite que BFS encuentre rutas entre ellos.
+
+        Conectar dos veces el mismo par no duplica vecinos ni invalida
+        la caché de rutas.
+
+        Los conjuntos de vecinos se reemplazan en lugar de modificarse: un
+        BFS que está recorriendo el conjunto anterior en otro hilo no se ve
+        afectado.
+        """
+        graph = self.graph
+        with self._graph_lock:
+            if a in graph and b in graph and a != b and b not in graph[a]:
+                graph[a] = graph[a] | {b}
+                graph[b] = graph[b] | {a}
+                self._union(a, b)
+                # Una arista nueva puede acortar cualquier ruta ya calculada.
+                with self._route_lock:
+                    self._graph_version += 1
+                    self._route_cache.clear()
+                    self._cached_nodes = 0
+                    self._pair_routes.clear()
+                if self._journal is not None:
+                    self._journal.users_connected(a, b)
+
+    def attach_journal(self, journal):
+        """
+        Conecta una bitácora de persistencia al servidor y a sus usuarios:
+        desde ese momento cada registro, conexión y cambio en los buzones
+        se le notifica. Con None se desconecta.
+        """
+        self._journal = journal
+        for user in self.users.values():
+            user._journal = journal
+
+    def attach_metrics(self, metrics):
+        """
+        Conecta una instancia de MailMetrics (utils/metrics.py) al servidor y
+        a sus usuarios, presentes y futuros. Con None se desconecta.
+        """
+        self._metrics = metrics
+        for user in self.users.values():
+            user._metrics = metrics
+
+    def acquire_all(self, blocking: bool = True) -> bool:
+        """
+        Toma el lock del grafo y el de cada usuario (en orden de nombre):
+        mientras se tengan, ningún otro hilo registra, conecta ni modifica
+        buzones. Con blocking=False no espera: si algún lock está tomado,
+        suelta los que consiguió y devuelve False.
+        Se libera con release_all().
+        """
+        if not self._graph_lock.acquire(blocking):
+            return False
+        taken = []
+        for name in sorted(self.users):
+            lock = self.users[name].lock
+            if not lock.acquire(blocking):
+                for held in reversed(taken):
+                    held.release()
+                self._graph_lock.release()
+                return False
+            taken.append(lock)
+        return True
+
+    def release_all(self):
+        """Suelta los locks tomados con acquire_all()."""
+        for name in sorted(self.users, reverse=True):
+            self.users[name].lock.release()
+        self._graph_lock.release()
+
+    # ===================================================================
+    # ALCANZABILIDAD (UNION-FIND)
+    # ===================================================================
+    def is_reachable(self, a: str, b: str) -> bool:
+        """
+        Indica si existe un camino entre los usuarios a y b en el grafo.
+        Costo casi constante (inversa de Ackermann), sin recorrer el grafo.
+
+        Se consulta sin tomar el lock del grafo (route() la usa en cada
+        entrega): la lectura no escribe en _parent, y si las raíces difieren
+        se confirma que la de a siga siendo raíz; si un connect() concurrente
+        la colgó de otra, se vuelve a empezar.
         """
-        if a in self.graph and b in self.graph:
-            self.graph[a].append(b)
-            self.graph[b].append(a)
+        parent = self._parent
+        if a not in parent or b not in parent:
+            return False
+        while True:
+            ra, rb = self._root(a), self._root(b)
+            if ra == rb:
+                return True
+            if parent[ra] == ra:
+                return False
+
+    def _root(self, node: str) -> str:
+        """
+        Raíz de la componente de 'node', sin comprimir el camino (segura sin
+        lock). La unión por tamaño mantiene la altura en O(log n).
+        """
+        parent = self._parent
+        while parent[node] != node:
+            node = parent[node]
+        return node
+
+    def _find(self, node: str) -> str:
+        """
+        Raíz de la componente de 'node', comprimiendo el camino recorrido.
+        Escribe en _parent: sólo se usa con el lock del grafo tomado.
+        """
+        parent = self._parent
+        root = self._root(node)
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    def _union(self, a: str, b: str):
+        """
+        Une las componentes de a y b (la más chica cuelga de la más grande).
+        Se llama con el lock del grafo tomado (ver connect()).
+        """
+        ra, rb = self._find(a), self._find(b)
+        if ra == rb:
+            return
+        if self._size[ra] < self._size[rb]:
+            ra, rb = rb, ra
+        self._parent[rb] = ra
+        self._size[ra] += self._size.pop(rb)
 
     # ===================================================================
     # ENTREGA DE MENSAJES
@@ -60,57 +273,322 @@ class MailServer:
     def send_message(self, receiver: str, message) -> bool:
         """
         Intenta entregar un mensaje al usuario 'receiver'.
-        1. Primero intenta BFS entre usuarios conectados.
+        1. Primero intenta BFS entre usuarios conectados (sólo si
+           is_reachable() confirma que existe un camino).
         2. Si BFS falla, realiza entrega local (mismo servidor).
         3. Si no existe el usuario, retorna False.
+
+        Son las mismas etapas del motor asíncrono (engine/async_delivery.py),
+        ejecutadas en línea: resolve_receiver(), User.classify() y
+        User.store() (estas dos, juntas en User.receive()).
         """
+        return self._timed_send(receiver, message)
 
-        # 1. Intentar BFS
-        delivered = self._deliver_via_bfs(receiver, message)
-        if delivered:
-            return True
+    def _timed_send(self, receiver: str, message, routes: Optional[Dict] = None) -> bool:
+        """_send_message() con las métricas de envío (si están activadas)."""
+        if self._metrics is None:
+            return self._send_message(receiver, message, routes)
+        start = time.perf_counter()
+        delivered = self._send_message(receiver, message, routes)
+        self.record_send(receiver, time.perf_counter() - start, delivered)
+        return delivered
 
-        # 2. Intentar entrega local (mismo servidor)
-        if receiver in self.users:
-            self.users[receiver].receive(message)
-            return True
+    def _send_message(self, receiver: str, message, routes: Optional[Dict] = None) -> bool:
+        user = self.resolve_receiver(receiver, message, routes)
+        if user is None:
+            return False
+        user.receive(message)
+        return True
+
+    def resolve_receiver(self, receiver: str, message, routes: Optional[Dict] = None) -> Optional[User]:
+        """
+        Etapa de ruteo de una entrega: devuelve el usuario destino, o None
+        si no existe.
+        1. Busca la ruta desde el remitente con route() (o la toma de
+           routes, si ya viene resuelta por routes_many).
+        2. Sin camino en la red, el destinatario se resuelve localmente
+           (mismo servidor).
+        """
+        path = routes[receiver] if routes is not None else self.route(message.sender, receiver)
+        if path is not None:
+            return self.users[receiver]
+        return self.users.get(receiver)
+
+    def record_send(self, receiver: str, seconds: float, delivered: bool):
+        """Informa un envío terminado a las métricas (si están activadas)."""
+        if self._metrics is not None:
+            self._metrics.message_sent(receiver, seconds, delivered)
+
+
+    def send_message_many(self, message, recipients: Iterable[str]) -> Dict[str, bool]:
+        """
+        Entrega un mismo mensaje a varios destinatarios (Para, CC y CCO).
 
-        # 3. No existe forma de entregar
-        return False
+        - Se resuelven las rutas de todos los destinatarios con UN solo
+          recorrido desde el remitente (routes_many); cada entrega sigue
+          luego el mismo camino que send_message() (ruta en la red o
+          entrega local, con sus métricas), usando esas rutas en lugar de
+          buscar una por destinatario.
+        - Todos reciben el mismo objeto Message: no se copia el contenido.
+        - Destinatarios repetidos reciben el mensaje una sola vez.
+
+        Retorna el estado de entrega de cada destinatario.
+        """
+        targets = list(dict.fromkeys(recipients))
+        routes = self.routes_many(message.sender, targets)
+        return {receiver: self._timed_send(receiver, message, routes) for receiver in targets}
+
+    def ingest(self, deliveries: Iterable, workers: Optional[int] = None,
+               chunk_size: int = BULK_CHUNK_SIZE, executor=None) -> int:
+        """
+        Entrega masiva de pares (destinatario, mensaje), pensada para
+        importar correo histórico.
+
+        No se calculan rutas (el resultado de send_message() sólo depende
+        de que el destinatario exista): los mensajes se agrupan por usuario,
+        los filtros de todos los usuarios se evalúan en un único reparto
+        entre procesos (classify_bulk) y cada usuario guarda los suyos por
+        lotes (store_many). Con usuarios en memoria (User) los procesos
+        también tokenizan los mensajes para el índice de búsqueda.
+        Destinatarios inexistentes se ignoran.
+        Devuelve la cantidad de mensajes entregados.
+        """
+        by_user: Dict[str, List] = {}
+        for receiver, message in deliveries:
+            if receiver in self.users:
+                by_user.setdefault(receiver, []).append(message)
 
+        # Otros backends (p. ej. SQLite con FTS5) indexan al insertar.
+        terms = all(isinstance(self.users[name], User) for name in by_user)
+        groups = []
+        for name, messages in by_user.items():
+            user = self.users[name]
+            rules = tuple(user.list_filters())
+            if terms:
+                texts = [(m.subject, m.sender, m.receiver, m.body) for m in messages]
+            else:
+                texts = [(m.subject, m.body) for m in messages] if rules else []
+            groups.append((rules, texts))
+        if terms:
+            assignments, weights = classify_bulk(groups, workers, chunk_size, executor, terms=True)
+        else:
+            assignments = classify_bulk(groups, workers, chunk_size, executor)
+            weights = [None] * len(groups)
+
+        for (name, messages), folder_names, group_terms in zip(by_user.items(), assignments, weights):
+            self.users[name].store_many(messages, folder_names or [None] * len(messages), group_terms)
+        return sum(len(messages) for messages in by_user.values())
 
     def _deliver_via_bfs(self, receiver: str, message) -> bool:
         """
-        Entrega un mensaje usando BFS desde el remitente.
+        Entrega un mensaje por la ruta más corta desde el remitente.
 
         Paso a paso:
         1. Se obtiene el nombre del remitente desde el mensaje.
-        2. Se inicia BFS desde el remitente, expandiendo vecinos.
-        3. Si se encuentra el receptor, se realiza la entrega.
-        4. Si se agotan los nodos sin encontrarlo → no existe ruta.
+        2. Se pide la ruta a route() (BFS bidireccional o árbol BFS cacheado).
+        3. Si hay ruta, se realiza la entrega al receptor.
+        4. Si no hay ruta → no existe camino en la red.
 
         Este método cumple con la parte del TP que pide un algoritmo de búsqueda
         en grafos para encontrar rutas en la red.
         """
-        start = message.sender
-        if start not in self.graph or receiver not in self.graph:
+        if self.route(message.sender, receiver) is None:
             return False
+        self.users[receiver].receive(message)
+        return True
 
-        from collections import deque
+    # ===================================================================
+    # RUTEO (RUTAS MÁS CORTAS)
+    # ===================================================================
+    def route(self, sender: str, receiver: str) -> Optional[List[str]]:
+        """
+        Devuelve la ruta más corta (en saltos) de sender a receiver, como
+        lista de usuarios que empieza en sender y termina en receiver.
+        Devuelve None si no existe camino.
 
-        queue = deque([start])
-        visited = {start}
+        La lista devuelta puede estar compartida con la caché: no modificarla.
+        """
+        # Sin camino: se descarta en O(1) con union-find.
+        if not self.is_reachable(sender, receiver):
+            return None
+        if sender == receiver:
+            return [sender]
+
+        with self._route_lock:
+            path = self._pair_routes.get((sender, receiver))
+            if path is not None:
+                self._pair_routes.move_to_end((sender, receiver))
+            tree = self._route_cache.get(sender)
+            if tree is not None:
+                self._route_cache.move_to_end(sender)
+            # El árbol se paga cuando el remitente ya exploró un grafo entero.
+            build_tree = tree is None and self._search_work.get(sender, 0) >= len(self.graph)
+            version = self._graph_version
+        if path is not None:
+            if self._metrics is not None:
+                self._metrics.route_searched(0)
+            return path
+
+        if tree is None and not build_tree:
+            path, visited = self._bidirectional_bfs(sender, receiver)
+            self._remember_route(sender, receiver, path, version, visited)
+            return path
+
+        visited = 0
+        if tree is None:
+            # El BFS corre sin locks, sobre los conjuntos de vecinos publicados.
+            tree = self._bfs_tree(sender)
+            visited = len(tree)
+            self._cache_tree(sender, tree, version)
+        if self._metrics is not None:
+            self._metrics.route_searched(visited)
+        path = self._path_from_tree(tree, receiver)
+        self._remember_route(sender, receiver, path, version)
+        return path
+
+    def routes_many(self, sender: str, receivers: Iterable[str]) -> Dict[str, Optional[List[str]]]:
+        """
+        Rutas más cortas desde sender hacia varios destinatarios, con un
+        único BFS que se detiene apenas encontró a todos los alcanzables
+        (los inalcanzables se descartan antes con union-find).
+        Si el árbol BFS del remitente está en caché, no se recorre nada.
+        """
+        routes: Dict[str, Optional[List[str]]] = {}
+        pending: Set[str] = set()
+        for receiver in receivers:
+            if self.is_reachable(sender, receiver):
+                pending.add(receiver)
+            else:
+                routes[receiver] = None
+        if not pending:
+            return routes
+
+        with self._route_lock:
+            cached = self._route_cache.get(sender)
+            if cached is not None:
+                self._route_cache.move_to_end(sender)
+        tree = cached if cached is not None else self._bfs_tree(sender, stop_after=pending)
+        if self._metrics is not None:
+            self._metrics.route_searched(0 if cached is not None else len(tree))
+
+        for receiver in pending:
+            routes[receiver] = self._path_from_tree(tree, receiver)
+        return routes
+
+    def _remember_route(self, sender: str, receiver: str, path: Optional[List[str]],
+                        version: int, visited: int = 0):
+        """
+        Memoriza la ruta del par y suma al remitente los nodos que visitó su
+        BFS bidireccional (salvo que el grafo haya cambiado mientras tanto).
+        """
+        with self._route_lock:
+            if version != self._graph_version:
+                return
+            pairs = self._pair_routes
+            pairs[(sender, receiver)] = path
+            if len(pairs) > self._pair_cache_size:
+                pairs.popitem(last=False)
+            if visited:
+                work = self._search_work
+                work[sender] = work.pop(sender, 0) + visited
+                if len(work) > 16 * self._route_cache_size:
+                    work.popitem(last=False)
+
+    def _cache_tree(self, sender: str, tree: Dict[str, Optional[str]], version: int):
+        """
+        Guarda el árbol BFS de un remitente (salvo que el grafo haya cambiado
+        mientras se calculaba), desalojando los menos usados hasta respetar
+        los topes de árboles y de nodos.
+        """
+        size = len(tree)
+        with self._route_lock:
+            # Sea cual sea el resultado, el remitente vuelve a acumular desde cero.
+            self._search_work.pop(sender, None)
+            if version != self._graph_version or size > self._route_cache_nodes:
+                return
+            cache = self._route_cache
+            cache[sender] = tree
+            self._cached_nodes += size
+            while len(cache) > self._route_cache_size or self._cached_nodes > self._route_cache_nodes:
+                _, evicted = cache.popitem(last=False)
+                self._cached_nodes -= len(evicted)
 
+    def _bfs_tree(self, start: str, stop_after: Optional[Set[str]] = None) -> Dict[str, Optional[str]]:
+        """
+        BFS desde start: devuelve {nodo: padre en el árbol BFS}.
+        Con stop_after, corta en cuanto todos esos nodos fueron alcanzados.
+        """
+        graph = self.graph
+        parents: Dict[str, Optional[str]] = {start: None}
+        remaining = set(stop_after) - {start} if stop_after is not None else None
+        if remaining is not None and not remaining:
+            return parents
+        queue = deque([start])
         while queue:
             current = queue.popleft()
+            for neighbor in graph[current]:
+                if neighbor not in parents:
+                    parents[neighbor] = current
+                    queue.append(neighbor)
+                    if remaining is not None:
+                        remaining.discard(neighbor)
+                        if not remaining:
+                            return parents
+        return parents
 
-            if current == receiver:
-                self.users[receiver].receive(message)
-                return True
+    @staticmethod
+    def _path_from_tree(tree: Dict[str, Optional[str]], target: str) -> List[str]:
+        path = []
+        node: Optional[str] = target
+        while node is not None:
+            path.append(node)
+            node = tree[node]
+        path.reverse()
+        return path
 
-            for neighbor in self.graph[current]:
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append(neighbor)
+    def _bidirectional_bfs(self, source: str, target: str) -> Tuple[Optional[List[str]], int]:
+        """
+        BFS bidireccional: expande por niveles, alternando desde ambos
+        extremos y siempre por la frontera más chica, hasta que se tocan.
+
+        Como cada nivel se expande completo, el primer nodo de encuentro
+        está a la misma distancia que cualquier otro del mismo nivel, por
+        lo que la ruta obtenida es mínima.
+
+        Devuelve (ruta o None, nodos visitados).
+        """
+        graph = self.graph
+        forward: Dict[str, Optional[str]] = {source: None}
+        backward: Dict[str, Optional[str]] = {target: None}
+        front, back = [source], [target]
+
+        while front and back:
+            expand_forward = len(front) <= len(back)
+            frontier = front if expand_forward else back
+            visited, other = (forward, backward) if expand_forward else (backward, forward)
+
+            next_level = []
+            for current in frontier:
+                for neighbor in graph[current]:
+                    if neighbor in visited:
+                        continue
+                    visited[neighbor] = current
+                    if neighbor in other:
+                        if self._metrics is not None:
+                            self._metrics.route_searched(len(forward) + len(backward))
+                        head = self._path_from_tree(forward, neighbor)
+                        node = backward[neighbor]
+                        while node is not None:
+                            head.append(node)
+                            node = backward[node]
+                        return head, len(forward) + len(backward)
+                    next_level.append(neighbor)
+
+            if expand_forward:
+                front = next_level
+            else:
+                back = next_level
 
-        return False
+        if self._metrics is not None:
+            self._metrics.route_searched(len(forward) + len(backward))
+        return None, len(forward) + len(backward)
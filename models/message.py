@@ -1,15 +1,60 @@
-from datetime import datetime
+import itertools
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from datetime import datetime
+
+# Generador de identificadores únicos y compactos (enteros crecientes).
+_message_ids = itertools.count(1)
+
+# Las vistas ordenadas de Folder empaquetan el id en los bits bajos de un
+# entero (ver models/folder.py): un id mayor devolvería otro mensaje, así
+# que se rechaza al asignarlo.
+MESSAGE_ID_BITS = 32
+MAX_MESSAGE_ID = (1 << MESSAGE_ID_BITS) - 1
+
+# Ordena los cambios de urgencia con el registro de dueños (entregas y
+# cambios desde hilos distintos). Sólo protege secciones muy cortas.
+_owners_lock = threading.Lock()
+
+
+def _to_micros(date: "datetime") -> int:
+    """Microsegundos desde epoch de un datetime, sin pérdida de precisión."""
+    return int(date.replace(microsecond=0).timestamp()) * 1_000_000 + date.microsecond
+
+
+def reserve_ids_up_to(max_id: int):
+    """
+    Garantiza que los próximos ids sean mayores que max_id.
+    Se usa al recuperar mensajes persistidos, que conservan su id original.
+    """
+    global _message_ids
+    following = next(_message_ids)
+    _message_ids = itertools.count(max(following, max_id + 1))
+
+
+def _check_id(message_id: int) -> int:
+    if message_id > MAX_MESSAGE_ID:
+        raise OverflowError(f"Id de mensaje {message_id} fuera de rango (máximo {MAX_MESSAGE_ID})")
+    return message_id
+
 
 class Message:
     """
     Representa un mensaje de correo dentro del sistema.
 
     Cada mensaje contiene:
+    - un identificador único (id)
     - remitente (sender)
-    - destinatario (receiver)
+    - destinatario (receiver): uno o varios destinatarios "Para",
+      separados por coma
+    - destinatarios en copia (cc)
     - asunto (subject)
     - cuerpo del mensaje (body)
-    - fecha de creación
+    - fecha de creación (o la original, si se importó de otro sistema)
     - indicador de urgencia (urgent)
 
     Importancia dentro del TP:
@@ -20,19 +65,67 @@ class Message:
 
     El mensaje está completamente encapsulado y provee métodos para
     su manipulación y representación.
+
+    Representación compacta (un buzón grande tiene muchos mensajes):
+    - __slots__ en lugar de un __dict__ por instancia.
+    - remitente y destinatario internados con sys.intern: todos los
+      mensajes de un mismo usuario comparten una única copia del nombre.
+    - la fecha se guarda como entero (microsegundos desde epoch) y el
+      datetime se construye recién cuando se pide la propiedad date.
+    - el cuerpo puede guardarse fuera de línea (offload_body): el mensaje
+      conserva sólo un BodyHandle (posición + longitud en un BodyStore,
+      ver storage/body_store.py) y lo lee recién cuando se pide body.
+
+    Un mismo objeto Message se comparte entre todos sus destinatarios
+    (un único contenido para un envío masivo): sus datos son de sólo
+    lectura y lo único que cambia es la marca de urgencia.
     """
 
-    def __init__(self, sender: str, receiver: str, subject: str, body: str, urgent: bool = False):
-        self._sender = sender
-        self._receiver = receiver
+    __slots__ = ("_id", "_sender", "_receiver", "_cc", "_subject", "_body", "_ts", "_urgent", "_owners")
+
+    def __init__(self, sender: str, receiver: str, subject: str, body: str, urgent: bool = False,
+                 cc: tuple = (), date: Optional["datetime"] = None):
+        self._id = next(_message_ids)
+        if self._id > MAX_MESSAGE_ID:
+            _check_id(self._id)
+        self._sender = sys.intern(sender)
+        self._receiver = sys.intern(receiver)
+        self._cc = tuple(sys.intern(name) for name in cc)
         self._subject = subject
         self._body = body
-        self._date = datetime.now()
+        # Sin fecha, la actual; los importadores pasan la original del correo
+        # (un datetime sin zona horaria se toma como hora local).
+        self._ts = time.time_ns() // 1000 if date is None else _to_micros(date)
         self._urgent = urgent
+        self._owners = None
+
+    @classmethod
+    def restore(cls, message_id: int, sender: str, receiver: str, subject: str, body: str,
+                timestamp: int, urgent: bool = False, cc: tuple = ()) -> "Message":
+        """
+        Reconstruye un mensaje persistido conservando su id y su fecha.
+        Quien restaura debe llamar luego a reserve_ids_up_to().
+        """
+        message = cls.__new__(cls)
+        message._id = _check_id(message_id)
+        message._sender = sys.intern(sender)
+        message._receiver = sys.intern(receiver)
+        message._cc = tuple(sys.intern(name) for name in cc)
+        message._subject = subject
+        message._body = body
+        message._ts = timestamp
+        message._urgent = urgent
+        message._owners = None
+        return message
 
     # ===================================================================
     # PROPIEDADES
     # ===================================================================
+    @property
+    def id(self) -> int:
+        """Identificador único del mensaje (estable aunque se repita el asunto)."""
+        return self._id
+
     @property
     def sender(self) -> str:
         """Devuelve el remitente del mensaje."""
@@ -43,6 +136,16 @@ class Message:
         """Devuelve el destinatario del mensaje."""
         return self._receiver
 
+    @property
+    def to(self) -> tuple:
+        """Destinatarios "Para", como tupla de nombres."""
+        return tuple(name.strip() for name in self._receiver.split(",") if name.strip())
+
+    @property
+    def cc(self) -> tuple:
+        """Destinatarios en copia (CC). Los de copia oculta no se guardan."""
+        return self._cc
+
     @property
     def subject(self) -> str:
         """Devuelve el asunto del mensaje."""
@@ -50,21 +153,41 @@ class Message:
 
     @property
     def body(self) -> str:
-        """Devuelve el cuerpo del mensaje."""
+        """Devuelve el cuerpo del mensaje (si está fuera de línea, lo carga)."""
+        body = self._body
+        return body if body.__class__ is str else body.load()
+
+    @property
+    def size(self) -> int:
+        """
+        Tamaño en bytes (UTF-8) del asunto y el cuerpo. Un cuerpo fuera de
+        línea no se carga: su longitud está en el handle.
+        """
+        body = self._body
+        body_size = len(body.encode("utf-8")) if body.__class__ is str else body.length
+        return len(self._subject.encode("utf-8")) + body_size
+
+    @property
+    def stored_body(self):
+        """Cuerpo tal como está guardado: el texto o un BodyHandle."""
         return self._body
 
     @property
-    def date(self) -> datetime:
-        """Devuelve la fecha de creación del mensaje."""
-        return self._date
+    def date(self) -> "datetime":
+        """Devuelve la fecha de creación del mensaje (hora local)."""
+        # Import diferido: el motor no necesita datetime, sólo la GUI y __str__.
+        from datetime import datetime
+        seconds, micros = divmod(self._ts, 1_000_000)
+        return datetime.fromtimestamp(seconds).replace(microsecond=micros)
 
     @property
-    def urgent(self) -> bool:
-        """Indica si el mensaje es prioritario."""
-        return self._urgent
-    
+    def timestamp(self) -> int:
+        """Fecha de creación en microsegundos desde epoch (para ordenar)."""
+        return self._ts
+
     @property
     def urgent(self) -> bool:
+        """Indica si el mensaje es prioritario."""
         return self._urgent
 
 
@@ -77,8 +200,63 @@ class Message:
 
         Esta función mejora el encapsulamiento respecto a modificar
         directamente el atributo privado _urgent.
+
+        Luego notifica a sus dueños (por ejemplo, el usuario, que reubica
+        el mensaje en su carpeta y en la cola de urgencia).
+        """
+        with _owners_lock:
+            self._urgent = not self._urgent
+            owners = self._owners
+        if owners is None:
+            return
+        for owner in owners if owners.__class__ is tuple else (owners,):
+            owner._on_urgency_changed(self)
+
+    def copy(self) -> "Message":
+        """
+        Copia independiente con un id nuevo (mismo contenido, fecha y
+        urgencia). La usa quien recibe un mensaje que ya tiene guardado,
+        como el que uno se envía a sí mismo: cada ubicación necesita su id.
+        """
+        return Message.restore(next(_message_ids), self._sender, self._receiver, self._subject,
+                               self._body, self._ts, self._urgent, self._cc)
+
+    def offload_body(self, store):
         """
-        self._urgent = not self._urgent
+        Mueve el cuerpo al BodyStore indicado y se queda sólo con su handle.
+        Si el cuerpo ya está fuera de línea no hace nada.
+        """
+        if self._body.__class__ is str:
+            self._body = store.put(self._body)
+
+    def add_owner(self, owner):
+        """
+        Registra un dueño del mensaje: un objeto con un método
+        _on_urgency_changed(message) que se invoca cada vez que cambia la
+        urgencia (un User, el almacén SQLite o una Folder suelta).
+
+        Se guarda el objeto mismo, no una función ligada: con un solo dueño
+        no hay tupla, y un mensaje compartido guarda una tupla de dueños.
+        """
+        with _owners_lock:
+            owners = self._owners
+            if owners is None:
+                self._owners = owner
+            elif owners.__class__ is not tuple:
+                if owners is not owner:
+                    self._owners = (owners, owner)
+            elif all(o is not owner for o in owners):
+                self._owners = owners + (owner,)
+
+    def remove_owner(self, owner):
+        """Quita un dueño registrado con add_owner() (si estaba)."""
+        with _owners_lock:
+            owners = self._owners
+            if owners is owner:
+                self._owners = None
+            elif owners.__class__ is tuple:
+                rest = tuple(o for o in owners if o is not owner)
+                self._owners = rest[0] if len(rest) == 1 else rest
 
     def is_urgent(self) -> bool:
             """
@@ -99,5 +277,5 @@ class Message:
         return (
             f"Asunto: {self._subject}{urgency} | "
             f"De: {self._sender} | Para: {self._receiver} | "
-            f"Fecha: {self._date.strftime('%Y-%m-%d %H:%M:%S')}"
+            f"Fecha: {self.date.strftime('%Y-%m-%d %H:%M:%S')}"
         )
@@ -0,0 +1,248 @@
+# models/search_index.py
+import heapq
+import math
+import re
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from models.message import Message
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Peso de cada campo en el puntaje: una coincidencia en el asunto
+# vale más que una en el cuerpo.
+FIELD_WEIGHTS = (
+    ("subject", 3),
+    ("sender", 2),
+    ("receiver", 2),
+    ("body", 1),
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Divide un texto en términos en minúsculas (letras, dígitos y '_')."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def term_weights(*fields: str) -> Dict[str, int]:
+    """
+    Términos de un mensaje con su peso acumulado. fields son los textos de
+    los campos en el orden de FIELD_WEIGHTS (asunto, remitente,
+    destinatario, cuerpo). Es una función suelta para poder calcularla en
+    los procesos de trabajo de una importación masiva.
+    """
+    weights: Dict[str, int] = {}
+    for text, (_, weight) in zip(fields, FIELD_WEIGHTS):
+        for token in tokenize(text):
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+class SearchIndex:
+    """
+    Índice invertido de texto completo sobre los mensajes de un usuario.
+
+    Para cada término guarda la lista de publicación {id de mensaje → peso},
+    donde el peso acumula las apariciones del término en asunto, remitente,
+    destinatario y cuerpo (ponderadas según FIELD_WEIGHTS).
+
+    ✔ Alta y baja incremental de mensajes (no se reindexa todo el buzón).
+    ✔ Consultas con varios términos en AND, y términos por prefijo ("proy*").
+    ✔ Resultados ordenados por relevancia (tf-idf), con desempate por id
+      (más reciente primero).
+
+    El costo de una consulta depende de las listas de publicación de sus
+    términos (se intersecta empezando por la más corta), no del tamaño
+    total del buzón.
+
+    Un mensaje con el cuerpo fuera de línea (restaurado desde disco) no se
+    tokeniza al agregarlo: queda pendiente hasta la primera consulta, así
+    que restaurar un buzón no lee ningún cuerpo.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._docs: Dict[int, Tuple[Message, Tuple[str, ...]]] = {}
+        # Vocabulario ordenado, para resolver prefijos con búsqueda binaria.
+        # Se arma recién en la primera consulta por prefijo después de un
+        # cambio (None = desactualizado): insertar cada término nuevo en una
+        # lista ordenada costaría O(vocabulario) por término.
+        self._vocabulary: Optional[List[str]] = []
+        # Mensajes agregados con el cuerpo fuera de línea, aún sin tokenizar.
+        self._pending: Dict[int, Message] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs) + len(self._pending)
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._docs or message_id in self._pending
+
+    # ===================================================================
+    # ACTUALIZACIÓN INCREMENTAL
+    # ===================================================================
+    def add(self, message: Message):
+        """Indexa un mensaje. Si ya estaba indexado no hace nada."""
+        if message.id in self:
+            return
+        if message.stored_body.__class__ is not str:
+            self._pending[message.id] = message
+            return
+        self._index(message)
+
+    def add_many(self, entries: Iterable[Tuple[Message, Optional[Dict[str, int]]]]):
+        """
+        Indexa varios mensajes de una vez. Cada uno puede traer sus términos
+        ya calculados con term_weights() (p. ej. en los procesos de
+        User.ingest()); con None se tokeniza como en add().
+        """
+        for message, weights in entries:
+            if weights is None:
+                self.add(message)
+            elif message.id not in self:
+                self._insert(message, weights)
+
+    def _index(self, message: Message):
+        self._insert(message, term_weights(*(getattr(message, field) for field, _ in FIELD_WEIGHTS)))
+
+    def _insert(self, message: Message, weights: Dict[str, int]):
+        doc = message.id
+        postings = self._postings
+        for token, weight in weights.items():
+            posting = postings.get(token)
+            if posting is None:
+                posting = postings[token] = {}
+                self._vocabulary = None
+            posting[doc] = weight
+
+        self._docs[doc] = (message, tuple(weights))
+
+    def remove(self, message_id: int):
+        """Quita un mensaje del índice."""
+        if self._pending.pop(message_id, None) is not None:
+            return
+        entry = self._docs.pop(message_id, None)
+        if entry is None:
+            return
+        for token in entry[1]:
+            posting = self._postings[token]
+            del posting[message_id]
+            if not posting:
+                del self._postings[token]
+                self._vocabulary = None
+
+    # ===================================================================
+    # CONSULTAS
+    # ===================================================================
+    def search(
+        self,
+        query: str,
+        accept: Optional[Callable[[int], bool]] = None,
+        limit: Optional[int] = 50,
+    ) -> List[Message]:
+        """
+        Devuelve los mensajes que contienen TODOS los términos de la consulta,
+        ordenados por relevancia.
+
+        - Un término terminado en '*' busca por prefijo: "proy*".
+        - accept(id) permite restringir el resultado (p. ej. a una carpeta).
+        - limit=None devuelve todas las coincidencias.
+        """
+        terms = self._parse(query)
+        if not terms:
+            return []
+        if self._pending:
+            # Primera consulta después de restaurar: se leen los cuerpos.
+            pending, self._pending = self._pending, {}
+            for message in pending.values():
+                self._index(message)
+
+        # Términos exactos: se intersectan sus listas empezando por la más
+        # corta. Términos por prefijo: sólo se materializa la unión de sus
+        # listas si no hay ningún término exacto; si no, se verifican contra
+        # los términos de cada candidato (índice directo), lo que no depende
+        # del tamaño del buzón.
+        exact = [self._postings.get(token) for token, prefix in terms if not prefix]
+        prefixes = [token for token, prefix in terms if prefix]
+        if any(posting is None for posting in exact):
+            return []
+
+        total = len(self._docs)
+        scorers: List[Tuple[Callable[[int], int], float]] = []
+        for posting in exact:
+            scorers.append((posting.__getitem__, math.log(1 + total / len(posting))))
+
+        prefix_df: Dict[str, int] = {}
+        for prefix in prefixes:
+            df = sum(len(self._postings[t]) for t in self._prefix_terms(prefix))
+            if not df:
+                return []
+            prefix_df[prefix] = df
+
+        if exact:
+            exact.sort(key=len)
+            candidates: Iterable[int] = exact[0]
+            for posting in exact[1:]:
+                candidates = [doc for doc in candidates if doc in posting]
+        else:
+            # Sólo prefijos: se parte del de menor cantidad estimada de mensajes.
+            seed = min(prefixes, key=prefix_df.__getitem__)
+            merged = self._merge_prefix(seed)
+            candidates = merged
+            prefixes.remove(seed)
+            scorers.append((merged.__getitem__, math.log(1 + total / len(merged))))
+
+        for prefix in prefixes:
+            candidates = [doc for doc in candidates if self._prefix_weight(doc, prefix)]
+            scorers.append(
+                (lambda doc, p=prefix: self._prefix_weight(doc, p),
+                 math.log(1 + total / prefix_df[prefix]))
+            )
+
+        if accept is not None:
+            candidates = [doc for doc in candidates if accept(doc)]
+
+        def score(doc: int) -> Tuple[float, int]:
+            return (sum(weight(doc) * idf for weight, idf in scorers), doc)
+
+        if limit is None:
+            ranked = sorted(candidates, key=score, reverse=True)
+        else:
+            ranked = heapq.nlargest(limit, candidates, key=score)
+        return [self._docs[doc][0] for doc in ranked]
+
+    def _parse(self, query: str) -> List[Tuple[str, bool]]:
+        terms = []
+        for raw in query.split():
+            tokens = tokenize(raw)
+            for token in tokens[:-1]:
+                terms.append((token, False))
+            if tokens:
+                terms.append((tokens[-1], raw.endswith("*")))
+        return terms
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        """Términos del vocabulario que empiezan con el prefijo (búsqueda binaria)."""
+        vocabulary = self._vocabulary
+        if vocabulary is None:
+            vocabulary = self._vocabulary = sorted(self._postings)
+        i = bisect_left(vocabulary, prefix)
+        matches: List[str] = []
+        while i < len(vocabulary) and vocabulary[i].startswith(prefix):
+            matches.append(vocabulary[i])
+            i += 1
+        return matches
+
+    def _merge_prefix(self, prefix: str) -> Dict[int, int]:
+        """Une las listas de publicación de todos los términos con ese prefijo."""
+        merged: Dict[int, int] = {}
+        for term in self._prefix_terms(prefix):
+            for doc, weight in self._postings[term].items():
+                merged[doc] = merged.get(doc, 0) + weight
+        return merged
+
+    def _prefix_weight(self, doc: int, prefix: str) -> int:
+        """Peso de los términos del mensaje que empiezan con el prefijo."""
+        return sum(
+            self._postings[token][doc]
+            for token in self._docs[doc][1]
+            if token.startswith(prefix)
+        )
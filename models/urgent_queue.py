@@ -0,0 +1,120 @@
+# models/urgent_queue.py
+import heapq
+import itertools
+from typing import Dict, List, Optional
+from models.message import Message
+
+
+class UrgentQueue:
+    """
+    Cola de prioridad persistente para los mensajes urgentes de un usuario.
+
+    Está respaldada por un heap binario (módulo heapq) cuya prioridad es la
+    fecha del mensaje: los mensajes más recientes salen primero.
+
+    A diferencia del HeapSort completo que se hacía en cada envío, la cola
+    se mantiene incrementalmente:
+    ✔ push / pop / peek en O(log n)
+    ✔ baja de prioridad (discard) en O(1) mediante borrado perezoso
+    ✔ top(k) en O(k log k) sin reordenar toda la cola
+    """
+
+    # Si las entradas muertas superan a las vivas, se reconstruye el heap.
+    _COMPACT_MIN = 64
+
+    def __init__(self):
+        # Cada entrada es [prioridad, secuencia, mensaje]; el mensaje pasa a
+        # None cuando la entrada se invalida (borrado perezoso).
+        self._heap: List[list] = []
+        self._entries: Dict[int, list] = {}
+        self._counter = itertools.count()
+        self._removed = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, message: Message) -> bool:
+        return message.id in self._entries
+
+    # ===================================================================
+    # OPERACIONES PRINCIPALES
+    # ===================================================================
+    def push(self, message: Message):
+        """Encola un mensaje. Si ya estaba encolado no hace nada."""
+        key = message.id
+        if key in self._entries:
+            return
+        entry = [-message.timestamp, next(self._counter), message]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def discard(self, message: Message):
+        """Quita un mensaje de la cola (si estaba) invalidando su entrada."""
+        entry = self._entries.pop(message.id, None)
+        if entry is None:
+            return
+        entry[2] = None
+        self._removed += 1
+        if self._removed > self._COMPACT_MIN and self._removed > len(self._entries):
+            self._compact()
+
+    def update(self, message: Message):
+        """Reubica el mensaje según su estado de urgencia actual."""
+        if message.is_urgent():
+            self.push(message)
+        else:
+            self.discard(message)
+
+    def peek(self) -> Optional[Message]:
+        """Devuelve el mensaje urgente más reciente sin quitarlo."""
+        self._drop_dead_top()
+        return self._heap[0][2] if self._heap else None
+
+    def pop(self) -> Optional[Message]:
+        """Quita y devuelve el mensaje urgente más reciente."""
+        self._drop_dead_top()
+        if not self._heap:
+            return None
+        entry = heapq.heappop(self._heap)
+        del self._entries[entry[2].id]
+        return entry[2]
+
+    def top(self, k: int) -> List[Message]:
+        """
+        Devuelve los k mensajes de mayor prioridad, en orden, sin modificar
+        la cola.
+
+        Recorre el heap como un árbol usando un heap auxiliar de "frontera":
+        sólo se visitan los nodos que pueden estar entre los k primeros.
+        """
+        heap = self._heap
+        result: List[Message] = []
+        if k <= 0 or not heap:
+            return result
+
+        frontier = [(heap[0][0], heap[0][1], 0)]
+        size = len(heap)
+        while frontier and len(result) < k:
+            _, _, i = heapq.heappop(frontier)
+            message = heap[i][2]
+            if message is not None:
+                result.append(message)
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < size:
+                    heapq.heappush(frontier, (heap[child][0], heap[child][1], child))
+        return result
+
+    # ===================================================================
+    # MANTENIMIENTO INTERNO
+    # ===================================================================
+    def _drop_dead_top(self):
+        heap = self._heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+            self._removed -= 1
+
+    def _compact(self):
+        """Reconstruye el heap sólo con las entradas vivas, en O(n)."""
+        self._heap = [entry for entry in self._heap if entry[2] is not None]
+        heapq.heapify(self._heap)
+        self._removed = 0
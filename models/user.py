@@ -1,7 +1,13 @@
-from typing import List, Dict, Optional
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Iterable, List, Dict, Optional, Set, Tuple
 from interfaces.mail_operations import MailOperations
 from models.folder import Folder
+from models.filter_engine import BULK_CHUNK_SIZE, classify_bulk, compile_filters
 from models.message import Message
+from models.search_index import SearchIndex
+from models.urgent_queue import UrgentQueue
 
 class User(MailOperations):
     """
@@ -14,7 +20,9 @@ class User(MailOperations):
     - un árbol de carpetas dinámico
     - filtros automáticos
     - una cola de urgencia
-    - un índice rápido de mensajes por asunto
+    - un índice rápido de mensajes por id (id → carpeta)
+    - un índice invertido de texto completo para búsquedas
+    - un índice de carpetas por nombre y por ruta
 
     Requisitos del TP que cumple esta clase:
     ----------------------------------------
@@ -26,6 +34,12 @@ class User(MailOperations):
     ✔ Estructura de datos para prioridad (urgent_queue)
 
     Esta clase es el núcleo funcional del sistema.
+
+    Concurrencia: las operaciones que modifican el buzón (recepción,
+    filtrado, cola de urgencia, carpetas) se serializan con el lock del
+    árbol de carpetas del usuario (Folder.lock). Cada usuario tiene el suyo,
+    así que entregas paralelas a usuarios distintos no compiten, y nunca se
+    toma el lock de un usuario mientras se tiene el de otro.
     """
 
     def __init__(self, name: str):
@@ -33,13 +47,38 @@ class User(MailOperations):
         self._root = Folder("Root")
         self._inbox = Folder("Inbox")
         self._sent = Folder("Sent")
+        # Lock por usuario: el de la raíz de su árbol (reentrante).
+        self._lock = self._root.lock
+
+        # Índice de carpetas (claves en minúsculas): nombre → carpeta y
+        # ruta jerárquica ("work/projects") → carpeta.
+        self._folders_by_name: Dict[str, Folder] = {}
+        self._folders_by_path: Dict[str, Folder] = {}
+        # Índice de mensajes: id → carpeta que lo contiene.
+        self._message_index: Dict[int, Folder] = {}
+        # Índice invertido de texto completo para las búsquedas.
+        self._search_index = SearchIndex()
+        # Protege el índice invertido: las búsquedas pueden correr en un
+        # hilo de trabajo (GUI) mientras llegan mensajes. Las altas y bajas
+        # se encolan y las aplica quien encuentre el lock libre (ver
+        # _update_search_index): una búsqueda larga no frena las entregas.
+        self._index_lock = threading.Lock()
+        self._index_backlog: Deque[Tuple[Callable, object]] = deque()
+        # Bitácora de persistencia (ver storage/engine.py); None = sin persistencia.
+        self._journal = None
+        # Instrumentación (ver utils/metrics.py); None = desactivada.
+        self._metrics = None
+        self._index_folder_tree(self._root)
+        self._root.subscribe(self._on_folder_event)
+        # Los mensajes del árbol avisan sus cambios de urgencia al usuario.
+        self._root.owner = self
 
         self._root.add_folder(self._inbox)
         self._root.add_folder(self._sent)
 
         self._filters: Dict[str, str] = {}
-        self._urgent_queue: List[Message] = []
-        self._message_index: Dict[str, Message] = {}
+        self._filter_engine = None
+        self._urgent_queue = UrgentQueue()
 
     # ===================================================================
     # PROPIEDADES
@@ -64,6 +103,11 @@ class User(MailOperations):
         """Bandeja de enviados."""
         return self._sent
 
+    @property
+    def lock(self) -> threading.RLock:
+        """Lock del buzón (ver MailOperations.lock)."""
+        return self._lock
+
     # ===================================================================
     # ENVÍO Y RECEPCIÓN DE MENSAJES
     # ===================================================================
@@ -74,25 +118,39 @@ class User(MailOperations):
         Pasos:
         1. Se crea un objeto Message.
         2. Se agrega a la carpeta Sent.
-        3. Si es urgente, se añade a la cola de urgencia y se ordena con HeapSort.
-        4. Se registra en el índice interno.
-        5. Se delega al servidor la entrega mediante BFS.
+        3. Se registra en la cola de urgencia (O(log n) si es urgente).
+        4. Se delega al servidor la entrega mediante BFS.
 
         Retorna True si el mensaje pudo ser entregado.
         """
         msg = Message(self._name, receiver, subject, body, urgent)
 
-        self._sent.add_message(msg)
+        with self._lock:
+            self._sent.add_message(msg)
+            self._track_urgency(msg)
+
+        # La entrega toma el lock del destinatario: el del remitente ya se soltó.
+        return server.send_message(receiver, msg)
 
-        if urgent:
-            self._urgent_queue.append(msg)
-            self._heap_sort_urgent_queue()       # 🔥 ORDENAR CON HEAPSORT
-        else:
-            self._urgent_queue.append(msg)
+    def send_many(self, server, to, subject, body, urgent=False, cc=(), bcc=()) -> Dict[str, bool]:
+        """
+        Envía un único mensaje a varios destinatarios (Para, CC y CCO).
 
-        self._message_index[msg.subject] = msg
+        Se crea un solo Message que se guarda una vez en Sent y que el
+        servidor comparte entre todos los destinatarios, resolviendo sus
+        rutas con un único recorrido (MailServer.send_message_many).
+        Los destinatarios en copia oculta no quedan registrados en el mensaje.
 
-        return server.send_message(receiver, msg)
+        Retorna {destinatario: entregado}.
+        """
+        to = [to] if isinstance(to, str) else list(to)
+        msg = Message(self._name, ", ".join(to), subject, body, urgent, cc=tuple(cc))
+
+        with self._lock:
+            self._sent.add_message(msg)
+            self._track_urgency(msg)
+
+        return server.send_message_many(msg, [*to, *cc, *bcc])
 
     def receive(self, message: Message):
         """
@@ -100,96 +158,347 @@ class User(MailOperations):
 
         Si coincide con algún filtro automático, se mueve a la carpeta
         correspondiente. En caso contrario, va a Inbox.
-        """
-        self._message_index[message.subject] = message
+        El índice de mensajes se actualiza solo, al insertarlo en la carpeta.
 
-        if not self._apply_filters(message):
-            self._inbox.add_message(message)
+        Equivale a store(message, classify(message)); las dos etapas se
+        exponen por separado para el pipeline asíncrono de entrega.
+        """
+        with self._lock:
+            self.store(message, self.classify(message))
 
-    # ===================================================================
-    # HEAPSORT PARA LA COLA DE URGENCIA
-    # ===================================================================
-    def _heapify(self, arr: List[Message], n: int, i: int):
+    def classify(self, message: Message) -> Folder:
         """
-        Mantiene la propiedad del heap máximo basado en la fecha del mensaje.
-        Los mensajes más recientes tienen mayor prioridad.
+        Etapa de filtrado: devuelve la carpeta destino del mensaje según los
+        filtros automáticos (Inbox si ninguno coincide), creándola si hace
+        falta. No inserta el mensaje.
         """
-        largest = i
-        left = 2 * i + 1
-        right = 2 * i + 2
-
-        # Comparar fechas (más nuevo = mayor prioridad)
-        if left < n and arr[left].date > arr[largest].date:
-            largest = left
+        with self._lock:
+            folder_name = self._apply_filters(message)
+            if folder_name is None:
+                return self._inbox
+            return self.get_folder(folder_name) or self.create_folder(folder_name)
 
-        if right < n and arr[right].date > arr[largest].date:
-            largest = right
+    def store(self, message: Message, folder: Folder):
+        """
+        Etapa de inserción: guarda el mensaje en la carpeta indicada.
+        Si el usuario ya lo tiene (se lo envió a sí mismo), guarda una copia
+        con id propio: el índice id -> carpeta no admite dos ubicaciones.
+        """
+        with self._lock:
+            if message.id in self._message_index:
+                message = message.copy()
+            self._track_urgency(message)
+            folder.add_message(message)
 
-        if largest != i:
-            arr[i], arr[largest] = arr[largest], arr[i]
-            self._heapify(arr, n, largest)
+    # ===================================================================
+    # IMPORTACIÓN MASIVA
+    # ===================================================================
+    def ingest(self, messages: Iterable[Message], workers: Optional[int] = None,
+               chunk_size: int = BULK_CHUNK_SIZE, executor=None) -> int:
+        """
+        Recibe muchos mensajes de una vez (p. ej. correo histórico).
 
-    def _heap_sort_urgent_queue(self):
+        El resultado es el mismo que llamar receive() con cada uno, pero los
+        filtros y la tokenización para el índice de búsqueda se hacen en
+        procesos de trabajo (ver classify_bulk) y la inserción se hace por
+        carpeta, en lotes (Folder.add_messages).
+        Los filtros se toman al empezar. Devuelve la cantidad de mensajes.
+        """
+        messages = list(messages)
+        with self._lock:
+            rules = tuple(self.list_filters())
+        texts = [(m.subject, m.sender, m.receiver, m.body) for m in messages]
+        folder_names, terms = classify_bulk([(rules, texts)], workers, chunk_size, executor, terms=True)
+        self.store_many(messages, folder_names[0], terms[0])
+        return len(messages)
+
+    def store_many(self, messages: List[Message], folder_names: List[Optional[str]],
+                   terms: Optional[List[Optional[Dict[str, int]]]] = None):
         """
-        Ordena la cola de urgencia utilizando HeapSort.
-        Este algoritmo garantiza que los mensajes más recientes tengan prioridad.
+        Etapa de inserción de ingest(): guarda cada mensaje en la carpeta
+        indicada por su nombre (Inbox si es None; se crea si no existe).
+        terms son los términos de cada mensaje ya calculados (search_index.
+        term_weights); se cargan en el índice de búsqueda en un solo lote.
         """
-        arr = self._urgent_queue
-        n = len(arr)
+        with self._lock:
+            batches: Dict[Optional[str], List[Message]] = {}
+            indexed: List[Tuple[Message, Optional[Dict[str, int]]]] = []
+            # Un mismo mensaje repetido en el lote se guarda como copia,
+            # igual que con receive() sucesivos (ver store()).
+            seen: Set[int] = set()
+            for i, (message, folder_name) in enumerate(zip(messages, folder_names)):
+                if message.id in seen or message.id in self._message_index:
+                    message = message.copy()
+                seen.add(message.id)
+                batches.setdefault(folder_name, []).append(message)
+                if terms is not None:
+                    indexed.append((message, terms[i]))
+            if indexed:
+                self._update_search_index(self._search_index.add_many, indexed)
+            for folder_name, batch in batches.items():
+                if folder_name is None:
+                    folder = self._inbox
+                else:
+                    folder = self.get_folder(folder_name) or self.create_folder(folder_name)
+                for message in batch:
+                    self._track_urgency(message)
+                folder.add_messages(batch)
 
-        # Construcción del heap (heap máximo)
-        for i in range(n // 2 - 1, -1, -1):
-            self._heapify(arr, n, i)
+    # ===================================================================
+    # COLA DE URGENCIA (HEAP INCREMENTAL)
+    # ===================================================================
+    def _track_urgency(self, message: Message):
+        """Encola el mensaje si ya es urgente (los cambios llegan a _on_urgency_changed)."""
+        if message.is_urgent():
+            self._urgent_queue.push(message)
 
-        # Extracción de elementos uno por uno
-        for i in range(n - 1, 0, -1):
-            arr[i], arr[0] = arr[0], arr[i]  # mover máximo al final
-            self._heapify(arr, i, 0)
+    def _on_urgency_changed(self, message: Message):
+        """
+        Se invoca desde Message.toggle_urgent(): el usuario es el único
+        dueño registrado en el mensaje, así que reubica el mensaje en su
+        carpeta (hallada con el índice de ids) y en la cola de urgencia.
+        """
+        with self._lock:
+            folder = self._message_index.get(message.id)
+            if folder is None:
+                return
+            folder._on_urgency_changed(message)
+            self._urgent_queue.update(message)
+            if self._journal is not None:
+                self._journal.urgency_changed(self, message)
+
+    def top_urgent(self, k: int = 10) -> List[Message]:
+        """
+        Devuelve los k mensajes urgentes más recientes, ya ordenados,
+        sin recorrer ni reordenar toda la cola.
+        """
+        with self._lock:
+            return self._urgent_queue.top(k)
 
-        # Invertimos porque HeapSort deja el array en orden creciente,
-        # y queremos más reciente → primero.
-        arr.reverse()
+    def peek_urgent(self) -> Optional[Message]:
+        """Devuelve el mensaje urgente más reciente, o None."""
+        with self._lock:
+            return self._urgent_queue.peek()
 
     # ===================================================================
     # FILTROS AUTOMÁTICOS
     # ===================================================================
     def add_filter(self, keyword: str, folder_name: str):
-        """Agrega un filtro automático."""
-        self._filters[keyword.lower()] = folder_name
-
-    def _apply_filters(self, message: Message) -> bool:
-        """Aplica filtros automáticos al mensaje recibido."""
-        text = f"{message.subject.lower()} {message.body.lower()}"
-        for keyword, folder_name in self._filters.items():
-            if keyword in text:
-                folder = self.get_folder(folder_name)
-                if not folder:
-                    folder = Folder(folder_name)
-                    self._root.add_folder(folder)
-                folder.add_message(message)
-                return True
-        return False
+        """
+        Agrega un filtro automático.
+        El motor de filtros se invalida y se recompila en la próxima entrega.
+        """
+        with self._lock:
+            self._filters[keyword.lower()] = folder_name
+            self._filter_engine = None
+            if self._journal is not None:
+                self._journal.filter_added(self, keyword, folder_name)
+
+    def _apply_filters(self, message: Message) -> Optional[str]:
+        """
+        Aplica filtros automáticos al mensaje recibido y devuelve el nombre
+        de la carpeta del primer filtro que coincide, o None.
+
+        Con muchos filtros, todas las palabras clave se buscan en una única
+        pasada sobre el asunto y el cuerpo mediante un autómata de
+        Aho-Corasick (ver models/filter_engine.py). Se respeta que gane el
+        primer filtro agregado que coincida.
+        """
+        if not self._filters:
+            return None
+        if self._filter_engine is None:
+            self._filter_engine = compile_filters(self._filters.items())
+
+        if self._metrics is None:
+            return self._filter_engine.match(message.subject.lower(), message.body.lower())
+        start = time.perf_counter()
+        folder_name = self._filter_engine.match(message.subject.lower(), message.body.lower())
+        self._metrics.filters_matched(time.perf_counter() - start, folder_name is not None)
+        return folder_name
 
     # ===================================================================
     # MANEJO DE CARPETAS Y MENSAJES
     # ===================================================================
     def get_folder(self, name: str, folder: Optional[Folder] = None) -> Optional[Folder]:
-        """Búsqueda recursiva de carpeta."""
-        folder = folder or self._root
-        if folder.name.lower() == name.lower():
+        """
+        Busca una carpeta por nombre o por ruta ("Work/Projects"),
+        sin distinguir mayúsculas.
+
+        Sin carpeta de inicio la búsqueda es O(1) sobre el índice del
+        usuario; si hay nombres repetidos, devuelve la primera carpeta
+        registrada con ese nombre (la ruta permite desambiguar).
+        Si se indica 'folder', se busca recursivamente sólo en ese subárbol.
+        """
+        if folder is not None:
+            if folder.name.lower() == name.lower():
+                return folder
+            for sub in folder.subfolders:
+                found = self.get_folder(name, sub)
+                if found:
+                    return found
+            return None
+
+        key = name.strip("/").lower()
+        if "/" in key:
+            return self._folders_by_path.get(key)
+        return self._folders_by_name.get(key)
+
+    def create_folder(self, path: str) -> Folder:
+        """
+        Crea (si no existen) las carpetas de la ruta indicada, colgando de
+        la raíz, y devuelve la última. Ej.: "Work/Projects".
+        """
+        with self._lock:
+            folder = self._root
+            for part in path.strip("/").split("/"):
+                child = folder.get_child(part)
+                if child is None:
+                    child = Folder(part)
+                    folder.add_folder(child)
+                folder = child
             return folder
-        for sub in folder.subfolders:
-            found = self.get_folder(name, sub)
-            if found:
-                return found
-        return None
+
+    def _on_folder_event(self, event: str, folder: Folder, message: Optional[Message]):
+        """Mantiene sincronizados los índices ante cambios en el árbol."""
+        if event == "message_added":
+            self._message_index[message.id] = folder
+            self._update_search_index(self._search_index.add, message)
+        elif event == "messages_added":
+            # Lote de Folder.add_messages(): message es la lista.
+            for msg in message:
+                self._message_index[msg.id] = folder
+            self._update_search_index(self._search_index.add_many, [(msg, None) for msg in message])
+        elif event == "message_moved":
+            self._message_index[message.id] = folder
+        elif event == "message_removed":
+            # Sale del árbol por cualquier camino (delete_message(),
+            # Folder.remove_message(), transfer() a otro usuario...).
+            if self._message_index.get(message.id) is folder:
+                del self._message_index[message.id]
+                message.remove_owner(self)
+                self._urgent_queue.discard(message)
+                self._update_search_index(self._search_index.remove, message.id)
+        elif event == "folder_added":
+            self._index_folder_tree(folder)
+
+        if self._journal is not None:
+            self._journal.folder_event(self, event, folder, message)
+        if self._metrics is not None and event == "message_added":
+            self._metrics.message_stored(self._name, folder)
+        elif self._metrics is not None and event == "messages_added":
+            self._metrics.message_stored(self._name, folder, len(message))
+
+    def _index_folder_tree(self, folder: Folder):
+        """Registra en los índices una carpeta y todo su subárbol."""
+        stack = [(folder, folder.path.lower())]
+        while stack:
+            current, path = stack.pop()
+            self._folders_by_name.setdefault(current.name.lower(), current)
+            if path:
+                self._folders_by_path.setdefault(path, current)
+            for msg in current.iter_messages():
+                self._message_index[msg.id] = current
+                self._update_search_index(self._search_index.add, msg)
+            for sub in reversed(current.subfolders):
+                stack.append((sub, f"{path}/{sub.name.lower()}" if path else sub.name.lower()))
 
     def move_message(self, subject: str, target_name: str) -> bool:
-        """Mueve un mensaje a otra carpeta."""
+        """Mueve un mensaje (buscado por asunto) a otra carpeta."""
         target = self.get_folder(target_name)
-        if not target:
+        if target is None:
             return False
-        return self._root.move_message(subject, target)
+        with self._lock:
+            return self._root.move_message(subject, target)
+
+    def find_message(self, message_id: int) -> Optional[Message]:
+        """Devuelve el mensaje con ese id, en O(1) gracias al índice."""
+        folder = self._message_index.get(message_id)
+        return folder.get_message(message_id) if folder else None
+
+    def folder_of(self, message_id: int) -> Optional[Folder]:
+        """Devuelve la carpeta que contiene al mensaje, o None."""
+        return self._message_index.get(message_id)
+
+    def move_message_by_id(self, message_id: int, target_name: str) -> bool:
+        """
+        Mueve un mensaje identificado por su id a otra carpeta en O(1):
+        el índice indica la carpeta de origen y ésta lo quita de su diccionario.
+        """
+        with self._lock:
+            target = self.get_folder(target_name)
+            source = self._message_index.get(message_id)
+            if target is None or source is None:
+                return False
+            if source is not target:
+                source.transfer(message_id, target)
+            return True
+
+    def delete_message(self, message_id: int) -> bool:
+        """Elimina un mensaje del árbol de carpetas del usuario en O(1)."""
+        with self._lock:
+            source = self._message_index.get(message_id)
+            if source is None:
+                return False
+            source.remove_message(message_id)
+            return True
+
+    # ===================================================================
+    # BÚSQUEDA DE TEXTO COMPLETO
+    # ===================================================================
+    def search(self, query: str, folder=None, limit: Optional[int] = 50) -> List[Message]:
+        """
+        Busca mensajes por los términos de la consulta en asunto, remitente,
+        destinatario y cuerpo, usando el índice invertido del usuario.
+
+        - Todos los términos deben aparecer (AND); "proy*" busca por prefijo.
+        - folder (nombre, ruta o Folder) restringe la búsqueda a esa carpeta
+          y sus subcarpetas.
+        - Los resultados vienen ordenados por relevancia.
+
+        Puede llamarse desde un hilo distinto del que entrega los mensajes.
+        """
+        scope = folder
+        if isinstance(folder, str):
+            scope = self.get_folder(folder)
+            if scope is None:
+                return []
+
+        def accept(message_id: int) -> bool:
+            current = self._message_index.get(message_id)
+            if current is None:
+                return False
+            if scope is None:
+                return True
+            # Sube por los padres: O(profundidad)
+            while current is not None:
+                if current is scope:
+                    return True
+                current = current.parent
+            return False
+
+        with self._index_lock:
+            self._apply_index_backlog()
+            return self._search_index.search(query, accept, limit)
+
+    def _update_search_index(self, operation: Callable, argument):
+        """
+        Encola una alta o baja del índice invertido y, si ninguna búsqueda
+        lo está usando, aplica todo lo pendiente. Si el lock está tomado no
+        espera: la búsqueda siguiente aplica la cola antes de consultar.
+        """
+        self._index_backlog.append((operation, argument))
+        if self._index_lock.acquire(blocking=False):
+            try:
+                self._apply_index_backlog()
+            finally:
+                self._index_lock.release()
+
+    def _apply_index_backlog(self):
+        """Aplica, en orden, las altas y bajas pendientes (con _index_lock tomado)."""
+        backlog = self._index_backlog
+        while backlog:
+            operation, argument = backlog.popleft()
+            operation(argument)
 
     def list_inbox(self) -> List[Message]:
         """Retorna la bandeja de entrada."""
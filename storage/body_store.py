@@ -0,0 +1,114 @@
+# storage/body_store.py
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class BodyHandle:
+    """
+    Referencia a un cuerpo de mensaje guardado fuera de línea: sólo
+    posición y longitud dentro del archivo del BodyStore.
+    """
+
+    __slots__ = ("store", "offset", "length")
+
+    def __init__(self, store: "BodyStore", offset: int, length: int):
+        self.store = store
+        self.offset = offset
+        self.length = length
+
+    def load(self) -> str:
+        """Lee el cuerpo (desde la caché LRU del store o desde disco)."""
+        return self.store.get(self.offset, self.length)
+
+
+class BodyStore:
+    """
+    Almacén de cuerpos de mensajes en un único archivo binario de
+    solo-agregado, leído mediante mmap.
+
+    - put() agrega el texto al final del archivo y devuelve un BodyHandle
+      (posición + longitud), que es lo único que queda en memoria.
+    - get() decodifica el cuerpo directamente desde el mapeo en memoria
+      del archivo; los cuerpos abiertos más recientemente se conservan en
+      una caché LRU pequeña (cache_size).
+
+    El sistema operativo decide qué páginas del archivo quedan en RAM, así
+    que listar o buscar por encabezados no obliga a tener todos los
+    cuerpos cargados.
+
+    put() y get() pueden llamarse desde varios hilos (un lock protege el
+    archivo, el mapeo y la caché).
+    """
+
+    def __init__(self, path: str, cache_size: int = 64):
+        self.path = path
+        self._cache: "OrderedDict[int, str]" = OrderedDict()
+        self._cache_size = cache_size
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Tamaño en bytes del archivo de cuerpos."""
+        return self._size
+
+    def put(self, text: str) -> BodyHandle:
+        """Guarda un cuerpo y devuelve su handle."""
+        data = text.encode("utf-8")
+        with self._lock:
+            offset = self._size
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+            self._remember(offset, text)
+        return BodyHandle(self, offset, len(data))
+
+    def handle(self, offset: int, length: int) -> BodyHandle:
+        """Handle de un cuerpo ya guardado (al restaurar mensajes persistidos)."""
+        return BodyHandle(self, offset, length)
+
+    def get(self, offset: int, length: int) -> str:
+        if not length:
+            return ""
+        with self._lock:
+            text = self._cache.get(offset)
+            if text is not None:
+                self._cache.move_to_end(offset)
+                return text
+            if self._map is None or offset + length > len(self._map):
+                self._remap()
+            text = self._map[offset:offset + length].decode("utf-8")
+            self._remember(offset, text)
+            return text
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if not self._file.closed:
+                self.sync()
+                self._file.close()
+            self._cache.clear()
+
+    def _remember(self, offset: int, text: str):
+        cache = self._cache
+        cache[offset] = text
+        cache.move_to_end(offset)
+        if len(cache) > self._cache_size:
+            cache.popitem(last=False)
+
+    def _remap(self):
+        """Vuelve a mapear el archivo (creció desde el último mapeo)."""
+        if self._map is not None:
+            self._map.close()
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
@@ -0,0 +1,310 @@
+# storage/engine.py
+import os
+import re
+import threading
+from typing import Dict, Optional, Set
+
+from models.folder import Folder
+from models.mail_server import MailServer
+from models.message import Message, reserve_ids_up_to
+from models.user import User
+from storage.body_store import BodyStore
+from storage.journal import JournalReader, JournalWriter
+from storage.snapshot import (
+    capture, message_record, read_snapshot, restore, restore_message, write_snapshot,
+)
+
+_FILE_RE = re.compile(r"^(snapshot|journal)-(\d{8})\.(bin|log)$")
+
+
+class StorageEngine:
+    """
+    Persistencia del servidor de correo: bitácora + instantáneas.
+
+    - Cada cambio (registro de usuario, conexión, entrega, movimiento,
+      borrado, carpeta nueva, filtro, cambio de urgencia) se agrega a una
+      bitácora binaria de solo-agregado (storage/journal.py).
+    - Cada snapshot_every registros se guarda una instantánea compacta de
+      todo el grafo de objetos y se empieza una bitácora nueva.
+    - Al arrancar se carga la última instantánea y sólo se reproduce la
+      cola de la bitácora: el tiempo de arranque depende de lo escrito
+      desde la última instantánea, no del tamaño de los buzones.
+
+    - Con offload_bodies (por defecto), el cuerpo de cada mensaje nuevo se
+      escribe una sola vez en bodies.bin y el mensaje queda sólo con un
+      handle: la bitácora y las instantáneas guardan (posición, longitud)
+      y al arrancar no se leen los cuerpos hasta que alguien los pida.
+
+    Concurrencia: los eventos pueden llegar desde varios hilos (entregas
+    paralelas); se serializan con un lock propio. La instantánea necesita
+    el servidor quieto (MailServer.acquire_all): la automática lo intenta
+    sin esperar y, si algún usuario está ocupado, se pospone unos
+    registros; así nunca espera un lock teniendo otro.
+
+    Archivos en el directorio (N = generación):
+        snapshot-N.bin   estado completo al empezar la generación N
+        journal-N.log    cambios posteriores a esa instantánea
+        bodies.bin       cuerpos de los mensajes (solo-agregado)
+
+    Uso:
+        storage = StorageEngine.open("data")
+        server = storage.server
+        ...
+        storage.close()
+    """
+
+    def __init__(self, directory: str, server_name: str = "Server1",
+                 snapshot_every: int = 10_000, fsync: bool = False,
+                 offload_bodies: bool = True):
+        self.directory = directory
+        self.server_name = server_name
+        self.snapshot_every = snapshot_every
+        self._fsync = fsync
+        self._offload_bodies = offload_bodies
+        self.bodies: Optional[BodyStore] = None
+        self.server: Optional[MailServer] = None
+        self._generation = 0
+        self._writer: Optional[JournalWriter] = None
+        self._records = 0
+        # Ids de mensajes ya escritos completos en la bitácora actual: un
+        # mismo mensaje entregado a varios buzones se escribe una vez.
+        self._logged_ids: Set[int] = set()
+        self._last_urgent = None
+        self._lock = threading.RLock()
+        # Registro a partir del cual se vuelve a intentar la instantánea automática.
+        self._next_snapshot = snapshot_every
+
+    @classmethod
+    def open(cls, directory: str, **kwargs) -> "StorageEngine":
+        """Crea el motor y recupera el estado guardado en el directorio."""
+        engine = cls(directory, **kwargs)
+        engine.recover()
+        return engine
+
+    # ===================================================================
+    # RECUPERACIÓN
+    # ===================================================================
+    def recover(self) -> MailServer:
+        """
+        Carga la instantánea más reciente, reproduce la cola de la
+        bitácora y deja el servidor conectado a una bitácora nueva.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.bodies = BodyStore(os.path.join(self.directory, "bodies.bin"))
+        server = None
+        generation = 0
+        for gen in sorted(self._generations("snapshot"), reverse=True):
+            try:
+                server = restore(read_snapshot(self._path("snapshot", gen)), self.bodies)
+            except (OSError, ValueError, EOFError):
+                continue  # instantánea dañada: se prueba con la anterior
+            generation = gen
+            break
+        if server is None:
+            server = MailServer(self.server_name)
+
+        reader = JournalReader(self._path("journal", generation))
+        self._replay(server, reader)
+        reader.truncate_tail()
+        # "No visto" es estado de la sesión: lo recuperado arranca como visto.
+        for user in server.users.values():
+            stack = [user.root]
+            while stack:
+                folder = stack.pop()
+                folder.mark_seen()
+                stack.extend(folder.subfolders)
+
+        self.server = server
+        self._generation = generation
+        self._writer = JournalWriter(reader.path, fsync=self._fsync)
+        self._records = 0
+        self._next_snapshot = self.snapshot_every
+        self._logged_ids = set()
+        self._last_urgent = None
+        server.attach_journal(self)
+        return server
+
+    def _replay(self, server: MailServer, records):
+        """Aplica los registros de la bitácora (con la bitácora desconectada)."""
+        messages: Dict[int, Message] = {}
+        max_id = 0
+        for record in records:
+            kind = record[0]
+            if kind == "register":
+                server.register_user(record[1])
+                continue
+            if kind == "connect":
+                server.connect(record[1], record[2])
+                continue
+
+            user = server.users[record[1]]
+            if kind == "add":
+                payload = record[3]
+                if isinstance(payload, list):
+                    msg = messages.get(payload[0])
+                    if msg is None:
+                        msg = messages[payload[0]] = restore_message(payload, self.bodies)
+                        max_id = max(max_id, msg.id)
+                else:
+                    msg = messages[payload]
+                user.store(msg, self._folder_at(user, record[2]))
+            elif kind == "move":
+                source = user.folder_of(record[2])
+                if source is not None:
+                    source.transfer(record[2], self._folder_at(user, record[3]))
+            elif kind == "remove":
+                folder = user.folder_of(record[3])
+                if folder is not None and folder.path == record[2]:
+                    user.delete_message(record[3])
+            elif kind == "folder":
+                self._folder_at(user, record[2])
+            elif kind == "filter":
+                user.add_filter(record[2], record[3])
+            elif kind == "urgent":
+                msg = user.find_message(record[2])
+                if msg is not None and msg.urgent != record[3]:
+                    msg.toggle_urgent()
+        reserve_ids_up_to(max_id)
+
+    @staticmethod
+    def _folder_at(user: User, path: str) -> Folder:
+        """Carpeta de la ruta indicada ("" es la raíz); se crea si falta."""
+        return user.create_folder(path) if path else user.root
+
+    # ===================================================================
+    # INSTANTÁNEAS
+    # ===================================================================
+    def snapshot(self):
+        """
+        Guarda el estado completo y empieza una generación nueva de la
+        bitácora. Las generaciones anteriores se borran al terminar: si el
+        proceso se corta antes, la recuperación usa la generación previa.
+
+        Espera a que el servidor quede quieto (MailServer.acquire_all); no
+        debe llamarse teniendo el lock de un usuario.
+        """
+        self.server.acquire_all()
+        try:
+            with self._lock:
+                self._snapshot()
+        finally:
+            self.server.release_all()
+
+    def _snapshot(self):
+        # Requiere el servidor quieto y el lock del motor.
+        generation = self._generation + 1
+        write_snapshot(self._path("snapshot", generation), capture(self.server))
+
+        self._writer.close()
+        self._writer = JournalWriter(self._path("journal", generation), fsync=self._fsync)
+        self._generation = generation
+        self._records = 0
+        self._next_snapshot = self.snapshot_every
+        self._logged_ids = set()
+        self._last_urgent = None
+
+        for kind in ("snapshot", "journal"):
+            for gen in self._generations(kind):
+                if gen < generation:
+                    os.remove(self._path(kind, gen))
+
+    def close(self):
+        """Desconecta la bitácora del servidor y cierra el archivo."""
+        if self.server is not None:
+            self.server.attach_journal(None)
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self.bodies is not None:
+            self.bodies.close()
+            self.bodies = None
+
+    def _append(self, record: list):
+        # Se llama con self._lock tomado.
+        self._writer.append(record)
+        self._records += 1
+        if self._records >= self._next_snapshot:
+            self._try_snapshot()
+
+    def _try_snapshot(self):
+        """
+        Instantánea automática: sólo si se consiguen todos los locks sin
+        esperar (el hilo actual puede tener el de un usuario, y esperar otro
+        podría trabar a un hilo que espera este motor). Si no, se reintenta
+        más adelante.
+        """
+        if not self.server.acquire_all(blocking=False):
+            self._next_snapshot = self._records + max(1, self.snapshot_every // 16)
+            return
+        try:
+            self._snapshot()
+        finally:
+            self.server.release_all()
+
+    def _path(self, kind: str, generation: int) -> str:
+        extension = "bin" if kind == "snapshot" else "log"
+        return os.path.join(self.directory, f"{kind}-{generation:08d}.{extension}")
+
+    def _generations(self, kind: str):
+        for filename in os.listdir(self.directory):
+            match = _FILE_RE.match(filename)
+            if match and match.group(1) == kind:
+                yield int(match.group(2))
+
+    # ===================================================================
+    # EVENTOS (llamados por MailServer y User)
+    # ===================================================================
+    def user_registered(self, name: str):
+        with self._lock:
+            self._append(["register", name])
+
+    def users_connected(self, a: str, b: str):
+        with self._lock:
+            self._append(["connect", a, b])
+
+    def filter_added(self, user: User, keyword: str, folder_name: str):
+        with self._lock:
+            self._append(["filter", user.name, keyword, folder_name])
+
+    def urgency_changed(self, user: User, message: Message):
+        with self._lock:
+            key = (user.name, message.id, message.urgent)
+            if key == self._last_urgent:
+                return
+            self._last_urgent = key
+            self._append(["urgent", user.name, message.id, message.urgent])
+
+    def folder_event(self, user: User, event: str, folder: Folder, message: Optional[Message]):
+        with self._lock:
+            self._folder_event(user, event, folder, message)
+
+    def _folder_event(self, user: User, event: str, folder: Folder, message: Optional[Message]):
+        if event == "message_added":
+            if message.id in self._logged_ids:
+                payload = message.id
+            else:
+                self._logged_ids.add(message.id)
+                if self._offload_bodies:
+                    message.offload_body(self.bodies)
+                    if self._fsync:
+                        self.bodies.sync()  # el cuerpo llega a disco antes que el registro
+                payload = list(message_record(message))
+            self._append(["add", user.name, folder.path, payload])
+        elif event == "messages_added":
+            # Lote de Folder.add_messages(): un registro por mensaje.
+            for msg in message:
+                self._folder_event(user, "message_added", folder, msg)
+        elif event == "message_moved":
+            self._append(["move", user.name, message.id, folder.path])
+        elif event == "message_removed":
+            self._append(["remove", user.name, folder.path, message.id])
+        elif event == "folder_added":
+            # Una carpeta puede llegar con subcarpetas (y mensajes) ya armadas.
+            self._log_folder_tree(user, folder)
+
+    def _log_folder_tree(self, user: User, folder: Folder):
+        self._append(["folder", user.name, folder.path])
+        for msg in folder.iter_messages():
+            self._folder_event(user, "message_added", folder, msg)
+        for sub in folder.subfolders:
+            self._log_folder_tree(user, sub)
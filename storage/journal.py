@@ -0,0 +1,80 @@
+# storage/journal.py
+import json
+import os
+import struct
+import zlib
+from typing import Iterator, List
+
+# Cabecera de cada registro: longitud del contenido y CRC32 (little-endian).
+_HEADER = struct.Struct("<II")
+
+
+class JournalWriter:
+    """
+    Bitácora de solo-agregado (append-only).
+
+    Cada registro se escribe como:
+        [longitud: uint32][crc32: uint32][contenido JSON UTF-8]
+
+    El prefijo de longitud permite leer registro por registro sin
+    separadores, y el CRC detecta un registro a medio escribir si el
+    proceso se corta durante una escritura.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self._fsync = fsync
+        self._file = open(path, "ab")
+
+    def append(self, record: list):
+        """Agrega un registro y lo vuelca al sistema operativo."""
+        payload = json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        self._file.write(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._file.flush()
+        if self._fsync:
+            os.fsync(self._file.fileno())
+
+    def sync(self):
+        """Fuerza la escritura a disco."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+
+class JournalReader:
+    """
+    Lee una bitácora registro por registro (en streaming).
+
+    La lectura se detiene en el primer registro incompleto o corrupto;
+    valid_bytes indica hasta dónde llega la parte sana del archivo, para
+    poder truncar la cola dañada antes de seguir escribiendo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.valid_bytes = 0
+
+    def __iter__(self) -> Iterator[List]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    return
+                length, crc = _HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    return
+                self.valid_bytes += _HEADER.size + length
+                yield json.loads(payload)
+
+    def truncate_tail(self):
+        """Descarta lo que haya después del último registro válido."""
+        if os.path.exists(self.path) and os.path.getsize(self.path) > self.valid_bytes:
+            with open(self.path, "r+b") as f:
+                f.truncate(self.valid_bytes)
@@ -0,0 +1,290 @@
+# storage/mail_import.py
+"""
+Importación de correo existente (mbox o Maildir) al buzón de un usuario.
+
+Uso (desde la raíz del proyecto):
+    python -m storage.mail_import --data data --user ana ~/mail/archivo.mbox ~/Maildir
+"""
+import argparse
+import email
+import os
+import sys
+import time
+from email.header import decode_header, make_header
+from email.utils import getaddresses, parseaddr, parsedate_to_datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models.message import Message
+
+# Mensajes por lote entregado a User.ingest().
+IMPORT_BATCH_SIZE = 1_000
+# Segundos entre dos informes de progreso.
+PROGRESS_INTERVAL = 1.0
+
+
+# ===================================================================
+# LECTURA (GENERADORES)
+# ===================================================================
+def read_mbox(path: str) -> Iterator[bytes]:
+    """
+    Genera los mensajes crudos de un archivo mbox, de a uno: el archivo se
+    lee por líneas y nunca hay más de un mensaje en memoria.
+
+    Cada línea "From " separa un mensaje del siguiente; las líneas del
+    cuerpo escapadas como ">From " (mboxrd) pierden un ">".
+    """
+    with open(path, "rb") as f:
+        lines: List[bytes] = []
+        started = False
+        for line in f:
+            if line.startswith(b"From "):
+                if started:
+                    yield b"".join(lines)
+                lines = []
+                started = True
+                continue
+            if line.startswith(b">") and line.lstrip(b">").startswith(b"From "):
+                line = line[1:]
+            lines.append(line)
+        if started or lines:
+            yield b"".join(lines)
+
+
+def read_maildir(path: str) -> Iterator[Tuple[bytes, str]]:
+    """
+    Genera (mensaje crudo, marcas) de un directorio Maildir (subcarpetas
+    cur y new). Las marcas son las del nombre del archivo ("...:2,FS").
+    Los archivos se recorren con os.scandir, sin listar todo el directorio.
+    """
+    for sub in ("cur", "new"):
+        directory = os.path.join(path, sub)
+        if not os.path.isdir(directory):
+            continue
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                _, _, flags = entry.name.partition(":2,")
+                with open(entry.path, "rb") as f:
+                    yield f.read(), flags
+
+
+# ===================================================================
+# CONVERSIÓN A Message
+# ===================================================================
+def _header(value) -> str:
+    """Texto de un encabezado, decodificando los "encoded words" (=?utf-8?...?=)."""
+    if value is None:
+        return ""
+    try:
+        return str(make_header(decode_header(str(value))))
+    except (LookupError, UnicodeError, ValueError):
+        return str(value)
+
+
+def _addresses(values: Optional[List[str]]) -> List[str]:
+    return [addr or _header(name) for name, addr in getaddresses([_header(v) for v in values or ()])
+            if addr or name]
+
+
+def _body_text(msg) -> str:
+    """Primera parte text/plain que no sea adjunto (si no hay, la primera text/*)."""
+    fallback = None
+    for part in msg.walk():
+        if part.is_multipart() or part.get_filename():
+            continue
+        if part.get_content_type() == "text/plain":
+            return _decode_part(part)
+        if fallback is None and part.get_content_maintype() == "text":
+            fallback = part
+    return _decode_part(fallback) if fallback is not None else ""
+
+
+def _decode_part(part) -> str:
+    payload = part.get_payload(decode=True) or b""
+    charset = part.get_content_charset() or "utf-8"
+    try:
+        text = payload.decode(charset, "replace")
+    except LookupError:
+        text = payload.decode("utf-8", "replace")
+    return text.rstrip("\r\n")
+
+
+def _is_urgent(msg, flags: str) -> bool:
+    """Marca F de Maildir, o prioridad alta en los encabezados."""
+    if "F" in flags:
+        return True
+    priority = (msg.get("X-Priority") or "").strip()
+    importance = (msg.get("Importance") or msg.get("Priority") or "").strip().lower()
+    return priority[:1] in ("1", "2") or importance in ("high", "urgent")
+
+
+def parse_message(raw: bytes, flags: str = "") -> Message:
+    """
+    Convierte un mensaje RFC 5322 crudo en Message: From, To, Cc, Subject,
+    cuerpo de texto y la fecha original del encabezado Date (si falta o no
+    se entiende, la fecha actual).
+    """
+    msg = email.message_from_bytes(raw)
+    name, addr = parseaddr(_header(msg.get("From")))
+    try:
+        date = parsedate_to_datetime(msg["Date"]) if msg["Date"] else None
+    except (TypeError, ValueError, IndexError):
+        date = None
+    return Message(
+        addr or name,
+        ", ".join(_addresses(msg.get_all("To"))),
+        _header(msg.get("Subject")),
+        _body_text(msg),
+        _is_urgent(msg, flags),
+        cc=tuple(_addresses(msg.get_all("Cc"))),
+        date=date,
+    )
+
+
+# ===================================================================
+# IMPORTADOR
+# ===================================================================
+class MailImporter:
+    """
+    Importa correo existente al buzón de un usuario, en memoria acotada.
+
+    Las fuentes se leen como generadores (read_mbox, read_maildir): sólo
+    hay un mensaje crudo por vez y, ya convertidos, a lo sumo batch_size
+    mensajes esperando. Cada lote se entrega con User.ingest(), que aplica
+    los filtros y lo inserta como lo haría receive() mensaje por mensaje.
+    Con StorageEngine, los cuerpos pasan a bodies.bin al guardarse, así
+    que tampoco se acumulan en memoria.
+
+    Con workers > 1 los filtros de cada lote se evalúan en un grupo de
+    procesos que dura toda la importación (conviene un batch_size de al
+    menos workers × BULK_CHUNK_SIZE).
+
+    progress(stats) se llama cada PROGRESS_INTERVAL segundos y al terminar,
+    con los contadores de stats().
+
+    Uso:
+        importer = MailImporter(user, progress=print_progress)
+        importer.import_path("archivo.mbox")
+    """
+
+    def __init__(self, user, batch_size: int = IMPORT_BATCH_SIZE, workers: int = 1,
+                 progress: Optional[Callable[[Dict[str, float]], None]] = None):
+        self.user = user
+        self.batch_size = batch_size
+        self.workers = workers
+        self.progress = progress
+        # Contadores
+        self.imported = 0
+        self.failed = 0
+        self.bytes_read = 0
+        self._started_at: Optional[float] = None
+        self._reported_at = 0.0
+
+    # ===================================================================
+    # API PÚBLICA
+    # ===================================================================
+    def import_path(self, path: str) -> Dict[str, float]:
+        """Un directorio se lee como Maildir; un archivo, como mbox."""
+        if os.path.isdir(path):
+            return self.import_maildir(path)
+        return self.import_mbox(path)
+
+    def import_mbox(self, path: str) -> Dict[str, float]:
+        return self.import_raw((raw, "") for raw in read_mbox(path))
+
+    def import_maildir(self, path: str) -> Dict[str, float]:
+        return self.import_raw(read_maildir(path))
+
+    def import_raw(self, sources: Iterable[Tuple[bytes, str]]) -> Dict[str, float]:
+        """Importa pares (mensaje crudo, marcas); los que no se pueden leer se cuentan en 'failed'."""
+        return self.import_messages(self._parse(sources))
+
+    def import_messages(self, messages: Iterable[Message]) -> Dict[str, float]:
+        """Entrega los mensajes al usuario en lotes de batch_size."""
+        if self._started_at is None:
+            self._started_at = time.perf_counter()
+        if self.workers == 1:
+            self._run(messages, None)
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(self.workers) as pool:
+                self._run(messages, pool)
+        stats = self.stats()
+        if self.progress is not None:
+            self.progress(stats)
+        return stats
+
+    def stats(self) -> Dict[str, float]:
+        """Mensajes importados y fallidos, bytes leídos, segundos y mensajes por segundo."""
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "bytes_read": self.bytes_read,
+            "seconds": elapsed,
+            "messages_per_second": self.imported / elapsed if elapsed else 0.0,
+        }
+
+    # ===================================================================
+    # ETAPAS
+    # ===================================================================
+    def _parse(self, sources: Iterable[Tuple[bytes, str]]) -> Iterator[Message]:
+        for raw, flags in sources:
+            self.bytes_read += len(raw)
+            try:
+                yield parse_message(raw, flags)
+            except Exception:
+                self.failed += 1
+
+    def _run(self, messages: Iterable[Message], executor):
+        batch: List[Message] = []
+        for message in messages:
+            batch.append(message)
+            if len(batch) >= self.batch_size:
+                self._deliver(batch, executor)
+                batch = []
+        if batch:
+            self._deliver(batch, executor)
+
+    def _deliver(self, batch: List[Message], executor):
+        self.imported += self.user.ingest(batch, workers=self.workers, executor=executor)
+        now = time.perf_counter()
+        if self.progress is not None and now - self._reported_at >= PROGRESS_INTERVAL:
+            self._reported_at = now
+            self.progress(self.stats())
+
+
+def print_progress(stats: Dict[str, float]):
+    """Informe de progreso en una sola línea de stderr."""
+    sys.stderr.write(
+        f"\r{stats['imported']:,} mensajes ({stats['failed']} con errores), "
+        f"{stats['bytes_read'] / 1_048_576:,.1f} MB, {stats['messages_per_second']:,.0f} mensajes/s"
+    )
+    sys.stderr.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa archivos mbox y directorios Maildir al buzón de un usuario.")
+    parser.add_argument("paths", nargs="+", help="archivos mbox o directorios Maildir")
+    parser.add_argument("--data", default="data", help="directorio de datos (StorageEngine)")
+    parser.add_argument("--user", required=True, help="usuario destino (se registra si no existe)")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=1, help="procesos para evaluar los filtros")
+    args = parser.parse_args()
+
+    from storage.engine import StorageEngine
+    storage = StorageEngine.open(args.data)
+    try:
+        storage.server.register_user(args.user)
+        importer = MailImporter(storage.server.users[args.user], args.batch_size, args.workers,
+                                progress=print_progress)
+        for path in args.paths:
+            importer.import_path(path)
+    finally:
+        storage.close()
+    sys.stderr.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# storage/snapshot.py
+import os
+import pickle
+from typing import Dict, List, Optional
+
+from models.folder import Folder
+from models.mail_server import MailServer
+from models.message import Message, reserve_ids_up_to
+from models.user import User
+from storage.body_store import BodyHandle, BodyStore
+
+_MAGIC = b"MSNAP1\n"
+
+
+# ===================================================================
+# CAPTURA
+# ===================================================================
+def capture(server: MailServer) -> dict:
+    """
+    Convierte el grafo de objetos del servidor en estructuras simples
+    (listas, tuplas, dicts) listas para serializar.
+
+    Cada mensaje se guarda una sola vez aunque esté en varios buzones
+    (p. ej. en Sent del remitente y en Inbox del destinatario); las
+    carpetas sólo guardan los ids.
+    """
+    messages: Dict[int, tuple] = {}
+    users = []
+    for user in server.users.values():
+        users.append((user.name, _capture_folder(user.root, messages), list(user.list_filters())))
+
+    edges = [(a, b) for a, neighbors in server.graph.items() for b in neighbors if a < b]
+    return {
+        "version": 1,
+        "name": server.name,
+        "users": users,
+        "edges": edges,
+        "messages": list(messages.values()),
+    }
+
+
+def _capture_folder(folder: Folder, messages: Dict[int, tuple]) -> tuple:
+    ids = []
+    for msg in folder.iter_messages():
+        ids.append(msg.id)
+        if msg.id not in messages:
+            messages[msg.id] = message_record(msg)
+    children = [_capture_folder(sub, messages) for sub in folder.subfolders]
+    return (folder.name, ids, children)
+
+
+def message_record(msg: Message) -> tuple:
+    """
+    Campos de un mensaje en el orden que espera Message.restore().
+    Un cuerpo fuera de línea se guarda como (posición, longitud) en el
+    BodyStore, sin leerlo.
+    """
+    body = msg.stored_body
+    if isinstance(body, BodyHandle):
+        body = (body.offset, body.length)
+    return (msg.id, msg.sender, msg.receiver, msg.subject, body, msg.timestamp, msg.urgent, msg.cc)
+
+
+def restore_message(record, bodies: Optional[BodyStore] = None) -> Message:
+    """Inverso de message_record()."""
+    record = list(record)
+    if not isinstance(record[4], str):
+        record[4] = bodies.handle(*record[4])
+    return Message.restore(*record)
+
+
+# ===================================================================
+# RESTAURACIÓN
+# ===================================================================
+def restore(data: dict, bodies: Optional[BodyStore] = None) -> MailServer:
+    """
+    Reconstruye un MailServer a partir de lo que devolvió capture().
+    bodies es el BodyStore donde están los cuerpos fuera de línea.
+    """
+    server = MailServer(data["name"])
+    messages = {}
+    max_id = 0
+    for record in data["messages"]:
+        msg = restore_message(record, bodies)
+        messages[msg.id] = msg
+        max_id = max(max_id, msg.id)
+
+    for name, tree, filters in data["users"]:
+        server.register_user(name)
+        user = server.users[name]
+        _restore_folder(user, user.root, tree, messages)
+        for keyword, folder_name in filters:
+            user.add_filter(keyword, folder_name)
+
+    for a, b in data["edges"]:
+        server.connect(a, b)
+
+    reserve_ids_up_to(max_id)
+    return server
+
+
+def _restore_folder(user: User, folder: Folder, node: tuple, messages: Dict[int, Message]):
+    _, ids, children = node
+    for message_id in ids:
+        user.store(messages[message_id], folder)
+
+    # Las carpetas que ya crea User (Inbox, Sent) se reutilizan por posición.
+    existing: List[Folder] = list(folder.subfolders)
+    for i, child in enumerate(children):
+        if i < len(existing) and existing[i].name == child[0]:
+            sub = existing[i]
+        else:
+            sub = Folder(child[0])
+            folder.add_folder(sub)
+        _restore_folder(user, sub, child, messages)
+
+
+# ===================================================================
+# ARCHIVOS
+# ===================================================================
+def write_snapshot(path: str, data: dict):
+    """Escribe la instantánea de forma atómica (archivo temporal + rename)."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_MAGIC)
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_snapshot(path: str) -> dict:
+    """Lee una instantánea escrita por write_snapshot()."""
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path} no es una instantánea válida")
+        return pickle.load(f)
@@ -0,0 +1,764 @@
+# storage/sqlite_backend.py
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+from interfaces.mail_operations import MailOperations
+from models.filter_engine import BULK_CHUNK_SIZE, classify_bulk, compile_filters
+from models.folder import Folder
+from models.message import Message, reserve_ids_up_to
+from models.search_index import tokenize
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id       INTEGER PRIMARY KEY,
+    sender   TEXT NOT NULL,
+    receiver TEXT NOT NULL,
+    cc       TEXT NOT NULL DEFAULT '',
+    subject  TEXT NOT NULL,
+    body     TEXT NOT NULL,
+    ts       INTEGER NOT NULL,
+    urgent   INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS messages_subject ON messages(subject);
+CREATE INDEX IF NOT EXISTS messages_urgent ON messages(urgent, ts);
+
+CREATE TABLE IF NOT EXISTS folders (
+    id        INTEGER PRIMARY KEY,
+    user      TEXT NOT NULL,
+    parent_id INTEGER REFERENCES folders(id),
+    name      TEXT NOT NULL COLLATE NOCASE,
+    path      TEXT NOT NULL COLLATE NOCASE,
+    UNIQUE (user, path)
+);
+CREATE INDEX IF NOT EXISTS folders_parent ON folders(parent_id);
+CREATE INDEX IF NOT EXISTS folders_name ON folders(user, name);
+
+-- Ubicación de cada mensaje: un mismo mensaje puede estar en varios
+-- buzones (Sent del remitente, Inbox de cada destinatario). El rowid
+-- conserva el orden de llegada dentro de la carpeta.
+CREATE TABLE IF NOT EXISTS placements (
+    folder_id  INTEGER NOT NULL REFERENCES folders(id),
+    message_id INTEGER NOT NULL REFERENCES messages(id),
+    user       TEXT NOT NULL,
+    UNIQUE (folder_id, message_id)
+);
+CREATE INDEX IF NOT EXISTS placements_user ON placements(user, message_id);
+CREATE INDEX IF NOT EXISTS placements_message ON placements(message_id);
+
+CREATE TABLE IF NOT EXISTS filters (
+    user    TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    folder  TEXT NOT NULL,
+    PRIMARY KEY (user, keyword)
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    subject, sender, receiver, body, content='messages', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, subject, sender, receiver, body)
+    VALUES (new.id, new.subject, new.sender, new.receiver, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, subject, sender, receiver, body)
+    VALUES ('delete', old.id, old.subject, old.sender, old.receiver, old.body);
+END;
+"""
+
+_COLUMNS = "m.id, m.sender, m.receiver, m.cc, m.subject, m.body, m.ts, m.urgent"
+
+# Ids de una carpeta y de todo su subárbol (el parámetro es la carpeta inicial).
+_SUBTREE = (
+    "WITH RECURSIVE subtree(id) AS ("
+    " SELECT ? UNION ALL"
+    " SELECT f.id FROM folders f JOIN subtree s ON f.parent_id = s.id) "
+)
+
+# Pesos de bm25 por columna del índice FTS5, en el mismo orden que sus
+# columnas; equivalen a FIELD_WEIGHTS de models/search_index.py.
+_BM25 = "bm25(messages_fts, 3.0, 2.0, 2.0, 1.0)"
+
+# Orden de las vistas de Folder.page().
+_VIEW_ORDER = {
+    "urgent": "m.urgent DESC, m.ts DESC, m.id DESC",
+    "newest": "m.ts DESC, m.id DESC",
+}
+
+
+class _Rows(list):
+    """Filas ya leídas de un cursor, con la parte de su interfaz que se usa aquí."""
+
+    __slots__ = ("lastrowid",)
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        super().__init__(cursor.fetchall())
+        self.lastrowid = cursor.lastrowid
+
+    def fetchone(self):
+        return self[0] if self else None
+
+    def fetchall(self) -> list:
+        return list(self)
+
+
+class _LockedConnection:
+    """
+    Conexión SQLite compartida entre hilos.
+
+    Cada sentencia se ejecuta con el lock tomado y sus filas se leen
+    completas antes de soltarlo; un bloque `with` (una transacción)
+    retiene el lock hasta el commit o el rollback.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()
+
+    def execute(self, sql: str, params=()) -> _Rows:
+        with self.lock:
+            return _Rows(self._conn.execute(sql, params))
+
+    def executemany(self, sql: str, seq_of_params) -> _Rows:
+        with self.lock:
+            return _Rows(self._conn.executemany(sql, seq_of_params))
+
+    def executescript(self, script: str):
+        with self.lock:
+            self._conn.executescript(script)
+
+    def close(self):
+        with self.lock:
+            self._conn.close()
+
+    def __enter__(self) -> "_LockedConnection":
+        self.lock.acquire()
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            return self._conn.__exit__(*exc_info)
+        finally:
+            self.lock.release()
+
+
+class SQLiteMailStore:
+    """
+    Almacenamiento de buzones en una base SQLite local.
+
+    Reemplaza las estructuras en memoria de User y Folder por tablas
+    indexadas (mensajes, carpetas, ubicaciones y filtros) y un índice FTS5
+    para buscar en asunto, remitente, destinatario y cuerpo. Los mensajes
+    se leen de disco sólo cuando se piden, por lo que un proceso puede
+    manejar buzones más grandes que la memoria disponible.
+
+    Uso con el servidor (user_factory crea los usuarios respaldados por SQLite):
+
+        store = SQLiteMailStore("mail.db")
+        server = MailServer("Server1", user_factory=store.user)
+        for name in store.user_names():
+            server.register_user(name)
+
+    La conexión se comparte entre hilos (entregas concurrentes): cada
+    sentencia y cada transacción se serializan con un lock.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.conn = _LockedConnection(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        max_id = self.conn.execute("SELECT MAX(id) FROM messages").fetchone()[0]
+        reserve_ids_up_to(max_id or 0)
+        self._users: Dict[str, "SQLiteUser"] = {}
+
+    def user(self, name: str) -> "SQLiteUser":
+        """Devuelve (creándolo si hace falta) el usuario con ese nombre."""
+        user = self._users.get(name)
+        if user is None:
+            user = self._users[name] = SQLiteUser(self, name)
+        return user
+
+    def user_names(self) -> List[str]:
+        """Usuarios guardados en la base, en orden de creación."""
+        rows = self.conn.execute("SELECT user FROM folders WHERE parent_id IS NULL ORDER BY id")
+        return [row[0] for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+    # ===================================================================
+    # MENSAJES
+    # ===================================================================
+    def _load(self, row) -> Message:
+        """Construye un Message a partir de una fila (columnas de _COLUMNS)."""
+        message_id, sender, receiver, cc, subject, body, ts, urgent = row
+        message = Message.restore(message_id, sender, receiver, subject, body, ts,
+                                  bool(urgent), tuple(cc.split(",")) if cc else ())
+        message.add_owner(self)
+        return message
+
+    def _load_all(self, sql: str, params=()) -> List[Message]:
+        return [self._load(row) for row in self.conn.execute(sql, params)]
+
+    def _load_one(self, sql: str, params=()) -> Optional[Message]:
+        row = self.conn.execute(sql, params).fetchone()
+        return self._load(row) if row else None
+
+    def _save_message(self, message: Message):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (message.id, message.sender, message.receiver, ",".join(message.cc),
+             message.subject, message.body, message.timestamp, int(message.urgent)),
+        )
+        message.add_owner(self)
+
+    def _on_urgency_changed(self, message: Message):
+        """La urgencia es el único dato mutable de un mensaje: se persiste al cambiar."""
+        with self.conn:
+            self.conn.execute("UPDATE messages SET urgent = ? WHERE id = ?",
+                              (int(message.urgent), message.id))
+
+    def _drop_if_orphan(self, message_id: int):
+        """Borra el mensaje (y su entrada FTS) si ya no está en ningún buzón."""
+        self.conn.execute(
+            "DELETE FROM messages WHERE id = ?"
+            " AND NOT EXISTS (SELECT 1 FROM placements WHERE message_id = ?)",
+            (message_id, message_id),
+        )
+
+    # ===================================================================
+    # CARPETAS
+    # ===================================================================
+    def _folder(self, folder_id: Optional[int]) -> Optional["SQLiteFolder"]:
+        if folder_id is None:
+            return None
+        row = self.conn.execute(
+            "SELECT id, user, name, parent_id, path FROM folders WHERE id = ?", (folder_id,)
+        ).fetchone()
+        return SQLiteFolder(self, *row) if row else None
+
+    def _folders(self, sql: str, params=()) -> List["SQLiteFolder"]:
+        return [SQLiteFolder(self, *row) for row in self.conn.execute(sql, params)]
+
+
+class SQLiteFolder:
+    """
+    Carpeta respaldada por SQLite, con la misma interfaz pública que Folder.
+
+    Es sólo un "puntero" a una fila de la tabla folders: los mensajes y las
+    subcarpetas se consultan a la base cada vez que se piden. Las búsquedas
+    recursivas (find_by_subject, move_message) se resuelven con una única
+    consulta recursiva (WITH RECURSIVE) en lugar de recorrer el árbol en Python.
+    """
+
+    __slots__ = ("_store", "id", "user", "name", "_parent_id", "_path")
+
+    def __init__(self, store: SQLiteMailStore, folder_id: int, user: str, name: str,
+                 parent_id: Optional[int], path: str):
+        self._store = store
+        self.id = folder_id
+        self.user = user
+        self.name = name
+        self._parent_id = parent_id
+        self._path = path
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, SQLiteFolder) and other.id == self.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    def __contains__(self, message: Message) -> bool:
+        return self._store.conn.execute(
+            "SELECT 1 FROM placements WHERE folder_id = ? AND message_id = ?",
+            (self.id, message.id),
+        ).fetchone() is not None
+
+    # ===================================================================
+    # PROPIEDADES
+    # ===================================================================
+    @property
+    def parent(self) -> Optional["SQLiteFolder"]:
+        return self._store._folder(self._parent_id)
+
+    @property
+    def path(self) -> str:
+        """Ruta jerárquica desde la raíz (sin incluirla); la raíz tiene ruta vacía."""
+        return self._path
+
+    @property
+    def subfolders(self) -> List["SQLiteFolder"]:
+        return self._store._folders(
+            "SELECT id, user, name, parent_id, path FROM folders WHERE parent_id = ? ORDER BY id",
+            (self.id,),
+        )
+
+    @property
+    def messages(self) -> List[Message]:
+        """Mensajes directos de la carpeta, en orden de llegada."""
+        return self._store._load_all(
+            f"SELECT {_COLUMNS} FROM placements p JOIN messages m ON m.id = p.message_id"
+            " WHERE p.folder_id = ? ORDER BY p.rowid",
+            (self.id,),
+        )
+
+    @property
+    def message_count(self) -> int:
+        return self._store.conn.execute(
+            "SELECT COUNT(*) FROM placements WHERE folder_id = ?", (self.id,)
+        ).fetchone()[0]
+
+    def get_root(self) -> "SQLiteFolder":
+        return self._store._folders(
+            "SELECT id, user, name, parent_id, path FROM folders"
+            " WHERE user = ? AND parent_id IS NULL",
+            (self.user,),
+        )[0]
+
+    def get_child(self, name: str) -> Optional["SQLiteFolder"]:
+        """Subcarpeta directa con ese nombre (sin distinguir mayúsculas)."""
+        found = self._store._folders(
+            "SELECT id, user, name, parent_id, path FROM folders WHERE parent_id = ? AND name = ?",
+            (self.id, name),
+        )
+        return found[0] if found else None
+
+    # ===================================================================
+    # OPERACIONES PRINCIPALES
+    # ===================================================================
+    def add_folder(self, folder: Union[Folder, str]) -> "SQLiteFolder":
+        """
+        Agrega una subcarpeta directa y la devuelve. Acepta un nombre o un
+        Folder en memoria, que se copia completo (mensajes y subcarpetas).
+        """
+        name = folder if isinstance(folder, str) else folder.name
+        path = f"{self._path}/{name}" if self._path else name
+        store = self._store
+        with store.conn:
+            cursor = store.conn.execute(
+                "INSERT INTO folders (user, parent_id, name, path) VALUES (?, ?, ?, ?)",
+                (self.user, self.id, name, path),
+            )
+        child = SQLiteFolder(store, cursor.lastrowid, self.user, name, self.id, path)
+        if isinstance(folder, Folder):
+            for msg in folder.messages:
+                child.add_message(msg)
+            for sub in folder.subfolders:
+                child.add_folder(sub)
+        return child
+
+    def add_message(self, message: Message):
+        """Agrega un mensaje a esta carpeta."""
+        store = self._store
+        with store.conn:
+            store._save_message(message)
+            store.conn.execute(
+                "INSERT OR IGNORE INTO placements (folder_id, message_id, user) VALUES (?, ?, ?)",
+                (self.id, message.id, self.user),
+            )
+
+    def add_messages(self, messages: List[Message]):
+        """Agrega varios mensajes en una única transacción."""
+        store = self._store
+        with store.conn:
+            for message in messages:
+                store._save_message(message)
+            store.conn.executemany(
+                "INSERT OR IGNORE INTO placements (folder_id, message_id, user) VALUES (?, ?, ?)",
+                [(self.id, message.id, self.user) for message in messages],
+            )
+
+    def get_message(self, message_id: int) -> Optional[Message]:
+        """Devuelve el mensaje directo con ese id, o None."""
+        return self._store._load_one(
+            f"SELECT {_COLUMNS} FROM placements p JOIN messages m ON m.id = p.message_id"
+            " WHERE p.folder_id = ? AND p.message_id = ?",
+            (self.id, message_id),
+        )
+
+    def transfer(self, message_id: int, target_folder: "SQLiteFolder") -> Optional[Message]:
+        """Pasa el mensaje con ese id a target_folder (al final) y lo devuelve."""
+        message = self.get_message(message_id)
+        if message is not None:
+            with self._store.conn as conn:
+                conn.execute("DELETE FROM placements WHERE folder_id = ? AND message_id = ?",
+                             (self.id, message_id))
+                conn.execute(
+                    "INSERT OR IGNORE INTO placements (folder_id, message_id, user) VALUES (?, ?, ?)",
+                    (target_folder.id, message_id, target_folder.user),
+                )
+        return message
+
+    def remove_message(self, message_id: int) -> Optional[Message]:
+        """Quita de esta carpeta el mensaje con ese id y lo devuelve."""
+        message = self.get_message(message_id)
+        if message is not None:
+            with self._store.conn as conn:
+                conn.execute("DELETE FROM placements WHERE folder_id = ? AND message_id = ?",
+                             (self.id, message_id))
+                self._store._drop_if_orphan(message_id)
+        return message
+
+    def page(self, view: str = "urgent", offset: int = 0, limit: int = 50) -> List[Message]:
+        """Una página de la vista "urgent" o "newest" (ver Folder.page)."""
+        order = _VIEW_ORDER.get(view)
+        if order is None:
+            raise ValueError(f"Vista desconocida: {view!r} (opciones: {', '.join(_VIEW_ORDER)})")
+        return self._store._load_all(
+            f"SELECT {_COLUMNS} FROM placements p JOIN messages m ON m.id = p.message_id"
+            f" WHERE p.folder_id = ? ORDER BY {order} LIMIT ? OFFSET ?",
+            (self.id, limit, max(offset, 0)),
+        )
+
+    # ===================================================================
+    # BÚSQUEDA Y MOVIMIENTO (CONSULTA RECURSIVA)
+    # ===================================================================
+    def find_by_subject(self, subject: str) -> Optional[Message]:
+        """
+        Busca un mensaje por asunto en esta carpeta y su subárbol; los de
+        la carpeta actual tienen prioridad.
+        """
+        return self._store._load_one(
+            _SUBTREE + f"SELECT {_COLUMNS} FROM placements p JOIN messages m ON m.id = p.message_id"
+            " WHERE m.subject = ? AND p.folder_id IN subtree"
+            " ORDER BY p.folder_id != ?, p.rowid LIMIT 1",
+            (self.id, subject, self.id),
+        )
+
+    def move_message(self, subject: str, target_folder: "SQLiteFolder") -> bool:
+        """Mueve a target_folder el primer mensaje del subárbol con ese asunto."""
+        row = self._store.conn.execute(
+            _SUBTREE + "SELECT p.folder_id, p.message_id FROM placements p"
+            " JOIN messages m ON m.id = p.message_id"
+            " WHERE m.subject = ? AND p.folder_id IN subtree"
+            " ORDER BY p.folder_id != ?, p.rowid LIMIT 1",
+            (self.id, subject, self.id),
+        ).fetchone()
+        if row is None:
+            return False
+        self._store._folder(row[0]).transfer(row[1], target_folder)
+        return True
+
+    def print_tree(self, level: int = 0):
+        indent = "  " * level
+        print(f"{indent}- {self.name} ({self.message_count} mensajes)")
+        for sub in self.subfolders:
+            sub.print_tree(level + 1)
+
+
+class SQLiteUser(MailOperations):
+    """
+    Usuario cuyas carpetas, mensajes y filtros viven en SQLiteMailStore.
+
+    Expone los mismos métodos públicos que User (send, receive, classify,
+    store, get_folder, create_folder, move_message, list_inbox, search,
+    top_urgent, ...), pero cada operación es una consulta indexada:
+    - carpeta por nombre o ruta: índice (user, name) / (user, path)
+    - ubicación de un mensaje: índice (user, message_id)
+    - búsqueda de texto: FTS5, ordenada por bm25
+    - urgentes más recientes: índice (urgent, ts)
+
+    No usa la bitácora de storage/engine.py: la base ya es persistente.
+    """
+
+    def __init__(self, store: SQLiteMailStore, name: str):
+        self._store = store
+        self._name = name
+        self._journal = None
+        self._metrics = None
+        # Hace atómicas las operaciones de varios pasos (p. ej. filtrar y guardar).
+        self._lock = threading.RLock()
+        with store.conn:
+            store.conn.execute(
+                "INSERT OR IGNORE INTO folders (user, parent_id, name, path) VALUES (?, NULL, 'Root', '')",
+                (name,),
+            )
+        self._root = self._folder_by_path("")
+        self._inbox = self._root.get_child("Inbox") or self._root.add_folder("Inbox")
+        self._sent = self._root.get_child("Sent") or self._root.add_folder("Sent")
+
+        self._filters: Dict[str, str] = dict(store.conn.execute(
+            "SELECT keyword, folder FROM filters WHERE user = ? ORDER BY rowid", (name,)
+        ).fetchall())
+        self._filter_engine = None
+
+    # ===================================================================
+    # PROPIEDADES
+    # ===================================================================
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def root(self) -> SQLiteFolder:
+        return self._root
+
+    @property
+    def inbox(self) -> SQLiteFolder:
+        return self._inbox
+
+    @property
+    def sent(self) -> SQLiteFolder:
+        return self._sent
+
+    @property
+    def lock(self) -> threading.RLock:
+        return self._lock
+
+    # ===================================================================
+    # ENVÍO Y RECEPCIÓN DE MENSAJES
+    # ===================================================================
+    def send(self, server, receiver, subject, body, urgent=False) -> bool:
+        """Crea el mensaje, lo guarda en Sent y delega la entrega al servidor."""
+        msg = Message(self._name, receiver, subject, body, urgent)
+        with self._lock:
+            self._sent.add_message(msg)
+        return server.send_message(receiver, msg)
+
+    def send_many(self, server, to, subject, body, urgent=False, cc=(), bcc=()) -> Dict[str, bool]:
+        """Envía un único mensaje a varios destinatarios (Para, CC y CCO)."""
+        to = [to] if isinstance(to, str) else list(to)
+        msg = Message(self._name, ", ".join(to), subject, body, urgent, cc=tuple(cc))
+        with self._lock:
+            self._sent.add_message(msg)
+        return server.send_message_many(msg, [*to, *cc, *bcc])
+
+    def receive(self, message: Message):
+        """Clasifica el mensaje con los filtros y lo guarda."""
+        with self._lock:
+            self.store(message, self.classify(message))
+
+    def classify(self, message: Message) -> SQLiteFolder:
+        """Carpeta destino según los filtros automáticos (Inbox si ninguno coincide)."""
+        with self._lock:
+            folder_name = self._apply_filters(message)
+            if folder_name is None:
+                return self._inbox
+            return self.get_folder(folder_name) or self.create_folder(folder_name)
+
+    def store(self, message: Message, folder: SQLiteFolder):
+        """Guarda el mensaje en la carpeta indicada (una copia si ya lo tiene, ver User.store)."""
+        with self._lock:
+            if self.folder_of(message.id) is not None:
+                message = message.copy()
+            folder.add_message(message)
+        if self._metrics is not None:
+            self._metrics.message_stored(self._name, folder)
+
+    def ingest(self, messages: Iterable[Message], workers: Optional[int] = None,
+               chunk_size: int = BULK_CHUNK_SIZE, executor=None) -> int:
+        """Importación masiva: filtros en procesos de trabajo (ver User.ingest)."""
+        messages = list(messages)
+        rules = tuple(self.list_filters())
+        texts = [(m.subject, m.body) for m in messages] if rules else []
+        folder_names = classify_bulk([(rules, texts)], workers, chunk_size, executor)[0]
+        self.store_many(messages, folder_names or [None] * len(messages))
+        return len(messages)
+
+    def store_many(self, messages: List[Message], folder_names: List[Optional[str]],
+                   terms: Optional[List] = None):
+        """
+        Guarda cada mensaje en su carpeta, una transacción por carpeta.
+        terms se ignora: FTS5 indexa cada mensaje al insertarlo.
+        """
+        with self._lock:
+            placed = self._placed_ids([message.id for message in messages])
+            batches: Dict[Optional[str], List[Message]] = {}
+            for message, folder_name in zip(messages, folder_names):
+                if message.id in placed:
+                    message = message.copy()
+                placed.add(message.id)
+                batches.setdefault(folder_name, []).append(message)
+            for folder_name, batch in batches.items():
+                if folder_name is None:
+                    folder = self._inbox
+                else:
+                    folder = self.get_folder(folder_name) or self.create_folder(folder_name)
+                folder.add_messages(batch)
+                if self._metrics is not None:
+                    self._metrics.message_stored(self._name, folder, len(batch))
+
+    def _placed_ids(self, ids: List[int]) -> Set[int]:
+        """Los ids de la lista que el usuario ya tiene guardados (consultas de a 500)."""
+        found: Set[int] = set()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            found.update(row[0] for row in self._store.conn.execute(
+                "SELECT message_id FROM placements WHERE user = ?"
+                f" AND message_id IN ({', '.join('?' * len(chunk))})",
+                (self._name, *chunk),
+            ))
+        return found
+
+    # ===================================================================
+    # URGENCIA
+    # ===================================================================
+    def top_urgent(self, k: int = 10) -> List[Message]:
+        """Los k mensajes urgentes más recientes del usuario."""
+        return self._store._load_all(
+            f"SELECT {_COLUMNS} FROM messages m WHERE m.urgent = 1"
+            " AND EXISTS (SELECT 1 FROM placements p WHERE p.user = ? AND p.message_id = m.id)"
+            " ORDER BY m.ts DESC LIMIT ?",
+            (self._name, k),
+        )
+
+    def peek_urgent(self) -> Optional[Message]:
+        top = self.top_urgent(1)
+        return top[0] if top else None
+
+    # ===================================================================
+    # FILTROS AUTOMÁTICOS
+    # ===================================================================
+    def add_filter(self, keyword: str, folder_name: str):
+        keyword = keyword.lower()
+        with self._lock:
+            with self._store.conn as conn:
+                conn.execute(
+                    "INSERT INTO filters (user, keyword, folder) VALUES (?, ?, ?)"
+                    " ON CONFLICT (user, keyword) DO UPDATE SET folder = excluded.folder",
+                    (self._name, keyword, folder_name),
+                )
+            self._filters[keyword] = folder_name
+            self._filter_engine = None
+
+    def _apply_filters(self, message: Message) -> Optional[str]:
+        if not self._filters:
+            return None
+        if self._filter_engine is None:
+            self._filter_engine = compile_filters(self._filters.items())
+        if self._metrics is None:
+            return self._filter_engine.match(message.subject.lower(), message.body.lower())
+        start = time.perf_counter()
+        folder_name = self._filter_engine.match(message.subject.lower(), message.body.lower())
+        self._metrics.filters_matched(time.perf_counter() - start, folder_name is not None)
+        return folder_name
+
+    def list_filters(self):
+        return [(k, v) for k, v in self._filters.items()]
+
+    # ===================================================================
+    # MANEJO DE CARPETAS Y MENSAJES
+    # ===================================================================
+    def get_folder(self, name: str, folder: Optional[SQLiteFolder] = None) -> Optional[SQLiteFolder]:
+        """
+        Busca una carpeta por nombre o por ruta ("Work/Projects"), sin
+        distinguir mayúsculas. Con 'folder', sólo dentro de ese subárbol.
+        """
+        key = name.strip("/")
+        if folder is not None:
+            found = self._store._folders(
+                _SUBTREE + "SELECT id, user, name, parent_id, path FROM folders"
+                " WHERE id IN subtree AND name = ? ORDER BY id LIMIT 1",
+                (folder.id, key),
+            )
+            return found[0] if found else None
+        if "/" in key:
+            return self._folder_by_path(key)
+        found = self._store._folders(
+            "SELECT id, user, name, parent_id, path FROM folders"
+            " WHERE user = ? AND name = ? AND parent_id IS NOT NULL ORDER BY id LIMIT 1",
+            (self._name, key),
+        )
+        return found[0] if found else None
+
+    def _folder_by_path(self, path: str) -> Optional[SQLiteFolder]:
+        found = self._store._folders(
+            "SELECT id, user, name, parent_id, path FROM folders WHERE user = ? AND path = ?",
+            (self._name, path),
+        )
+        return found[0] if found else None
+
+    def create_folder(self, path: str) -> SQLiteFolder:
+        """Crea (si no existen) las carpetas de la ruta y devuelve la última."""
+        folder = self._root
+        for part in path.strip("/").split("/"):
+            folder = folder.get_child(part) or folder.add_folder(part)
+        return folder
+
+    def move_message(self, subject: str, target_name: str) -> bool:
+        target = self.get_folder(target_name)
+        if target is None:
+            return False
+        return self._root.move_message(subject, target)
+
+    def folder_of(self, message_id: int) -> Optional[SQLiteFolder]:
+        """Carpeta que contiene al mensaje (la más reciente si hay varias)."""
+        row = self._store.conn.execute(
+            "SELECT folder_id FROM placements WHERE user = ? AND message_id = ?"
+            " ORDER BY rowid DESC LIMIT 1",
+            (self._name, message_id),
+        ).fetchone()
+        return self._store._folder(row[0]) if row else None
+
+    def find_message(self, message_id: int) -> Optional[Message]:
+        folder = self.folder_of(message_id)
+        return folder.get_message(message_id) if folder else None
+
+    def move_message_by_id(self, message_id: int, target_name: str) -> bool:
+        with self._lock:
+            target = self.get_folder(target_name)
+            source = self.folder_of(message_id)
+            if target is None or source is None:
+                return False
+            if source != target:
+                source.transfer(message_id, target)
+            return True
+
+    def delete_message(self, message_id: int) -> bool:
+        with self._lock:
+            source = self.folder_of(message_id)
+            if source is None:
+                return False
+            source.remove_message(message_id)
+            return True
+
+    # ===================================================================
+    # BÚSQUEDA DE TEXTO COMPLETO (FTS5)
+    # ===================================================================
+    def search(self, query: str, folder=None, limit: Optional[int] = 50) -> List[Message]:
+        """
+        Busca con FTS5 en asunto, remitente, destinatario y cuerpo, con la
+        misma sintaxis que User.search(): términos en AND y "proy*" por
+        prefijo. folder (nombre, ruta o carpeta) restringe al subárbol.
+        """
+        match = _fts_query(query)
+        if not match:
+            return []
+        scope = folder
+        if isinstance(folder, str):
+            scope = self.get_folder(folder)
+            if scope is None:
+                return []
+        if scope is None:
+            scope = self._root
+
+        return self._store._load_all(
+            _SUBTREE + f"SELECT {_COLUMNS} FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid"
+            " WHERE messages_fts MATCH ? AND EXISTS ("
+            "  SELECT 1 FROM placements p WHERE p.message_id = m.id AND p.folder_id IN subtree)"
+            f" ORDER BY {_BM25}, m.id DESC LIMIT ?",
+            (scope.id, match, -1 if limit is None else limit),
+        )
+
+    def list_inbox(self) -> List[Message]:
+        return self._inbox.messages
+
+    def print_folder_tree(self):
+        print(f"\nUsuario: {self._name}")
+        self._root.print_tree()
+
+
+def _fts_query(query: str) -> str:
+    """Traduce la sintaxis de búsqueda del cliente a una expresión MATCH de FTS5."""
+    terms = []
+    for raw in query.split():
+        tokens = tokenize(raw)
+        for token in tokens[:-1]:
+            terms.append(f'"{token}"')
+        if tokens:
+            terms.append(f'"{tokens[-1]}"' + ("*" if raw.endswith("*") else ""))
+    return " ".join(terms)
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+from engine.async_delivery import AsyncDeliveryEngine
+from models.mail_server import MailServer
+from models.message import Message
+from utils.metrics import MailMetrics
+
+
+def build():
+    server = MailServer("async")
+    for name in ("ana", "beto", "carla"):
+        server.register_user(name)
+    server.connect("ana", "beto")
+    server.users["beto"].add_filter("factura", "Pagos")
+    return server
+
+
+def test_pipeline_delivers_and_records_metrics():
+    server = build()
+    metrics = MailMetrics()
+    server.attach_metrics(metrics)
+
+    async def run():
+        async with AsyncDeliveryEngine(server, queue_size=8) as engine:
+            futures = [await engine.submit(receiver, Message("ana", receiver, f"factura {i}", "luz"))
+                       for i in range(30) for receiver in ("beto", "carla", "nadie")]
+            results = await asyncio.gather(*futures)
+            return results, engine.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == [True, True, False] * 30
+    assert stats["delivered"] == 60 and stats["failed"] == 30 and stats["in_flight"] == 0
+    assert server.users["beto"].get_folder("Pagos").message_count == 30
+    assert server.users["carla"].inbox.message_count == 30
+    assert metrics.sent.value(("delivered",)) == 60
+    assert metrics.sent.value(("failed",)) == 30
+
+
+def test_slow_stage_does_not_block_the_event_loop():
+    server = build()
+    beto = server.users["beto"]
+    classify = beto.classify
+
+    def slow_classify(message):
+        time.sleep(0.3)
+        return classify(message)
+
+    beto.classify = slow_classify
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        async with AsyncDeliveryEngine(server) as engine:
+            assert await engine.send("beto", Message("ana", "beto", "hola", "qué tal"))
+        task.cancel()
+        return ticks
+
+    # Con la etapa de filtros en el loop, el ticker no avanzaría durante 0.3 s.
+    assert asyncio.run(run()) >= 10
+
+
+def test_each_stage_runs_several_messages_at_once():
+    server = build()
+    beto = server.users["beto"]
+    classify = beto.classify
+
+    def slow_classify(message):
+        time.sleep(0.2)
+        return classify(message)
+
+    beto.classify = slow_classify
+
+    async def run():
+        async with AsyncDeliveryEngine(server, workers=4) as engine:
+            start = time.perf_counter()
+            futures = [await engine.submit("beto", Message("ana", "beto", f"m{i}", "..."))
+                       for i in range(4)]
+            assert await asyncio.gather(*futures) == [True] * 4
+            return time.perf_counter() - start
+
+    # Con un solo consumidor por etapa serían 4 × 0.2 s.
+    assert asyncio.run(run()) < 0.6
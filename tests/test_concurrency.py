@@ -0,0 +1,70 @@
+import random
+import threading
+
+from benchmarks.stress_delivery import parse_args, run
+from models.mail_server import MailServer
+
+
+def test_concurrent_delivery_loses_no_messages():
+    assert run(parse_args(["--users", "30", "--messages", "3000", "--threads", "6"])) == 0
+
+
+def test_concurrent_delivery_survives_recovery(tmp_path):
+    args = parse_args(["--users", "20", "--messages", "1500", "--threads", "4",
+                       "--persist", "--snapshot-every", "400", "--dir", str(tmp_path)])
+    assert run(args) == 0
+
+
+def test_acquire_all_holds_deliveries_until_release_all():
+    server = MailServer("local")
+    for name in ("ana", "beto"):
+        server.register_user(name)
+    server.connect("ana", "beto")
+    assert server.acquire_all()
+
+    sender = threading.Thread(target=server.users["ana"].send, args=(server, "beto", "hola", "..."))
+    sender.start()
+    sender.join(0.2)
+    assert sender.is_alive()
+    assert server.users["beto"].inbox.messages == []
+
+    server.release_all()
+    sender.join()
+    assert [m.subject for m in server.users["beto"].inbox.messages] == ["hola"]
+
+
+def test_reachability_reads_do_not_race_with_connect():
+    server = MailServer("red")
+    names = [f"u{i}" for i in range(300)]
+    for name in names:
+        server.register_user(name)
+    rng = random.Random(5)
+    edges = [(rng.choice(names), rng.choice(names)) for _ in range(600)]
+    stop = threading.Event()
+
+    def read():
+        local = random.Random(7)
+        while not stop.is_set():
+            server.is_reachable(local.choice(names), local.choice(names))
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    parent_before = None
+    try:
+        for a, b in edges:
+            server.connect(a, b)
+        parent_before = dict(server._parent)
+        server.is_reachable(names[0], names[-1])
+    finally:
+        stop.set()
+        for reader in readers:
+            reader.join()
+
+    # Las lecturas no comprimen caminos y cada raíz conserva su tamaño.
+    assert server._parent == parent_before
+    roots = {server._root(name) for name in names}
+    assert set(server._size) == roots
+    assert sum(server._size.values()) == len(names)
+    for a, b in edges[:50]:
+        assert server.is_reachable(a, b)
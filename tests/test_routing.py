@@ -0,0 +1,102 @@
+import random
+from collections import deque
+
+from models.mail_server import MailServer
+from models.message import Message
+from utils.metrics import MailMetrics
+
+
+def build(n, extra_edges, seed=3, **kwargs):
+    rng = random.Random(seed)
+    server = MailServer("red", **kwargs)
+    names = [f"u{i}" for i in range(n)]
+    for name in names:
+        server.register_user(name)
+    # Una cadena larga (rutas profundas) más algunos atajos al azar.
+    for a, b in zip(names, names[1:]):
+        server.connect(a, b)
+    for _ in range(extra_edges):
+        server.connect(rng.choice(names), rng.choice(names))
+    return server, names
+
+
+def distance(server, a, b):
+    seen = {a: 0}
+    queue = deque([a])
+    while queue:
+        node = queue.popleft()
+        for neighbor in server.graph[node]:
+            if neighbor not in seen:
+                seen[neighbor] = seen[node] + 1
+                queue.append(neighbor)
+    return seen.get(b)
+
+
+def assert_valid(server, path, a, b):
+    assert path[0] == a and path[-1] == b
+    for x, y in zip(path, path[1:]):
+        assert y in server.graph[x]
+    assert len(path) - 1 == distance(server, a, b)
+
+
+def test_routes_are_shortest_with_and_without_trees():
+    server, names = build(300, 60)
+    rng = random.Random(1)
+    for _ in range(2000):
+        # Pocos remitentes: terminan con su árbol en caché.
+        a, b = rng.choice(names[:5]), rng.choice(names)
+        assert_valid(server, server.route(a, b), a, b)
+    assert server._route_cache
+
+
+def test_cold_senders_do_not_build_full_trees():
+    server, names = build(5000, 500)
+    built = []
+    original = server._bfs_tree
+    server._bfs_tree = lambda start, stop_after=None: built.append(start) or original(start, stop_after)
+    rng = random.Random(2)
+    # Muchos remitentes distintos, un par de envíos cada uno.
+    for sender in names[:200]:
+        for _ in range(2):
+            server.route(sender, rng.choice(names))
+    assert built == []
+
+
+def test_repeated_pair_is_served_from_cache():
+    server, names = build(1000, 100)
+    first = server.route("u0", "u999")
+    server._bidirectional_bfs = None  # una segunda búsqueda fallaría
+    assert server.route("u0", "u999") is first
+
+
+def test_tree_cache_respects_node_budget():
+    server, names = build(400, 40, route_cache_nodes=1000)
+    rng = random.Random(4)
+    for _ in range(3000):
+        server.route(rng.choice(names[:20]), rng.choice(names))
+    assert server._cached_nodes == sum(len(tree) for tree in server._route_cache.values())
+    assert server._cached_nodes <= 1000
+
+
+def test_connect_invalidates_cached_routes():
+    server, names = build(50, 0)
+    assert len(server.route("u0", "u49")) == 50
+    server.connect("u0", "u49")
+    assert server.route("u0", "u49") == ["u0", "u49"]
+
+
+def test_send_message_many_uses_one_traversal_and_records_each_send():
+    server, names = build(200, 20)
+    server.register_user("aislado")
+    metrics = MailMetrics()
+    server.attach_metrics(metrics)
+    server.route = None  # las rutas deben salir de routes_many
+
+    message = Message("u0", "u10, u150", "aviso", "reunión")
+    status = server.send_message_many(message, ["u10", "u150", "aislado", "nadie", "u10"])
+
+    assert status == {"u10": True, "u150": True, "aislado": True, "nadie": False}
+    assert server.users["u150"].inbox.messages == [message]
+    assert server.users["aislado"].inbox.messages == [message]
+    assert metrics.sent.value(("delivered",)) == 3
+    assert metrics.sent.value(("failed",)) == 1
@@ -0,0 +1,55 @@
+import time
+
+from models.message import Message
+from models.search_index import SearchIndex
+
+
+def make(i, body):
+    return Message("ana", "beto", f"asunto {i}", body)
+
+
+def test_and_prefix_and_ranking():
+    index = SearchIndex()
+    a = make(1, "informe del proyecto")
+    b = make(2, "proyección anual")
+    c = make(3, "nada que ver")
+    for msg in (a, b, c):
+        index.add(msg)
+
+    assert index.search("informe proyecto") == [a]
+    assert set(index.search("proy*")) == {a, b}
+    assert index.search("proy* informe") == [a]
+    assert index.search("inexistente") == []
+
+
+def test_prefix_sees_terms_added_and_removed_after_a_query():
+    index = SearchIndex()
+    index.add(make(1, "alfa"))
+    assert len(index.search("al*")) == 1
+
+    late = make(2, "alfombra")
+    index.add(late)
+    assert len(index.search("al*")) == 2
+
+    index.remove(late.id)
+    assert index.search("alfo*") == []
+
+
+def test_add_cost_per_message_stays_flat():
+    # Cada mensaje trae términos nuevos: con un vocabulario ordenado
+    # mantenido con insort, cada tanda costaría más que la anterior.
+    index = SearchIndex()
+    chunk = 2000
+    timings = []
+    for start in range(0, 10 * chunk, chunk):
+        messages = [make(i, " ".join(f"t{i}x{j}" for j in range(30))) for i in range(start, start + chunk)]
+        began = time.perf_counter()
+        for msg in messages:
+            index.add(msg)
+        timings.append(time.perf_counter() - began)
+
+    early = min(timings[:3])
+    late = min(timings[-3:])
+    assert late < 3 * early, timings
+    # Y la primera consulta por prefijo sigue viendo todo el vocabulario.
+    assert len(index.search("t19999x29*")) == 1
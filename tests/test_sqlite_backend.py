@@ -0,0 +1,48 @@
+import threading
+
+from models.mail_server import MailServer
+from storage.sqlite_backend import SQLiteMailStore
+
+
+def build(path, n_users=10):
+    store = SQLiteMailStore(path)
+    server = MailServer("sqlite", user_factory=store.user)
+    names = [f"u{i}" for i in range(n_users)]
+    for name in names:
+        server.register_user(name)
+    for a, b in zip(names, names[1:]):
+        server.connect(a, b)
+    return store, server, names
+
+
+def test_concurrent_sends_from_worker_threads(tmp_path):
+    store, server, names = build(str(tmp_path / "mail.db"))
+    errors = []
+
+    def worker(k):
+        try:
+            for i in range(100):
+                sender, receiver = names[(k + i) % len(names)], names[(k * 3 + i + 1) % len(names)]
+                if sender != receiver:
+                    assert server.users[sender].send(server, receiver, f"hilo {k} #{i}", "hola")
+        except Exception as exc:  # pragma: no cover - se informa abajo
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    sent = sum(server.users[name].sent.message_count for name in names)
+    received = sum(server.users[name].inbox.message_count for name in names)
+    assert sent == received > 0
+    store.close()
+
+
+def test_acquire_all_on_sqlite_server():
+    store, server, names = build(":memory:")
+    assert server.acquire_all(blocking=False)
+    server.release_all()
+    store.close()
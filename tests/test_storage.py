@@ -0,0 +1,108 @@
+from storage.body_store import BodyStore
+from storage.engine import StorageEngine
+
+
+def populate(directory, n=200):
+    storage = StorageEngine.open(directory)
+    server = storage.server
+    for name in ("ana", "beto"):
+        server.register_user(name)
+    server.connect("ana", "beto")
+    for i in range(n):
+        server.users["ana"].send(server, "beto", f"informe {i}", f"cuerpo número {i} del proyecto")
+    return storage
+
+
+def count_body_reads(monkeypatch):
+    reads = []
+    original = BodyStore.get
+    monkeypatch.setattr(BodyStore, "get", lambda self, *args: reads.append(args) or original(self, *args))
+    return reads
+
+
+def test_recovery_does_not_read_offloaded_bodies(tmp_path, monkeypatch):
+    populate(str(tmp_path)).close()
+    reads = count_body_reads(monkeypatch)
+
+    storage = StorageEngine.open(str(tmp_path))
+    beto = storage.server.users["beto"]
+    assert beto.inbox.message_count == 200
+    assert reads == []
+
+    # Los cuerpos se tokenizan recién con la primera búsqueda.
+    assert [m.subject for m in beto.search("número 7 proyecto")] == ["informe 7"]
+    assert reads
+    storage.close()
+
+
+def test_recovery_from_snapshot_does_not_read_offloaded_bodies(tmp_path, monkeypatch):
+    storage = populate(str(tmp_path))
+    storage.snapshot()
+    storage.close()
+    reads = count_body_reads(monkeypatch)
+
+    storage = StorageEngine.open(str(tmp_path))
+    assert storage.server.users["ana"].sent.message_count == 200
+    assert reads == []
+    assert len(storage.server.users["ana"].search("cuerpo")) == 50
+    storage.close()
+
+
+def mailbox_state(server):
+    """Todo lo que debe sobrevivir a un reinicio, comparable con ==."""
+    state = {"graph": {name: sorted(peers) for name, peers in server.graph.items()}}
+    for name, user in server.users.items():
+        folders = {}
+        stack = [user.root]
+        while stack:
+            folder = stack.pop()
+            folders[folder.path] = sorted((m.id, m.subject, m.body, m.urgent) for m in folder.messages)
+            stack.extend(folder.subfolders)
+        state[name] = (list(user.list_filters()), folders, [m.id for m in user.top_urgent(100)])
+    return state
+
+
+def exercise(server):
+    """Registros, conexiones, filtros, entregas, urgencias, movimientos y bajas."""
+    for name in ("ana", "beto", "carla"):
+        server.register_user(name)
+    server.connect("ana", "beto")
+    server.connect("beto", "carla")
+    beto = server.users["beto"]
+    beto.add_filter("factura", "Pagos")
+    beto.create_folder("Archivo/2024")
+    for i in range(30):
+        sender = server.users["ana" if i % 2 else "carla"]
+        sender.send(server, "beto", f"aviso {i}", "factura de luz" if i % 3 == 0 else f"nota {i}", urgent=i % 5 == 0)
+    inbox = beto.inbox.messages
+    inbox[0].toggle_urgent()
+    assert beto.move_message_by_id(inbox[1].id, "2024")
+    assert beto.delete_message(inbox[2].id)
+
+
+def test_state_survives_restart_from_journal(tmp_path):
+    storage = StorageEngine.open(str(tmp_path))
+    exercise(storage.server)
+    expected = mailbox_state(storage.server)
+    storage.close()
+
+    storage = StorageEngine.open(str(tmp_path))
+    assert mailbox_state(storage.server) == expected
+    assert storage.server.route("ana", "carla") == ["ana", "beto", "carla"]
+    storage.close()
+
+
+def test_state_survives_restart_from_snapshot_and_tail(tmp_path):
+    storage = StorageEngine.open(str(tmp_path))
+    exercise(storage.server)
+    storage.snapshot()
+    # Cola de la bitácora posterior a la instantánea.
+    beto = storage.server.users["beto"]
+    beto.inbox.messages[0].toggle_urgent()
+    storage.server.users["carla"].send(storage.server, "beto", "después", "factura tardía")
+    expected = mailbox_state(storage.server)
+    storage.close()
+
+    storage = StorageEngine.open(str(tmp_path))
+    assert mailbox_state(storage.server) == expected
+    storage.close()
@@ -0,0 +1,167 @@
+import threading
+
+import pytest
+
+from models.folder import Folder
+from models.mail_server import MailServer
+from models.message import MAX_MESSAGE_ID, Message
+from storage.sqlite_backend import SQLiteMailStore
+
+
+def self_send(server):
+    server.register_user("ana")
+    ana = server.users["ana"]
+    ana.send(server, "ana", "recordatorio", "pagar la factura", urgent=True)
+    return ana, ana.sent.messages[0], ana.inbox.messages[0]
+
+
+def test_self_send_keeps_one_placement_per_id():
+    ana, sent, received = self_send(MailServer("local"))
+    assert sent.id != received.id
+    assert ana.folder_of(sent.id) is ana.sent
+    assert ana.folder_of(received.id) is ana.inbox
+
+
+def test_deleting_sent_copy_of_self_send_leaves_inbox_intact():
+    ana, sent, received = self_send(MailServer("local"))
+
+    assert ana.delete_message(sent.id)
+    assert ana.sent.messages == []
+    assert ana.inbox.messages == [received]
+    assert ana.folder_of(received.id) is ana.inbox
+    assert ana.search("factura") == [received]
+    assert ana.top_urgent() == [received]
+
+
+def test_moving_sent_copy_of_self_send_leaves_inbox_intact():
+    ana, sent, received = self_send(MailServer("local"))
+    ana.create_folder("Archivo")
+
+    assert ana.move_message_by_id(sent.id, "Archivo")
+    assert ana.folder_of(sent.id).name == "Archivo"
+    assert ana.folder_of(received.id) is ana.inbox
+
+
+def test_self_send_on_sqlite_backend():
+    store = SQLiteMailStore()
+    ana, sent, received = self_send(MailServer("sqlite", user_factory=store.user))
+    assert sent.id != received.id
+
+    assert ana.delete_message(sent.id)
+    assert [m.id for m in ana.inbox.messages] == [received.id]
+    assert ana.folder_of(received.id) == ana.inbox
+    store.close()
+
+
+def test_delivery_does_not_wait_for_a_running_search():
+    server = MailServer("local")
+    for name in ("ana", "beto"):
+        server.register_user(name)
+    server.connect("ana", "beto")
+    beto = server.users["beto"]
+
+    # Simula una búsqueda larga en otro hilo: el índice está tomado.
+    done = threading.Event()
+    with beto._index_lock:
+        worker = threading.Thread(
+            target=lambda: server.users["ana"].send(server, "beto", "factura", "vence hoy") and done.set())
+        worker.start()
+        assert done.wait(5)
+    worker.join()
+
+    assert [m.subject for m in beto.search("factura")] == ["factura"]
+
+
+def test_urgency_changes_reach_folder_and_queue_through_the_user():
+    server = MailServer("local")
+    for name in ("ana", "beto"):
+        server.register_user(name)
+    server.connect("ana", "beto")
+    ana, beto = server.users["ana"], server.users["beto"]
+    ana.create_folder("Trabajo")
+    ana.send(server, "beto", "informe", "adjunto")
+    message = beto.inbox.messages[0]
+    # Un dueño por buzón, sin funciones ligadas por carpeta.
+    assert message._owners == (ana, beto)
+
+    message.toggle_urgent()
+    assert beto.inbox.counters.urgent == 1
+    assert beto.inbox.page("urgent", 0, 1) == [message]
+    assert beto.top_urgent() == [message] == ana.top_urgent()
+
+    assert beto.delete_message(message.id)
+    assert message._owners is ana
+    message.toggle_urgent()
+    assert ana.sent.counters.urgent == 0
+    assert ana.top_urgent() == []
+
+
+def test_standalone_folder_tracks_urgency_itself():
+    folder = Folder("Suelta")
+    message = Message("ana", "beto", "hola", "")
+    folder.add_message(message)
+    assert message._owners is folder
+    message.toggle_urgent()
+    assert folder.counters.urgent == 1
+    folder.remove_message(message.id)
+    assert message._owners is None
+
+
+def test_ingest_indexes_in_workers_and_notifies_once_per_folder():
+    server = MailServer("local")
+    server.register_user("ana")
+    ana = server.users["ana"]
+    ana.add_filter("factura", "Pagos")
+    events = []
+    ana.root.subscribe(lambda event, folder, message: events.append((event, folder.name)))
+
+    messages = [Message("beto", "ana", f"aviso {i}", "factura de luz" if i % 2 else "hola")
+                for i in range(10)]
+    assert server.ingest(("ana", message) for message in messages) == 10
+
+    added = sorted(e for e in events if e[0] != "folder_added")
+    assert added == [("messages_added", "Inbox"), ("messages_added", "Pagos")]
+    assert {m.id for m in ana.search("factura", limit=None)} == {m.id for m in messages[1::2]}
+    assert len(ana.search("beto aviso", limit=None)) == 10
+    assert ana.get_folder("Pagos").counters.total == 5
+
+
+def test_ingest_of_a_repeated_message_matches_repeated_receive():
+    store = SQLiteMailStore()
+    for server in (MailServer("local"), MailServer("sqlite", user_factory=store.user)):
+        server.register_user("ana")
+        ana = server.users["ana"]
+        message = Message("beto", "ana", "aviso", "factura de luz")
+
+        assert server.ingest([("ana", message), ("ana", message)]) == 2
+        assert ana.inbox.message_count == 2
+        assert len({m.id for m in ana.inbox.messages}) == 2
+        assert len(ana.search("factura", limit=None)) == 2
+    store.close()
+
+
+def test_message_leaving_the_tree_by_any_path_leaves_queue_and_index():
+    server = MailServer("local")
+    for name in ("ana", "beto"):
+        server.register_user(name)
+    server.connect("ana", "beto")
+    ana, beto = server.users["ana"], server.users["beto"]
+    beto.send(server, "ana", "uno", "factura de luz", urgent=True)
+    beto.send(server, "ana", "dos", "factura de gas", urgent=True)
+    first, second = ana.inbox.messages
+
+    assert ana.inbox.remove_message(first.id) is first
+    assert ana.inbox.transfer(second.id, beto.inbox) is second
+
+    assert ana.top_urgent() == []
+    assert ana.search("factura") == []
+    assert beto.search("gas") == [second]
+
+
+def test_message_ids_beyond_the_view_key_range_are_rejected():
+    with pytest.raises(OverflowError):
+        Message.restore(MAX_MESSAGE_ID + 1, "ana", "beto", "asunto", "cuerpo", 0)
+    folder = Folder("Inbox")
+    message = Message.restore(MAX_MESSAGE_ID, "ana", "beto", "asunto", "cuerpo", 0)
+    folder.add_message(message)
+    assert folder.page("newest") == [message]
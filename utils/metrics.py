@@ -0,0 +1,234 @@
+# utils/metrics.py
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Límites por defecto (en segundos) de los histogramas de latencia.
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# Límites de la cantidad de nodos visitados por búsqueda de ruta.
+VISITED_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500,
+                   5000, 10000, 25000, 100000, 1000000)
+
+
+def _escape(value: str) -> str:
+    """Escapa el valor de una etiqueta según el formato de texto de Prometheus."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monótono, opcionalmente separado por etiquetas."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, labels: Tuple = ()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def items(self) -> List[Tuple[Tuple, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+                for key, value in self.items()]
+
+
+class Histogram:
+    """
+    Histograma de límites fijos (como los de Prometheus): cuenta cuántas
+    observaciones caen en cada intervalo y acumula su suma.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        # Una posición por límite más la de +Inf (no acumuladas).
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimación del cuantil q (0..1): el límite superior del intervalo
+        que lo contiene. Devuelve 0 si no hay observaciones.
+        """
+        with self._lock:
+            counts, total = list(self._counts), self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def render(self) -> List[str]:
+        with self._lock:
+            counts, total, acc = list(self._counts), self.count, self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_number(bound)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_number(acc)}")
+        lines.append(f"{self.name}_count {total}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas con nombre único, exportable en formato Prometheus."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"La métrica {metric.name} ya está registrada")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus (versión 0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """
+        Escribe render() en un archivo de forma atómica (archivo temporal +
+        reemplazo), apto para el textfile collector de node_exporter.
+        """
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+class MailMetrics:
+    """
+    Instrumentación del motor de correo.
+
+    Se conecta con MailServer.attach_metrics(); el servidor y sus usuarios
+    llaman a estos métodos en los puntos medidos:
+
+    - message_sent:     MailServer.send_message y cada destinatario de
+                        send_message_many (contador por resultado y
+                        latencia de la entrega completa)
+    - route_searched:   nodos visitados por cada búsqueda de ruta (BFS);
+                        0 si la ruta salió de la caché
+    - filters_matched:  tiempo de User._apply_filters
+    - message_stored:   mensajes agregados por usuario y carpeta;
+                        insertion_rates() da la tasa por segundo
+
+    Sin métricas conectadas el costo es una comparación con None por punto.
+
+    Además se pueden registrar funciones de traza con add_tracer(): cada
+    envío se informa como tracer("send_message", segundos, atributos).
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.sent = r.counter("mail_send_total", "Mensajes procesados por send_message.", ("result",))
+        self.send_latency = r.histogram("mail_send_seconds", "Latencia de send_message en segundos.")
+        self.bfs_visited = r.histogram(
+            "mail_route_nodes_visited", "Nodos visitados por búsqueda de ruta (0 = caché).",
+            VISITED_BUCKETS,
+        )
+        self.filter_latency = r.histogram("mail_filter_seconds", "Tiempo de aplicación de filtros en segundos.")
+        self.filter_matches = r.counter("mail_filter_total", "Mensajes filtrados, según si algún filtro coincidió.",
+                                        ("matched",))
+        self.inserts = r.counter("mail_folder_inserts_total", "Mensajes insertados por carpeta.",
+                                 ("user", "folder"))
+        self.started_at = time.monotonic()
+        self._tracers: Tuple[Callable, ...] = ()
+
+    # ===================================================================
+    # PUNTOS DE MEDICIÓN
+    # ===================================================================
+    def message_sent(self, receiver: str, seconds: float, delivered: bool):
+        self.sent.inc(1, ("delivered" if delivered else "failed",))
+        self.send_latency.observe(seconds)
+        for tracer in self._tracers:
+            tracer("send_message", seconds, {"receiver": receiver, "delivered": delivered})
+
+    def route_searched(self, visited: int):
+        self.bfs_visited.observe(visited)
+
+    def filters_matched(self, seconds: float, matched: bool):
+        self.filter_latency.observe(seconds)
+        self.filter_matches.inc(1, ("true" if matched else "false",))
+
+    def message_stored(self, user: str, folder, count: int = 1):
+        self.inserts.inc(count, (user, folder.path or folder.name))
+
+    # ===================================================================
+    # TRAZAS Y CONSULTAS EN PROCESO
+    # ===================================================================
+    def add_tracer(self, callback: Callable):
+        """Registra una función tracer(nombre, segundos, atributos)."""
+        if callback not in self._tracers:
+            self._tracers += (callback,)
+
+    def remove_tracer(self, callback: Callable):
+        self._tracers = tuple(t for t in self._tracers if t != callback)
+
+    def insertion_rates(self) -> Dict[Tuple[str, str], float]:
+        """Inserciones por segundo de cada (usuario, carpeta) desde que se crearon las métricas."""
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {key: count / elapsed for key, count in self.inserts.items()}
+
+    def render(self) -> str:
+        return self.registry.render()
+
+    def write(self, path: str):
+        self.registry.write(path)